@@ -0,0 +1,78 @@
+import threading
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+from .models import User
+
+
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields]
+
+
+class UserCache:
+    """
+    Bounded per-process cache of user rows, each trusted for `ttl` seconds.
+    Rows are kept as values and every caller gets its own User instance, so
+    requests never share (or mutate) one another's user.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.rows = TTLCache(maxsize=maxsize, ttl=ttl)
+        # Authentication runs in sync_to_async worker threads
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            values = self.rows.get(user_id)
+        if values is None:
+            values = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*USER_FIELDS).first()
+            if values is None:
+                return None
+            with self.lock:
+                self.rows[user_id] = values
+        return User.from_db(User.objects.db, USER_FIELDS, values)
+
+    def evict(self, user_id):
+        """Drops a user's row, so this process reads the next change to it at once."""
+        # Keyed like the token claim, where ids other than integers are strings
+        key = user_id if isinstance(user_id, int) else str(user_id)
+        with self.lock:
+            self.rows.pop(key, None)
+
+
+user_cache = UserCache(maxsize=settings.JWT_USER_CACHE_SIZE, ttl=settings.JWT_USER_CACHE_TTL)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without a user lookup per request: the user is rebuilt
+    from the token's user id and `user_cache`, so each user costs one primary
+    key lookup per process every JWT_USER_CACHE_TTL seconds. The usual checks
+    (inactive users and, when enabled, revoked tokens) run against the cached
+    row. Saving a user or logging them in evicts the row in that process, other
+    processes (and changes made with queryset updates) see the change within
+    the TTL.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = user_cache.get(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
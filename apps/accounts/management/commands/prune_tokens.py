@@ -0,0 +1,24 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.accounts.tokens import prune_expired_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes expired outstanding and blacklisted refresh tokens in small chunks, so the token tables "
+        "are never locked for long. Meant to run from cron, e.g. hourly."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, help="Tokens deleted per statement (default TOKEN_PRUNE_CHUNK_SIZE)")
+        parser.add_argument("--pause", type=float, default=0, help="Seconds to wait between chunks")
+
+    def handle(self, *args, **options):
+        deleted = 0
+        for count in prune_expired_tokens(options["chunk_size"] or settings.TOKEN_PRUNE_CHUNK_SIZE):
+            deleted += count
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(f"Deleted {deleted} expired tokens")
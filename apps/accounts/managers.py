@@ -1,6 +1,9 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.base_user import BaseUserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db import IntegrityError, connections, router
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from apps.common.managers import GetOrNoneQuerySet
 
@@ -96,6 +99,92 @@ class CustomUserManager(BaseUserManager):
         await user.asave(using=self._db)
         return user
 
+    # Profile fields refreshed from the provider on every login
+    PROFILE_FIELDS = ["first_name", "last_name", "avatar"]
+    SIGNUP_ATTEMPTS = 5
+
+    def _fetch_users(self, sql, params):
+        connection = connections[router.db_for_write(self.model)]
+        fields = [field.attname for field in self.model._meta.concrete_fields]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [self.model.from_db(connection.alias, fields, row) for row in cursor.fetchall()]
+
+    def _returning(self):
+        return ", ".join(field.column for field in self.model._meta.concrete_fields)
+
+    def _refresh_profile(self, provider, provider_user_id, profile):
+        """
+        Refreshes the profile of the user with this provider id and returns it, or
+        None when there is none. A user with the same (normalized) email and no
+        provider id yet is taken over, the provider id row winning if both exist.
+        """
+        table = self.model._meta.db_table
+        sql = f"""
+            UPDATE {table}
+            SET first_name = %s, last_name = %s, avatar = %s,
+                auth_provider = %s, provider_user_id = %s, updated_at = %s
+            WHERE id = (
+                SELECT id FROM {table}
+                WHERE (auth_provider = %s AND provider_user_id = %s) OR (email = %s AND provider_user_id IS NULL)
+                ORDER BY provider_user_id IS NULL
+                LIMIT 1
+            )
+            RETURNING {self._returning()}
+        """
+        params = [
+            *(profile[name] for name in self.PROFILE_FIELDS), provider, provider_user_id, timezone.now(),
+            provider, provider_user_id, profile["email"]
+        ]
+        users = self._fetch_users(sql, params)
+        return users[0] if users else None
+
+    def _insert_social(self, provider, provider_user_id, profile):
+        """Creates the user, or refreshes it if a concurrent login created it first."""
+        user = self.model(
+            email=profile["email"],
+            auth_provider=provider,
+            provider_user_id=provider_user_id,
+            **{name: profile[name] for name in self.PROFILE_FIELDS}
+        )
+        user.set_unusable_password()
+
+        connection = connections[router.db_for_write(self.model)]
+        fields = self.model._meta.concrete_fields
+        # pre_save fills the timestamps and allocates the username
+        values = [field.get_db_prep_save(field.pre_save(user, True), connection) for field in fields]
+        updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in [*self.PROFILE_FIELDS, "updated_at"])
+        sql = f"""
+            INSERT INTO {self.model._meta.db_table} ({", ".join(field.column for field in fields)})
+            VALUES ({", ".join(["%s"] * len(fields))})
+            ON CONFLICT (auth_provider, provider_user_id) DO UPDATE SET {updates}
+            RETURNING {self._returning()}
+        """
+        return self._fetch_users(sql, values)[0]
+
+    def upsert_social(self, provider, provider_user_id, profile):
+        """
+        Logs a social account in: a returning user costs the single UPDATE of
+        `_refresh_profile`, a new one a username allocation and an upsert.
+        `profile` holds email, first_name, last_name and avatar.
+        """
+        # Stored normalized, so a legacy user is matched whatever the case of the provider's domain
+        profile = {**profile, "email": self.normalize_email(profile["email"])}
+        for attempt in range(self.SIGNUP_ATTEMPTS):
+            user = self._refresh_profile(provider, provider_user_id, profile)
+            if user is not None:
+                return user
+            try:
+                return self._insert_social(provider, provider_user_id, profile)
+            except IntegrityError as e:
+                # A concurrent signup took the username, anything else (the email is another account's) is final
+                constraint = getattr(getattr(e.__cause__, "diag", None), "constraint_name", None) or ""
+                if "username" not in constraint or attempt == self.SIGNUP_ATTEMPTS - 1:
+                    raise
+
+    async def aupsert_social(self, provider, provider_user_id, profile):
+        return await sync_to_async(self.upsert_social)(provider, provider_user_id, profile)
+
     def get_queryset(self):
         return GetOrNoneQuerySet(self.model, using=self._db)
 
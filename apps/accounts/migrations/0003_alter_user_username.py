@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:48
+
+import apps.accounts.models
+import apps.common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_remove_user_bio_remove_user_google_id_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='username',
+            field=apps.common.fields.UniqueSlugField(editable=False, populate_from=apps.accounts.models.slugify_two_fields, unique=True, verbose_name='Username'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_user_username'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(fields=('auth_provider', 'provider_user_id'), name='user_provider_uniq'),
+        ),
+    ]
@@ -1,9 +1,9 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from rest_framework_simplejwt.tokens import RefreshToken
-from autoslug import AutoSlugField
+from apps.common.fields import UniqueSlugField
 from .managers import CustomUserManager
+from .tokens import issue_tokens
 import uuid
 
 
@@ -20,8 +20,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     first_name = models.CharField(max_length=50)
     last_name = models.CharField(max_length=50)
     avatar = models.URLField(null=True, blank=True)
-    username = AutoSlugField(
-        _("Username"), populate_from=slugify_two_fields, unique=True, always_update=True
+    username = UniqueSlugField(
+        _("Username"), populate_from=slugify_two_fields, unique=True
     )
     auth_provider = models.CharField(max_length=20, choices=AUTH_PROVIDERS, default="google")
     provider_user_id = models.CharField(max_length=255, null=True, blank=True)
@@ -47,12 +47,18 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @property
     def tokens(self):
-        refresh = RefreshToken.for_user(self)
-        return {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token)
-        }
+        return issue_tokens(self)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Deactivation and password changes apply to this process's authentication at once
+        from .authentication import user_cache
+        user_cache.evict(self.pk)
 
     class Meta:
         verbose_name = _("User")
         verbose_name_plural = _("Users")
+        constraints = [
+            # Login looks users up by their provider id
+            models.UniqueConstraint(fields=["auth_provider", "provider_user_id"], name="user_provider_uniq"),
+        ]
@@ -1,3 +1,297 @@
-from django.test import TestCase
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from cachetools import TTLCache
+from django.contrib.auth.hashers import make_password
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken as BaseRefreshToken
+from .authentication import CachedJWTAuthentication, user_cache
+from .models import User
+from .tokens import OutstandingTokenWriter, issue_tokens, outstanding_tokens, prune_expired_tokens
+
+
+def make_user(name="ada", **fields):
+    return User.objects.create(email=f"{name}@example.com", first_name=name.title(), last_name="Tester", **fields)
+
+
+def jti_of(refresh):
+    return BaseRefreshToken(refresh)["jti"]
+
+
+class OutstandingTokenWriterTests(TransactionTestCase):
+    # The writer thread inserts on its own connection, so the user has to be committed
+
+    def setUp(self):
+        self.user = make_user()
+
+    async def login(self):
+        return issue_tokens(self.user)
+
+    def test_tokens_issued_on_short_lived_loops_are_recorded(self):
+        # Under WSGI every async view runs on a loop of its own that is gone when the request ends
+        tokens = [async_to_sync(self.login)() for _ in range(3)]
+        outstanding_tokens.flush()
+
+        jtis = set(OutstandingToken.objects.values_list("jti", flat=True))
+        self.assertEqual(jtis, {jti_of(token["refresh"]) for token in tokens})
+
+    def test_sync_callers_write_straight_away(self):
+        token = issue_tokens(self.user)
+        self.assertTrue(OutstandingToken.objects.filter(jti=jti_of(token["refresh"])).exists())
+
+    @override_settings(TOKEN_WRITER_BATCH_SIZE=1000, TOKEN_WRITER_FLUSH_INTERVAL=60)
+    def test_stop_writes_buffered_rows(self):
+        writer = OutstandingTokenWriter()
+        refresh = BaseRefreshToken.for_user(self.user)
+
+        async def add():
+            writer.add(OutstandingToken(
+                user=self.user, jti="buffered", token=str(refresh),
+                created_at=timezone.now(), expires_at=timezone.now() + timedelta(days=1)
+            ))
+        async_to_sync(add)()
+        writer.stop()
+
+        self.assertTrue(OutstandingToken.objects.filter(jti="buffered").exists())
+        self.assertFalse(writer.thread.is_alive())
+
+
+class PruneExpiredTokensTests(TestCase):
+
+    def setUp(self):
+        self.user = make_user()
+        now = timezone.now()
+        for i in range(5):
+            expires_at = now - timedelta(days=1) if i < 3 else now + timedelta(days=1)
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f"jti-{i}", token=f"token-{i}", created_at=now, expires_at=expires_at
+            )
+            BlacklistedToken.objects.create(token=token)
+
+    def test_deletes_expired_tokens_in_chunks(self):
+        self.assertEqual(list(prune_expired_tokens(chunk_size=2)), [2, 1])
+        self.assertEqual(set(OutstandingToken.objects.values_list("jti", flat=True)), {"jti-3", "jti-4"})
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    ttl = 0.5
+
+    def setUp(self):
+        self.user = make_user()
+        patcher = mock.patch.object(user_cache, "rows", TTLCache(maxsize=10, ttl=self.ttl))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, token=None):
+        authentication = CachedJWTAuthentication()
+        return authentication.get_user(authentication.get_validated_token(str(token or AccessToken.for_user(self.user))))
+
+    def expire(self):
+        time.sleep(self.ttl + 0.05)
+
+    def test_users_are_read_once_per_ttl(self):
+        with self.assertNumQueries(1):
+            self.authenticate()
+            user = self.authenticate()
+        self.assertEqual(user, self.user)
+
+        self.expire()
+        with self.assertNumQueries(1):
+            self.authenticate()
+
+    def test_every_caller_gets_its_own_user(self):
+        first, second = self.authenticate(), self.authenticate()
+        first.first_name = "Changed"
+        self.assertIsNot(first, second)
+        self.assertEqual(second.first_name, "Ada")
+
+    def test_deactivation_elsewhere_applies_after_the_ttl(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        self.assertEqual(self.authenticate(), self.user)
+        self.expire()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_saving_a_user_evicts_it(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    @mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True)
+    def test_revoked_tokens_are_rejected_within_the_ttl(self):
+        token = AccessToken.for_user(self.user)
+        # Hashed first, it takes longer than the TTL
+        password = make_password("changed")
+        self.authenticate(token)
+
+        User.objects.filter(pk=self.user.pk).update(password=password)
+        self.assertEqual(self.authenticate(token), self.user)
+        self.expire()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    @mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True)
+    def test_password_changes_saved_here_revoke_tokens_at_once(self):
+        token = AccessToken.for_user(self.user)
+        self.authenticate(token)
+
+        self.user.set_password("changed")
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_login_evicts_the_refreshed_user(self):
+        self.authenticate()
+        User.objects.filter(pk=self.user.pk).update(is_active=False, provider_user_id="google-ada")
+
+        async def verify(token):
+            return {
+                "email": self.user.email, "first_name": "Ada", "last_name": "Tester",
+                "avatar": None, "provider_user_id": "google-ada"
+            }
+
+        # The outstanding token writer could not see the uncommitted user
+        with mock.patch.dict("apps.accounts.views.PROVIDER_MAP", {"google": verify}), \
+                mock.patch.object(outstanding_tokens, "add"):
+            response = self.client.post(
+                reverse("google-auth"), {"provider": "google", "id_token": "token"}, content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+
+def profile(email="ada@example.com", first_name="Ada", last_name="Lovelace", avatar=None):
+    return {"email": email, "first_name": first_name, "last_name": last_name, "avatar": avatar}
+
+
+class SocialUpsertTests(TestCase):
+
+    def test_new_users_are_created(self):
+        user = User.objects.upsert_social("google", "g-1", profile())
+
+        self.assertEqual((user.email, user.provider_user_id, user.username), ("ada@example.com", "g-1", "ada-lovelace"))
+        self.assertFalse(user.has_usable_password())
+
+    def test_returning_users_are_refreshed_in_one_query(self):
+        created = User.objects.upsert_social("google", "g-1", profile())
+
+        with self.assertNumQueries(1):
+            user = User.objects.upsert_social("google", "g-1", profile(first_name="Augusta", avatar="https://example.com/a.png"))
+
+        self.assertEqual(user.pk, created.pk)
+        self.assertEqual((user.first_name, user.avatar), ("Augusta", "https://example.com/a.png"))
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_legacy_users_are_adopted_by_email(self):
+        legacy = make_user("ada")
+
+        user = User.objects.upsert_social("google", "g-1", profile(email=legacy.email))
+
+        self.assertEqual(user.pk, legacy.pk)
+        self.assertEqual(user.provider_user_id, "g-1")
+
+    def test_legacy_users_are_adopted_whatever_the_case_of_the_domain(self):
+        legacy = make_user("ada")
+        local, _, domain = legacy.email.partition("@")
+
+        user = User.objects.upsert_social("google", "g-1", profile(email=f"{local}@{domain.upper()}"))
+
+        self.assertEqual(user.pk, legacy.pk)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_the_provider_id_wins_over_a_legacy_email_match(self):
+        linked = User.objects.upsert_social("google", "g-1", profile(email="ada@example.com"))
+        make_user("augusta")
+
+        user = User.objects.upsert_social("google", "g-1", profile(email="augusta@example.com"))
+
+        self.assertEqual(user.pk, linked.pk)
+        self.assertEqual(user.email, "ada@example.com")
+
+    def test_same_name_signups_get_distinct_usernames(self):
+        users = [User.objects.upsert_social("google", f"g-{i}", profile(email=f"ada{i}@example.com")) for i in range(3)]
+        self.assertEqual(len({user.username for user in users}), 3)
+
+    def test_an_email_of_another_account_is_a_conflict(self):
+        User.objects.upsert_social("google", "g-1", profile())
+
+        async def verify(token):
+            return {**profile(), "provider_user_id": "g-2"}
+
+        with mock.patch.dict("apps.accounts.views.PROVIDER_MAP", {"google": verify}):
+            response = self.client.post(
+                reverse("google-auth"), {"provider": "google", "id_token": "token"}, content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, 409)
+
+    async def test_concurrent_logins_of_one_account_share_an_upsert(self):
+        original = User.objects.aupsert_social
+        calls = []
+        verified = []
+        everyone_verified = asyncio.Event()
+
+        async def verify(token):
+            verified.append(token)
+            if len(verified) == 20:
+                everyone_verified.set()
+            return {**profile(), "provider_user_id": "g-1"}
+
+        async def upsert(*args):
+            calls.append(args)
+            # Every login goes on to the upsert without awaiting, so all of them are waiting on this one
+            await everyone_verified.wait()
+            return await original(*args)
+
+        async def login():
+            return await self.async_client.post(
+                reverse("google-auth"), {"provider": "google", "id_token": "token"}, content_type="application/json"
+            )
+
+        # The outstanding token writer could not see the uncommitted user
+        with mock.patch.dict("apps.accounts.views.PROVIDER_MAP", {"google": verify}), \
+                mock.patch.object(User.objects, "aupsert_social", upsert), \
+                mock.patch.object(outstanding_tokens, "add"):
+            responses = await asyncio.gather(*(login() for _ in range(20)))
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(await User.objects.acount(), 1)
+
+
+class ConcurrentSignupTests(TransactionTestCase):
+
+    def test_racing_signups_create_one_user(self):
+        barrier = threading.Barrier(16)
+
+        def signup():
+            try:
+                barrier.wait()
+                return User.objects.upsert_social("google", "g-1", profile()).pk
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            ids = list(executor.map(lambda _: signup(), range(16)))
+
+        self.assertEqual(len(set(ids)), 1)
+        self.assertEqual(User.objects.count(), 1)
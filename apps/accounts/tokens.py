@@ -0,0 +1,174 @@
+"""
+Token issuance that keeps refresh-token bookkeeping off the login path.
+
+Refresh tokens are signed in memory and their OutstandingToken rows are
+handed to a per-process writer thread that inserts them in batches. The rows
+only serve blacklisting, which creates the row itself when it is missing, so
+a batch lost to a crash costs nothing but the record.
+"""
+import asyncio
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+logger = logging.getLogger(__name__)
+
+STOP = object()
+
+
+class OutstandingTokenWriter:
+    """
+    Buffers OutstandingToken rows and inserts them with one bulk INSERT per
+    TOKEN_WRITER_BATCH_SIZE rows or TOKEN_WRITER_FLUSH_INTERVAL seconds,
+    whichever comes first, from a thread that lives as long as the process
+    (an event loop may not: under WSGI each request gets its own). Beyond
+    TOKEN_WRITER_MAX_PENDING buffered rows new ones are dropped, so a slow
+    token table never backs up into logins. Whatever is buffered at exit is
+    written before the process ends.
+    """
+
+    def __init__(self):
+        self.rows = queue.Queue(maxsize=settings.TOKEN_WRITER_MAX_PENDING)
+        self.thread = None
+        self.lock = threading.Lock()
+        self.dropped = 0
+
+    def add(self, row):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Management commands and other sync callers write straight away
+            self.insert([row])
+            return
+
+        self.start()
+        try:
+            self.rows.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        with self.lock:
+            # A forked worker inherits the Thread object but not the thread
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name="outstanding-token-writer", daemon=True)
+                self.thread.start()
+
+    def insert(self, rows):
+        try:
+            OutstandingToken.objects.bulk_create(rows, ignore_conflicts=True)
+        except Exception:
+            logger.exception("Could not record %s outstanding tokens", len(rows))
+
+    def write(self, rows):
+        # The thread serves no request, so it checks out and returns its connection per batch
+        close_old_connections()
+        try:
+            self.insert(rows)
+        finally:
+            connections[router.db_for_write(OutstandingToken)].close()
+
+    def next_batch(self):
+        """Blocks for a row, then collects more until the batch is full or the interval is up."""
+        batch = [self.rows.get()]
+        deadline = time.monotonic() + settings.TOKEN_WRITER_FLUSH_INTERVAL
+        while batch[-1] is not STOP and len(batch) < settings.TOKEN_WRITER_BATCH_SIZE:
+            try:
+                batch.append(self.rows.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            rows = [row for row in batch if row is not STOP]
+            if rows:
+                self.write(rows)
+            if self.dropped:
+                logger.warning("Dropped %s outstanding token records, the writer was behind", self.dropped)
+                self.dropped = 0
+            for _ in batch:
+                self.rows.task_done()
+            if len(rows) < len(batch):
+                return
+
+    def flush(self):
+        """Blocks until every row buffered so far is written."""
+        if self.thread is not None and self.thread.is_alive():
+            self.rows.join()
+
+    def stop(self):
+        """Writes what is buffered and stops the thread."""
+        if self.thread is not None and self.thread.is_alive():
+            self.rows.put(STOP)
+            self.thread.join()
+
+
+outstanding_tokens = OutstandingTokenWriter()
+atexit.register(outstanding_tokens.stop)
+
+
+class RefreshToken(BaseRefreshToken):
+
+    @classmethod
+    def for_user(cls, user):
+        # Skips BlacklistMixin.for_user, which inserts the OutstandingToken row inline
+        token = super(BlacklistMixin, cls).for_user(user)
+        outstanding_tokens.add(OutstandingToken(
+            user_id=user.pk,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"])
+        ))
+        return token
+
+
+def issue_tokens(user):
+    refresh = RefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token)
+    }
+
+
+def prune_expired_tokens(chunk_size, now=None):
+    """
+    Deletes expired outstanding tokens and their blacklist entries, `chunk_size`
+    at a time, each chunk in its own short statement. Yields the number of
+    tokens deleted per chunk until none are left.
+    """
+    now = now or timezone.now()
+    outstanding = OutstandingToken._meta.db_table
+    blacklisted = BlacklistedToken._meta.db_table
+    sql = f"""
+        WITH expired AS (
+            SELECT id FROM {outstanding}
+            WHERE expires_at < %s
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ), unlisted AS (
+            DELETE FROM {blacklisted} WHERE token_id IN (SELECT id FROM expired)
+        )
+        DELETE FROM {outstanding} WHERE id IN (SELECT id FROM expired)
+    """
+    while True:
+        with connections[router.db_for_write(OutstandingToken)].cursor() as cursor:
+            cursor.execute(sql, [now, chunk_size])
+            deleted = cursor.rowcount
+        if not deleted:
+            return
+        yield deleted
@@ -1,12 +1,128 @@
-from google.oauth2 import id_token
-from google.auth.transport import requests
+import asyncio
+import logging
+import re
+import time
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from google.auth import jwt
 from rest_framework.exceptions import AuthenticationFailed
 
 
+logger = logging.getLogger(__name__)
+
+GOOGLE_ISSUERS = ["accounts.google.com", "https://accounts.google.com"]
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class GoogleCertsCache:
+    """
+    Keeps Google's public signing certs in memory.
+    Certs are refreshed according to the Cache-Control max-age of the certs endpoint;
+    close to expiry the refresh happens in the background while the current keys keep serving.
+    """
+
+    def __init__(self, certs_url, refresh_margin=300, default_max_age=3600, min_refresh_interval=60, timeout=5):
+        self.certs_url = certs_url
+        self.refresh_margin = refresh_margin
+        self.default_max_age = default_max_age
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self._certs = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._refresh_task = None
+
+    def _fetch(self):
+        response = requests.get(self.certs_url, timeout=self.timeout)
+        response.raise_for_status()
+
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        max_age = int(match.group(1)) if match else self.default_max_age
+        return response.json(), max_age
+
+    def set_certs(self, certs, max_age):
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        self._expires_at = now + max_age
+
+    async def _refresh(self):
+        certs, max_age = await sync_to_async(self._fetch, thread_sensitive=False)()
+        self.set_certs(certs, max_age)
+
+    def _schedule_refresh(self):
+        # Concurrent callers share one in-flight fetch
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Refreshing Google certs failed: %s", task.exception())
+
+    async def refresh(self):
+        # Shielded so a cancelled request does not abort a fetch other requests are waiting on
+        await asyncio.shield(self._schedule_refresh())
+
+    async def get_certs(self):
+        now = time.monotonic()
+        if not self._certs or now >= self._expires_at:
+            await self.refresh()
+        elif now >= self._expires_at - self.refresh_margin:
+            self._schedule_refresh()
+        return self._certs
+
+    async def get_certs_for(self, key_id):
+        """
+        Returns certs that contain `key_id`, refetching once when Google has rotated its keys.
+        Forced refetches are throttled so unknown key ids cannot be used to hammer the endpoint.
+        """
+        certs = await self.get_certs()
+        if key_id in certs or time.monotonic() - self._fetched_at < self.min_refresh_interval:
+            return certs
+
+        await self.refresh()
+        return self._certs
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens locally against the cached certs, off the event loop."""
+
+    def __init__(self, certs, audience=None, clock_skew_in_seconds=0):
+        self.certs = certs
+        self.audience = audience
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+
+    def _decode(self, token, certs):
+        id_info = jwt.decode(
+            token,
+            certs=certs,
+            audience=self.audience,
+            clock_skew_in_seconds=self.clock_skew_in_seconds
+        )
+        if id_info.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError("Wrong issuer.")
+        return id_info
+
+    async def verify(self, token):
+        key_id = jwt.decode_header(token).get("kid")
+        certs = await self.certs.get_certs_for(key_id)
+        return await sync_to_async(self._decode, thread_sensitive=False)(token, certs)
+
+
+google_token_verifier = GoogleTokenVerifier(
+    certs=GoogleCertsCache(certs_url=settings.GOOGLE_OAUTH_CERTS_URL),
+    audience=settings.GOOGLE_OAUTH_CLIENT_ID
+)
+
+
 async def verify_google_token(token):
     try:
-        request = requests.Request()
-        id_info = id_token.verify_oauth2_token(token, request)
+        id_info = await google_token_verifier.verify(token)
 
         return {
             "provider_user_id": id_info["sub"],
@@ -15,6 +131,6 @@ async def verify_google_token(token):
             "last_name": id_info["family_name"],
             "avatar": id_info["picture"]
         }
-    
+
     except ValueError as e:
-        raise AuthenticationFailed("Invalid Token")
\ No newline at end of file
+        raise AuthenticationFailed("Invalid Token")
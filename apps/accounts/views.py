@@ -1,18 +1,22 @@
 from adrf.views import APIView
+from django.db import IntegrityError
+from apps.common.limits import SingleFlight
 from apps.common.response import CustomResponse
+from .authentication import user_cache
 from .models import User
 from .serializers import (
     SocialAuthSerializer,
     SocialAuthResponseSerializer
 )
 from .utils import verify_google_token
-from asgiref.sync import sync_to_async
 
 
 PROVIDER_MAP ={
     "google": verify_google_token
 }
 
+login_flights = SingleFlight()
+
 class GoogleAuthAPIView(APIView):
     serializer_class = SocialAuthSerializer
     response_serializer = SocialAuthResponseSerializer
@@ -32,18 +36,20 @@ class GoogleAuthAPIView(APIView):
         except Exception as e:
             return CustomResponse.error(message="Invalid Token")
         
-        user, _ = await User.objects.aget_or_create(
-            provider_user_id=user_data["provider_user_id"],
-            defaults={
-                "email": user_data["email"],
-                "first_name": user_data["first_name"],
-                "last_name": user_data["last_name"],
-                "avatar": user_data["avatar"],
-                "auth_provider": provider
-            }
-        )
-
-        tokens = await sync_to_async(lambda: user.tokens)()
+        # Concurrent logins of one account in this process share a single upsert
+        profile = {name: user_data[name] for name in ("email", "first_name", "last_name", "avatar")}
+        try:
+            user = await login_flights.do(
+                (provider, user_data["provider_user_id"]),
+                lambda: User.objects.aupsert_social(provider, user_data["provider_user_id"], profile)
+            )
+        except IntegrityError:
+            return CustomResponse.error(message="An account with this email already exists", status_code=409)
+        # The profile was refreshed with raw SQL, past User.save
+        user_cache.evict(user.id)
+
+        # Signed in memory, the outstanding token record is written in the background
+        tokens = user.tokens
 
         response_data = {
             "email": user.email,
@@ -0,0 +1,8 @@
+from django.contrib import admin
+from .models import CalendarConnection, CalendarFeedToken, SyncedItem, SyncJob
+
+
+admin.site.register(CalendarConnection)
+admin.site.register(SyncedItem)
+admin.site.register(SyncJob)
+admin.site.register(CalendarFeedToken)
@@ -0,0 +1,239 @@
+"""
+In-memory stand-in for the parts of the Google Calendar and OAuth APIs the sync
+engine uses, served over real HTTP so the engine runs unmodified against it.
+Start it with `manage.py fake_google_calendar` and point the GOOGLE_OAUTH_TOKEN_URL,
+GOOGLE_CALENDAR_API_URL and GOOGLE_CALENDAR_BATCH_URL settings at it.
+"""
+import json
+import threading
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+API_PREFIX = "/calendar/v3"
+BATCH_PATH = "/batch/calendar/v3"
+TOKEN_PATH = "/token"
+
+
+class FakeCalendarStore:
+    """Calendars and events, versioned by a global sequence that backs ETags and sync tokens."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.calendars = {}
+        self.stats = {"http": 0, "token": 0, "batch": 0, "batched": 0, "list": 0, "not_modified": 0}
+        # Sync tokens from an earlier generation are rejected with 410 Gone
+        self.generation = 0
+        # Access tokens rejected with 401, as after a revocation
+        self.revoked = set()
+
+    def _bump(self):
+        self.sequence += 1
+        return self.sequence
+
+    def create_calendar(self, body):
+        calendar_id = f"{uuid.uuid4().hex}@group.calendar.google.com"
+        self.calendars[calendar_id] = {"summary": body.get("summary"), "events": {}, "sequence": self._bump()}
+        return 200, {"kind": "calendar#calendar", "id": calendar_id, "summary": body.get("summary")}
+
+    def _write(self, calendar, event_id, body, status="confirmed"):
+        sequence = self._bump()
+        event = {**body, "id": event_id, "status": body.get("status", status), "etag": f'"{sequence}"', "sequence": sequence}
+        calendar["events"][event_id] = event
+        calendar["sequence"] = sequence
+        return event
+
+    def insert_event(self, calendar, body):
+        event_id = body.get("id") or uuid.uuid4().hex
+        if event_id in calendar["events"]:
+            return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+        return 200, self._write(calendar, event_id, body)
+
+    def update_event(self, calendar, event_id, body):
+        if event_id not in calendar["events"]:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        return 200, self._write(calendar, event_id, body)
+
+    def delete_event(self, calendar, event_id):
+        event = calendar["events"].get(event_id)
+        if event is None:
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        if event["status"] == "cancelled":
+            return 410, {"error": {"code": 410, "message": "Resource has been deleted"}}
+        self._write(calendar, event_id, {"status": "cancelled"}, status="cancelled")
+        return 204, None
+
+    def list_events(self, calendar, params, if_none_match):
+        self.stats["list"] += 1
+        sync_token = params.get("syncToken")
+        since = 0
+        if sync_token:
+            generation, _, since = sync_token.partition(":")
+            since = int(since)
+            if int(generation) != self.generation:
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid, a full sync is required."}}
+
+        etag = f'"{calendar["sequence"]}"'
+        if if_none_match == etag:
+            self.stats["not_modified"] += 1
+            return 304, None
+
+        events = sorted(
+            (event for event in calendar["events"].values() if event["sequence"] > since),
+            key=lambda event: event["sequence"]
+        )
+        if not sync_token and params.get("showDeleted") != "true":
+            events = [event for event in events if event["status"] != "cancelled"]
+
+        offset = int(params.get("pageToken", 0))
+        limit = int(params.get("maxResults", 250))
+        page = {"kind": "calendar#events", "etag": etag, "items": events[offset:offset + limit]}
+        if offset + limit < len(events):
+            page["nextPageToken"] = str(offset + limit)
+        else:
+            page["nextSyncToken"] = f"{self.generation}:{calendar['sequence']}"
+        return 200, page
+
+    def dispatch(self, method, path, params, body, headers):
+        """Routes one API call, returns (status, json_body)."""
+        if not path.startswith(API_PREFIX):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        parts = [unquote(part) for part in path[len(API_PREFIX):].strip("/").split("/")]
+
+        with self.lock:
+            if parts == ["calendars"] and method == "POST":
+                return self.create_calendar(body or {})
+
+            if len(parts) < 3 or parts[0] != "calendars" or parts[2] != "events":
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            calendar = self.calendars.get(parts[1])
+            if calendar is None:
+                return 404, {"error": {"code": 404, "message": "Calendar not found"}}
+
+            if len(parts) == 3:
+                if method == "GET":
+                    return self.list_events(calendar, params, headers.get("If-None-Match"))
+                if method == "POST":
+                    return self.insert_event(calendar, body or {})
+            elif len(parts) == 4:
+                if method == "PUT":
+                    return self.update_event(calendar, parts[3], body or {})
+                if method == "DELETE":
+                    return self.delete_event(calendar, parts[3])
+                if method == "GET":
+                    event = calendar["events"].get(parts[3])
+                    return (200, event) if event else (404, {"error": {"code": 404, "message": "Not Found"}})
+        return 405, {"error": {"code": 405, "message": "Method not allowed"}}
+
+    def edit_event(self, calendar_id, event_id, **changes):
+        """Simulates a change made by the user in their calendar."""
+        with self.lock:
+            calendar = self.calendars[calendar_id]
+            event = calendar["events"][event_id]
+            return self._write(calendar, event_id, {**event, **changes})
+
+    def expire_sync_tokens(self):
+        with self.lock:
+            self.generation += 1
+
+    def revoke_access_token(self, access_token):
+        with self.lock:
+            self.revoked.add(access_token)
+
+
+class FakeCalendarHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status, body=None, content_type="application/json", raw=None):
+        content = raw if raw is not None else (json.dumps(body).encode() if body is not None else b"")
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", content_type)
+        if isinstance(body, dict) and "etag" in body:
+            self.send_header("ETag", body["etag"])
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _handle(self, method):
+        self.store.stats["http"] += 1
+        url = urlparse(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        raw = self._read_body()
+
+        if url.path == TOKEN_PATH:
+            self.store.stats["token"] += 1
+            return self._send(200, {"access_token": f"fake-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"})
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer ") or authorization[len("Bearer "):] in self.store.revoked:
+            return self._send(401, {"error": {"code": 401, "message": "Login Required"}})
+        if url.path == BATCH_PATH and method == "POST":
+            return self._batch(raw)
+
+        body = json.loads(raw) if raw else None
+        status, payload = self.store.dispatch(method, url.path, params, body, self.headers)
+        self._send(status, payload)
+
+    def _batch(self, raw):
+        self.store.stats["batch"] += 1
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+        )
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in message.iter_parts():
+            self.store.stats["batched"] += 1
+            request = part.get_payload(decode=True).replace(b"\r\n", b"\n")
+            head, _, body = request.partition(b"\n\n")
+            request_line, *header_lines = head.decode().split("\n")
+            method, target, _ = request_line.split(" ")
+            headers = dict(line.split(": ", 1) for line in header_lines if line)
+            url = urlparse(target)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+            status, payload = self.store.dispatch(method, url.path, params, json.loads(body) if body.strip() else None, headers)
+            content = json.dumps(payload) if payload is not None else ""
+            content_id = part.get("Content-ID", "").strip("<>")
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\nContent-Type: application/json\r\n\r\n{content}\r\n"
+            )
+        content = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self._send(200, raw=content, content_type=f"multipart/mixed; boundary={boundary}")
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+
+def serve(host="127.0.0.1", port=0, store=None):
+    """Starts the fake server in a background thread and returns it; `server.url` is its base URL."""
+    server = ThreadingHTTPServer((host, port), FakeCalendarHandler)
+    server.store = store or FakeCalendarStore()
+    server.url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,177 @@
+import json
+import uuid
+from datetime import timedelta
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import quote, urlparse
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+
+class CalendarAPIError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class SyncTokenExpired(CalendarAPIError):
+    """The sync token is no longer valid (410 Gone), a full sync is required."""
+
+
+class GoogleOAuthClient:
+    """Exchanges authorization codes and refreshes access tokens for Calendar access."""
+
+    def __init__(self, token_url=None, client_id=None, client_secret=None, timeout=10):
+        self.token_url = token_url or settings.GOOGLE_OAUTH_TOKEN_URL
+        self.client_id = client_id or settings.GOOGLE_OAUTH_CLIENT_ID
+        self.client_secret = client_secret or settings.GOOGLE_OAUTH_CLIENT_SECRET
+        self.timeout = timeout
+
+    def _request(self, data):
+        response = requests.post(
+            self.token_url,
+            data={**data, "client_id": self.client_id, "client_secret": self.client_secret},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise CalendarAPIError(response.status_code, response.text)
+
+        tokens = response.json()
+        tokens["expires_at"] = timezone.now() + timedelta(seconds=tokens.get("expires_in", 3600))
+        return tokens
+
+    def exchange_code(self, code, redirect_uri):
+        return self._request({"grant_type": "authorization_code", "code": code, "redirect_uri": redirect_uri})
+
+    def refresh(self, refresh_token):
+        return self._request({"grant_type": "refresh_token", "refresh_token": refresh_token})
+
+
+class BatchRequest:
+    def __init__(self, method, path, body=None, headers=None):
+        self.method = method
+        self.path = path
+        self.body = body
+        self.headers = headers or {}
+
+
+class BatchResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    @property
+    def ok(self):
+        return 200 <= self.status < 300
+
+
+class GoogleCalendarClient:
+    """
+    Minimal Calendar v3 client. Writes go through the batch endpoint so many
+    event operations share one HTTP round trip; reads use conditional requests.
+    """
+
+    def __init__(self, access_token, api_url=None, batch_url=None, batch_size=None, timeout=30):
+        self.api_url = (api_url or settings.GOOGLE_CALENDAR_API_URL).rstrip("/")
+        self.batch_url = batch_url or settings.GOOGLE_CALENDAR_BATCH_URL
+        self.batch_size = batch_size or settings.GOOGLE_CALENDAR_BATCH_SIZE
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {access_token}"
+
+    @staticmethod
+    def events_path(calendar_id, event_id=None):
+        path = f"/calendars/{quote(calendar_id, safe='')}/events"
+        return f"{path}/{quote(event_id, safe='')}" if event_id else path
+
+    def _check(self, response):
+        if response.status_code == 410:
+            raise SyncTokenExpired(410, response.text)
+        if response.status_code >= 400:
+            raise CalendarAPIError(response.status_code, response.text)
+        return response
+
+    def create_calendar(self, summary, time_zone="UTC"):
+        response = self.session.post(
+            f"{self.api_url}/calendars", json={"summary": summary, "timeZone": time_zone}, timeout=self.timeout
+        )
+        return self._check(response).json()
+
+    def list_changes(self, calendar_id, sync_token=None, etag=None):
+        """
+        Pages through the events changed since `sync_token`, or all events without one.
+        Returns (items, next_sync_token, etag), or None when `etag` shows nothing changed.
+        """
+        items, page_token = [], None
+        params = {"showDeleted": "true", "maxResults": 2500}
+        if sync_token:
+            params["syncToken"] = sync_token
+
+        while True:
+            headers = {"If-None-Match": etag} if etag and page_token is None else {}
+            response = self.session.get(
+                f"{self.api_url}{self.events_path(calendar_id)}",
+                params={**params, "pageToken": page_token} if page_token else params,
+                headers=headers,
+                timeout=self.timeout
+            )
+            if response.status_code == 304:
+                return None
+
+            page = self._check(response).json()
+            items.extend(page.get("items", []))
+            if page_token is None:
+                etag = page.get("etag")
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return items, page.get("nextSyncToken"), etag
+
+    def _encode_batch(self, batch_requests, boundary):
+        prefix = urlparse(self.api_url).path
+        parts = []
+        for index, request in enumerate(batch_requests):
+            lines = [f"{request.method} {prefix}{request.path} HTTP/1.1"]
+            lines.extend(f"{name}: {value}" for name, value in request.headers.items())
+            body = ""
+            if request.body is not None:
+                lines.append("Content-Type: application/json")
+                body = json.dumps(request.body)
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <item-{index}>\r\n\r\n"
+                + "\r\n".join(lines) + "\r\n\r\n" + body + "\r\n"
+            )
+        return ("".join(parts) + f"--{boundary}--\r\n").encode()
+
+    @staticmethod
+    def _decode_batch(content_type, content, count):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + content
+        )
+        responses = [None] * count
+        for part in message.iter_parts():
+            content_id = part.get("Content-ID", "").strip("<>")
+            index = int(content_id.rsplit("-", 1)[-1])
+            payload = part.get_payload(decode=True).replace(b"\r\n", b"\n")
+            status_line, _, rest = payload.partition(b"\n")
+            _, _, body = rest.partition(b"\n\n")
+            status = int(status_line.split()[1])
+            responses[index] = BatchResponse(status, json.loads(body) if body.strip() else None)
+        return responses
+
+    def batch(self, batch_requests):
+        """Sends the requests through the batch endpoint, batch_size per HTTP call, and returns a response per request."""
+        responses = []
+        for offset in range(0, len(batch_requests), self.batch_size):
+            chunk = batch_requests[offset:offset + self.batch_size]
+            boundary = f"batch_{uuid.uuid4().hex}"
+            response = self.session.post(
+                self.batch_url,
+                data=self._encode_batch(chunk, boundary),
+                headers={"Content-Type": f"multipart/mixed; boundary={boundary}"},
+                timeout=self.timeout
+            )
+            self._check(response)
+            responses.extend(self._decode_batch(response.headers["Content-Type"], response.content, len(chunk)))
+        return responses
@@ -0,0 +1,155 @@
+"""
+iCalendar (RFC 5545) rendering of timetables for subscription feeds.
+
+Recurring events are written once with their RRULE; cancelled occurrences
+become EXDATEs and moved or renamed ones RECURRENCE-ID instances, so a feed
+grows with the number of events rather than occurrences. Times carry IANA
+TZIDs, which Google, Apple and Outlook resolve without VTIMEZONE blocks.
+"""
+from datetime import timezone as dt_timezone
+
+
+# Part of every feed ETag, bump it when the rendered output changes
+FEED_FORMAT = 1
+PRODID = "-//ScheduleSync//Timetable feed//EN"
+CONTENT_TYPE = "text/calendar; charset=utf-8"
+
+
+def escape(text):
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def fold(line):
+    """Folds a content line into CRLF-terminated lines of at most 75 octets."""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    parts, current, size, limit = [], [], 0, 75
+    for char in line:
+        width = len(char.encode())
+        if size + width > limit:
+            parts.append("".join(current))
+            # Continuation lines start with a space, which counts towards their 75 octets
+            current, size, limit = [], 0, 74
+        current.append(char)
+        size += width
+    parts.append("".join(current))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _local(name, value, tzinfo):
+    return f"{name};TZID={tzinfo.key}:{value.astimezone(tzinfo).strftime('%Y%m%dT%H%M%S')}"
+
+
+def header(name):
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{escape(name)}",
+    ]
+    return "".join(fold(line) for line in lines)
+
+
+def footer():
+    return "END:VCALENDAR\r\n"
+
+
+def _vevent(uid, stamp, sequence, title, description, location, category, starts_at, ends_at, tzinfo, extra=()):
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{_utc(stamp)}",
+        f"SEQUENCE:{sequence}",
+        _local("DTSTART", starts_at, tzinfo),
+        _local("DTEND", ends_at, tzinfo),
+        *extra,
+        f"SUMMARY:{escape(title)}",
+    ]
+    if description:
+        lines.append(f"DESCRIPTION:{escape(description)}")
+    if location:
+        lines.append(f"LOCATION:{escape(location)}")
+    if category:
+        lines.append(f"CATEGORIES:{escape(category)}")
+    lines.append("END:VEVENT")
+    return "".join(fold(line) for line in lines)
+
+
+def render_event(event, overrides, stamp, category=None):
+    """The VEVENTs of one event (with `schedule` loaded) and its overrides, as a string."""
+    tzinfo = event.schedule.tzinfo
+    uid = f"{event.id}@schedulesync"
+
+    if event.rule is None:
+        # A one-off event can only be changed in place
+        override = overrides[0] if overrides else None
+        if override is not None and override.cancelled:
+            return ""
+        starts_at = (override and override.starts_at) or event.starts_at
+        return _vevent(
+            uid, stamp, event.revision,
+            (override and override.title) or event.title, event.description,
+            (override and override.location) or event.location, category,
+            starts_at, (override and override.ends_at) or starts_at + event.duration, tzinfo
+        )
+
+    extra = [f"RRULE:{event.rule}"]
+    cancelled = [override for override in overrides if override.cancelled]
+    if cancelled:
+        exdates = ",".join(override.original_start.astimezone(tzinfo).strftime("%Y%m%dT%H%M%S") for override in cancelled)
+        extra.append(f"EXDATE;TZID={tzinfo.key}:{exdates}")
+    parts = [_vevent(
+        uid, stamp, event.revision, event.title, event.description, event.location, category,
+        event.starts_at, event.ends_at, tzinfo, extra
+    )]
+
+    for override in overrides:
+        if override.cancelled:
+            continue
+        starts_at = override.starts_at or override.original_start
+        parts.append(_vevent(
+            uid, stamp, event.revision,
+            override.title or event.title, event.description, override.location or event.location, category,
+            starts_at, override.ends_at or starts_at + event.duration, tzinfo,
+            [_local("RECURRENCE-ID", override.original_start, tzinfo)]
+        ))
+    return "".join(parts)
+
+
+async def arender(name, events, overrides, stamp, categories=False, chunk_size=50):
+    """
+    Streams a feed as encoded chunks of about `chunk_size` events. `events` and
+    `overrides` are querysets ordered by event id, and are merged as they are
+    read, so memory does not grow with the size of the timetable.
+    """
+    yield header(name).encode()
+
+    pending = overrides.aiterator(chunk_size=2000).__aiter__()
+    override = await anext(pending, None)
+    buffer = []
+    async for event in events.aiterator(chunk_size=2000):
+        event_overrides = []
+        while override is not None and override.event_id <= event.id:
+            if override.event_id == event.id:
+                event_overrides.append(override)
+            override = await anext(pending, None)
+
+        category = event.schedule.group.name if categories else None
+        buffer.append(render_event(event, event_overrides, stamp, category))
+        if len(buffer) >= chunk_size:
+            yield "".join(buffer).encode()
+            buffer = []
+
+    buffer.append(footer())
+    yield "".join(buffer).encode()
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.calendars.fake import API_PREFIX, BATCH_PATH, TOKEN_PATH, serve
+
+
+class Command(BaseCommand):
+    help = "Runs an in-memory fake of the Google Calendar and OAuth token APIs for local calendar sync runs."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+
+    def handle(self, *args, **options):
+        server = serve(options["host"], options["port"])
+        self.stdout.write(f"GOOGLE_OAUTH_TOKEN_URL={server.url}{TOKEN_PATH}")
+        self.stdout.write(f"GOOGLE_CALENDAR_API_URL={server.url}{API_PREFIX}")
+        self.stdout.write(f"GOOGLE_CALENDAR_BATCH_URL={server.url}{BATCH_PATH}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.shutdown()
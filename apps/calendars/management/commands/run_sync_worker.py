@@ -0,0 +1,29 @@
+import asyncio
+import signal
+
+from django.core.management.base import BaseCommand
+from apps.calendars.worker import SyncWorker
+
+
+class Command(BaseCommand):
+    help = "Runs queued calendar sync jobs until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, help="Jobs run at once (default SYNC_WORKER_CONCURRENCY)")
+        parser.add_argument(
+            "--provider-concurrency", type=int,
+            help="Jobs run at once against one calendar provider (default SYNC_WORKER_PROVIDER_CONCURRENCY)"
+        )
+        parser.add_argument("--drain", action="store_true", help="Exit once no job is due instead of polling")
+
+    def handle(self, *args, **options):
+        processed = asyncio.run(self._run(options))
+        self.stdout.write(f"Processed {processed} jobs")
+
+    async def _run(self, options):
+        worker = SyncWorker(concurrency=options["concurrency"], provider_concurrency=options["provider_concurrency"])
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            # Stop claiming and let running jobs finish
+            loop.add_signal_handler(sig, worker.stop)
+        return await worker.run(drain=options["drain"])
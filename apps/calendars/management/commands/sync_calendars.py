@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from apps.calendars.google import CalendarAPIError
+from apps.calendars.models import CalendarConnection
+from apps.calendars.sync import CalendarSyncEngine
+
+
+class Command(BaseCommand):
+    help = "Pushes group timetables to the connected Google Calendars, sending only what changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", action="append", help="Only sync these user emails (repeatable)")
+        parser.add_argument("--force", action="store_true", help="Diff every item even if nothing seems to have changed")
+
+    def handle(self, *args, **options):
+        connections = CalendarConnection.objects.filter(is_active=True).select_related("user").order_by("id")
+        if options["user"]:
+            connections = connections.filter(user__email__in=options["user"])
+
+        for connection in connections.iterator():
+            try:
+                result = CalendarSyncEngine(connection).sync(force=options["force"])
+            except CalendarAPIError as e:
+                self.stderr.write(self.style.ERROR(f"{connection.user.email}: {e}"))
+                continue
+
+            if result.unchanged:
+                self.stdout.write(f"{connection.user.email}: unchanged")
+            else:
+                self.stdout.write(
+                    f"{connection.user.email}: {result.inserted} inserted, {result.updated} updated, "
+                    f"{result.deleted} deleted, {len(result.failed)} failed"
+                )
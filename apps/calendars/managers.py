@@ -0,0 +1,173 @@
+import uuid
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, connections, router
+from django.db.models import Count, Min, Q, Sum
+from django.utils import timezone
+from apps.common.managers import GetOrNoneManager
+from apps.groups.models import GroupMembership
+
+
+class SyncJobManager(GetOrNoneManager):
+    """
+    Postgres-backed job queue. Enqueueing is one upsert against the partial unique
+    index on pending jobs, so repeated edits only bump `coalesced`, and workers
+    claim due jobs with FOR UPDATE SKIP LOCKED so they never block each other.
+    """
+
+    def _execute(self, sql, params):
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else []
+
+    @property
+    def _table(self):
+        return self.model._meta.db_table
+
+    def _upsert_sql(self, source_sql):
+        return f"""
+            INSERT INTO {self._table} (
+                id, created_at, updated_at, kind, target_id, provider, status,
+                run_at, attempts, coalesced, locked_by, last_error
+            )
+            {source_sql}
+            ON CONFLICT (kind, target_id) WHERE status = 'pending' DO UPDATE
+                SET coalesced = {self._table}.coalesced + 1, updated_at = EXCLUDED.updated_at
+        """
+
+    def enqueue(self, kind, target_ids, provider="", delay=timedelta(0)):
+        """Enqueues a job per target, or merges into the target's pending job."""
+        target_ids = list(dict.fromkeys(target_ids))
+        if not target_ids:
+            return
+        now = timezone.now()
+        sql = self._upsert_sql("""
+            SELECT new.id, %s, %s, %s, new.target_id, %s, 'pending', %s, 0, 0, '', ''
+            FROM unnest(%s::uuid[], %s::uuid[]) AS new(id, target_id)
+        """)
+        ids = [uuid.uuid4() for _ in target_ids]
+        self._execute(sql, [now, now, kind, provider, now + delay, ids, target_ids])
+
+    @property
+    def _connection_table(self):
+        return self.model._meta.apps.get_model("calendars", "CalendarConnection")._meta.db_table
+
+    def enqueue_users(self, user_ids, provider, delay=timedelta(0)):
+        """Enqueues a sync for the given users that have an active calendar connection."""
+        now = timezone.now()
+        sql = self._upsert_sql(f"""
+            SELECT gen_random_uuid(), %s, %s, 'user', c.user_id, %s, 'pending', %s, 0, 0, '', ''
+            FROM {self._connection_table} c
+            WHERE c.user_id = ANY(%s) AND c.is_active
+        """)
+        self._execute(sql, [now, now, provider, now + delay, list(user_ids)])
+
+    def fan_out(self, group_id, provider):
+        """Enqueues a sync for every active member of the group with an active calendar connection."""
+        now = timezone.now()
+        sql = self._upsert_sql(f"""
+            SELECT gen_random_uuid(), %s, %s, 'user', c.user_id, %s, 'pending', %s, 0, 0, '', ''
+            FROM {self._connection_table} c
+            JOIN {GroupMembership._meta.db_table} m ON m.user_id = c.user_id
+            WHERE m.group_id = %s AND m.active AND c.is_active
+        """)
+        self._execute(sql, [now, now, provider, now, group_id])
+
+    async def aenqueue_group(self, group_id):
+        """Schedules a group's members for sync after a change to its timetable; one row however large the group."""
+        return await sync_to_async(self.enqueue)("group", [group_id], delay=settings.SYNC_JOB_DEBOUNCE)
+
+    async def aenqueue_import(self, import_id):
+        """Queues an uploaded event import, to run as soon as a worker is free."""
+        return await sync_to_async(self.enqueue)("import", [import_id])
+
+    async def aenqueue_users(self, user_ids, provider, delay=None):
+        delay = settings.SYNC_JOB_DEBOUNCE if delay is None else delay
+        return await sync_to_async(self.enqueue_users)(user_ids, provider, delay)
+
+    def claim(self, worker_id, limit, lease):
+        """
+        Locks up to `limit` due jobs for `worker_id` and returns them. Jobs still
+        running past their lease (their worker presumably died) are claimed again,
+        and a target that already has a running job is skipped, so one user never
+        syncs twice at once.
+        """
+        now = timezone.now()
+        expired = now - lease
+        sql = f"""
+            UPDATE {self._table} SET status = 'running', locked_at = %s, locked_by = %s,
+                attempts = attempts + 1, updated_at = %s
+            WHERE id IN (
+                SELECT j.id FROM {self._table} j
+                WHERE ((j.status = 'pending' AND j.run_at <= %s) OR (j.status = 'running' AND j.locked_at < %s))
+                  AND NOT EXISTS (
+                      SELECT 1 FROM {self._table} r
+                      WHERE r.kind = j.kind AND r.target_id = j.target_id AND r.id <> j.id
+                        AND r.status = 'running' AND r.locked_at >= %s
+                  )
+                ORDER BY j.run_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id
+        """
+        ids = [row[0] for row in self._execute(sql, [now, worker_id, now, now, expired, expired, limit])]
+        return list(self.filter(id__in=ids).order_by("run_at")) if ids else []
+
+    def complete(self, job_ids):
+        self.filter(id__in=job_ids, status="running").delete()
+
+    def retry(self, job, error, delay):
+        """
+        Puts a failed job back as pending after `delay`. When the target was enqueued
+        again while it ran, that pending job takes over the backoff instead.
+        """
+        now = timezone.now()
+        params = [now + delay, job.attempts, error, now, job.kind, job.target_id]
+        sql = f"""
+            WITH pending AS (
+                UPDATE {self._table}
+                SET run_at = GREATEST(run_at, %s), attempts = GREATEST(attempts, %s),
+                    last_error = %s, coalesced = coalesced + 1, updated_at = %s
+                WHERE kind = %s AND target_id = %s AND status = 'pending'
+                RETURNING id
+            ), dropped AS (
+                DELETE FROM {self._table} WHERE id = %s AND EXISTS (SELECT 1 FROM pending)
+            )
+            UPDATE {self._table}
+            SET status = 'pending', run_at = %s, locked_at = NULL, locked_by = '', last_error = %s, updated_at = %s
+            WHERE id = %s AND NOT EXISTS (SELECT 1 FROM pending)
+        """
+        try:
+            self._execute(sql, [*params, job.id, now + delay, error, now, job.id])
+        except IntegrityError:
+            # Enqueued again in between: the new pending job covers this one
+            self.filter(id=job.id).delete()
+
+    def fail(self, job, error):
+        self.filter(id=job.id).update(status="failed", locked_at=None, locked_by="", last_error=error)
+
+    def stats(self):
+        """Queue depth, lag of the oldest due job and coalescing, in one aggregate query."""
+        now = timezone.now()
+        pending = Q(status="pending")
+        due = pending & Q(run_at__lte=now)
+        stats = self.aggregate(
+            pending=Count("id", filter=pending),
+            due=Count("id", filter=due),
+            running=Count("id", filter=Q(status="running")),
+            failed=Count("id", filter=Q(status="failed")),
+            pending_users=Count("id", filter=pending & Q(kind="user")),
+            pending_groups=Count("id", filter=pending & Q(kind="group")),
+            coalesced=Sum("coalesced", filter=pending),
+            oldest_due=Min("run_at", filter=due),
+        )
+        oldest_due = stats.pop("oldest_due")
+        stats["coalesced"] = stats["coalesced"] or 0
+        stats["lag_seconds"] = round((now - oldest_due).total_seconds(), 3) if oldest_due else 0
+        return stats
+
+    async def astats(self):
+        return await sync_to_async(self.stats)()
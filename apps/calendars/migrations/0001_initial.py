@@ -0,0 +1,56 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:00
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarConnection',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('refresh_token', models.TextField()),
+                ('access_token', models.TextField(blank=True, default='')),
+                ('access_token_expires_at', models.DateTimeField(blank=True, null=True)),
+                ('calendar_id', models.CharField(blank=True, default='', max_length=255)),
+                ('sync_token', models.TextField(blank=True, default='')),
+                ('list_etag', models.CharField(blank=True, default='', max_length=255)),
+                ('source_fingerprint', models.CharField(blank=True, default='', max_length=64)),
+                ('last_synced_at', models.DateTimeField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_connection', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncedItem',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('key', models.CharField(max_length=100)),
+                ('google_event_id', models.CharField(max_length=100)),
+                ('fingerprint', models.CharField(blank=True, default='', max_length=64)),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('connection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='calendars.calendarconnection')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['connection', 'google_event_id'], name='synceditem_google_id_idx')],
+                'unique_together': {('connection', 'key')},
+            },
+        ),
+    ]
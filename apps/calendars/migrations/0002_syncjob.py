@@ -0,0 +1,36 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:04
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendars', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('kind', models.CharField(choices=[('group', 'Group fan-out'), ('user', 'User sync')], max_length=10)),
+                ('target_id', models.UUIDField()),
+                ('provider', models.CharField(blank=True, default='', max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('run_at', models.DateTimeField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('coalesced', models.PositiveIntegerField(default=0)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('last_error', models.TextField(blank=True, default='')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'pending')), fields=['run_at'], name='syncjob_due_idx'), models.Index(condition=models.Q(('status', 'running')), fields=['kind', 'target_id'], name='syncjob_running_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('kind', 'target_id'), name='syncjob_pending_uniq')],
+            },
+        ),
+    ]
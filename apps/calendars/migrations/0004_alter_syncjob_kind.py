@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calendars', '0003_calendarfeedtoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='syncjob',
+            name='kind',
+            field=models.CharField(choices=[('group', 'Group fan-out'), ('user', 'User sync'), ('import', 'Event import')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,119 @@
+import secrets
+
+from django.db import models
+from apps.common.models import BaseModel
+from apps.accounts.models import User
+from .managers import SyncJobManager
+
+
+PROVIDER_GOOGLE = "google"
+
+
+def new_feed_token():
+    return secrets.token_urlsafe(32)
+
+
+class CalendarConnection(BaseModel):
+    """A user's Google Calendar access and the state of their last sync."""
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="calendar_connection")
+    refresh_token = models.TextField()
+    access_token = models.TextField(blank=True, default="")
+    access_token_expires_at = models.DateTimeField(null=True, blank=True)
+    # Dedicated calendar the group timetables are pushed to
+    calendar_id = models.CharField(max_length=255, blank=True, default="")
+    # Incremental sync state of that calendar, from events.list
+    sync_token = models.TextField(blank=True, default="")
+    list_etag = models.CharField(max_length=255, blank=True, default="")
+    # Digest of the events the last successful sync pushed, unchanged means nothing to diff
+    source_fingerprint = models.CharField(max_length=64, blank=True, default="")
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.user.full_name} - Google Calendar"
+
+
+class SyncedItem(BaseModel):
+    """
+    One calendar event pushed to a connection: a schedule event (`event:<id>`), or a
+    moved or renamed occurrence pushed on its own (`override:<id>`).
+    """
+
+    connection = models.ForeignKey(CalendarConnection, on_delete=models.CASCADE, related_name="items")
+    key = models.CharField(max_length=100)
+    google_event_id = models.CharField(max_length=100)
+    # Digest of the pushed payload; an empty fingerprint forces the next sync to push again
+    fingerprint = models.CharField(max_length=64, blank=True, default="")
+    etag = models.CharField(max_length=255, blank=True, default="")
+
+    class Meta:
+        unique_together = ("connection", "key")
+        indexes = [
+            models.Index(fields=["connection", "google_event_id"], name="synceditem_google_id_idx"),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class SyncJob(BaseModel):
+    """
+    A durable unit of calendar work, claimed by `run_sync_worker` with SKIP LOCKED.
+    `group` jobs fan out into one `user` job per connected member; at most one job
+    per target is pending, so a burst of edits coalesces into a single sync.
+    `import` jobs run event imports off the request that uploaded them.
+    """
+
+    KIND_CHOICES = [
+        ("group", "Group fan-out"),
+        ("user", "User sync"),
+        ("import", "Event import"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Group id for fan-out jobs, user id for sync jobs, EventImport id for imports
+    target_id = models.UUIDField()
+    # Calendar provider the job talks to, bounds its concurrency; empty for fan-out jobs
+    provider = models.CharField(max_length=20, blank=True, default="")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    # Enqueues merged into this job while it was pending
+    coalesced = models.PositiveIntegerField(default=0)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    objects = SyncJobManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "target_id"], condition=models.Q(status="pending"), name="syncjob_pending_uniq"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["run_at"], condition=models.Q(status="pending"), name="syncjob_due_idx"),
+            models.Index(fields=["kind", "target_id"], condition=models.Q(status="running"), name="syncjob_running_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.target_id} ({self.status})"
+
+
+class CalendarFeedToken(BaseModel):
+    """
+    Secret in the URL of a user's iCalendar feed; calendar apps subscribing to a
+    feed cannot send credentials. Rotating it revokes the old URL.
+    """
+
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="calendar_feed")
+    token = models.CharField(max_length=64, unique=True, default=new_feed_token)
+
+    def __str__(self):
+        return f"{self.user.full_name} - calendar feed"
@@ -0,0 +1,28 @@
+from rest_framework import serializers
+
+
+class CalendarConnectSerializer(serializers.Serializer):
+    code = serializers.CharField()
+    redirect_uri = serializers.CharField()
+
+
+class CalendarConnectionSerializer(serializers.Serializer):
+    calendar_id = serializers.CharField()
+    is_active = serializers.BooleanField()
+    last_synced_at = serializers.DateTimeField()
+
+
+class CalendarFeedSerializer(serializers.Serializer):
+    url = serializers.CharField()
+    updated_at = serializers.DateTimeField()
+
+
+class SyncQueueStatsSerializer(serializers.Serializer):
+    pending = serializers.IntegerField()
+    due = serializers.IntegerField()
+    running = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    pending_users = serializers.IntegerField()
+    pending_groups = serializers.IntegerField()
+    coalesced = serializers.IntegerField()
+    lag_seconds = serializers.FloatField()
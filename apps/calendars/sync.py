@@ -0,0 +1,297 @@
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from apps.schedules.models import Event, EventOverride
+from .google import BatchRequest, CalendarAPIError, GoogleCalendarClient, GoogleOAuthClient, SyncTokenExpired
+from .models import SyncedItem
+
+
+# Private extended property that marks the events ScheduleSync owns
+ITEM_PROPERTY = "schedulesync"
+
+
+def digest(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def google_event_id(connection, key):
+    # Client-chosen ids (base32hex) make a retried insert a conflict rather than a duplicate
+    return hashlib.sha1(f"{connection.id}:{key}".encode()).hexdigest()
+
+
+def _when(value, tz):
+    return {"dateTime": value.astimezone(tz).isoformat(), "timeZone": tz.key}
+
+
+def _payload(key, title, description, location, starts_at, ends_at, tz, recurrence=None):
+    payload = {
+        "summary": title,
+        "description": description or "",
+        "location": location or "",
+        "start": _when(starts_at, tz),
+        "end": _when(ends_at, tz),
+        "status": "confirmed",
+        "extendedProperties": {"private": {ITEM_PROPERTY: key}},
+    }
+    if recurrence:
+        payload["recurrence"] = recurrence
+    return payload
+
+
+def desired_items(user):
+    """
+    Returns ({key: payload}, source_fingerprint) for the events of the user's active groups.
+    Recurring events are pushed as one recurring calendar event; the occurrences
+    their overrides touch are excluded from it and pushed on their own unless cancelled.
+    """
+    events = list(
+        Event.objects
+        .filter(
+            schedule__group__groupmembership__user=user,
+            schedule__group__groupmembership__active=True,
+            schedule__group__is_active=True,
+            schedule__is_active=True,
+        )
+        .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=timezone.now()))
+        .select_related("schedule")
+        .order_by("id")
+    )
+    overrides = {}
+    for override in EventOverride.objects.filter(event__in=[event.id for event in events]).order_by("original_start"):
+        overrides.setdefault(override.event_id, []).append(override)
+
+    items = {}
+    for event in events:
+        tz = event.schedule.tzinfo
+        key = f"event:{event.id}"
+        event_overrides = overrides.get(event.id, [])
+
+        if event.rule is None:
+            override = event_overrides[0] if event_overrides else None
+            if override is not None and override.cancelled:
+                continue
+            starts_at = (override and override.starts_at) or event.starts_at
+            items[key] = _payload(
+                key,
+                (override and override.title) or event.title,
+                event.description,
+                (override and override.location) or event.location,
+                starts_at,
+                (override and override.ends_at) or starts_at + event.duration,
+                tz
+            )
+            continue
+
+        recurrence = [f"RRULE:{event.rule}"]
+        if event_overrides:
+            exdates = ",".join(override.original_start.astimezone(tz).strftime("%Y%m%dT%H%M%S") for override in event_overrides)
+            recurrence.append(f"EXDATE;TZID={tz.key}:{exdates}")
+        items[key] = _payload(
+            key, event.title, event.description, event.location, event.starts_at, event.ends_at, tz, recurrence
+        )
+
+        for override in event_overrides:
+            if override.cancelled:
+                continue
+            override_key = f"override:{override.id}"
+            starts_at = override.starts_at or override.original_start
+            items[override_key] = _payload(
+                override_key,
+                override.title or event.title,
+                event.description,
+                override.location or event.location,
+                starts_at,
+                override.ends_at or starts_at + event.duration,
+                tz
+            )
+
+    source_fingerprint = digest(sorted((str(event.id), event.revision, event.schedule.timezone) for event in events))
+    return items, source_fingerprint
+
+
+@dataclass
+class SyncResult:
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: list = field(default_factory=list)
+    unchanged: bool = False
+
+
+class CalendarSyncEngine:
+    """
+    Pushes a user's group timetables to their Google Calendar incrementally.
+
+    Every pushed event is recorded as a SyncedItem with the fingerprint of its
+    payload and the ETag Google returned. A sync diffs the desired payloads against
+    those records and sends only the inserts, updates and deletes through the batch
+    endpoint. Changes made in the calendar itself are pulled with the sync token:
+    items whose ETag is not the one recorded were edited or deleted remotely and are
+    pushed again. When neither side changed, a sync is one conditional request.
+    """
+
+    def __init__(self, connection, oauth=None, client_class=GoogleCalendarClient):
+        self.connection = connection
+        self.oauth = oauth or GoogleOAuthClient()
+        self.client_class = client_class
+
+    def _refresh_access_token(self):
+        connection = self.connection
+        tokens = self.oauth.refresh(connection.refresh_token)
+        connection.access_token = tokens["access_token"]
+        connection.access_token_expires_at = tokens["expires_at"]
+        connection.refresh_token = tokens.get("refresh_token") or connection.refresh_token
+        connection.save(update_fields=["access_token", "access_token_expires_at", "refresh_token", "updated_at"])
+
+    def _client(self):
+        expires_at = self.connection.access_token_expires_at
+        if not self.connection.access_token or expires_at is None or expires_at <= timezone.now() + settings.GOOGLE_CALENDAR_TOKEN_LEEWAY:
+            self._refresh_access_token()
+        return self.client_class(self.connection.access_token)
+
+    def sync(self, force=False):
+        try:
+            return self._sync(self._client(), force)
+        except CalendarAPIError as e:
+            if e.status != 401:
+                raise
+            # Revoked or expired early: one retry with a fresh token
+            self._refresh_access_token()
+            return self._sync(self.client_class(self.connection.access_token), force)
+
+    def _ensure_calendar(self, client):
+        connection = self.connection
+        if not connection.calendar_id:
+            calendar = client.create_calendar(settings.GOOGLE_CALENDAR_NAME)
+            connection.calendar_id = calendar["id"]
+            connection.sync_token = connection.list_etag = connection.source_fingerprint = ""
+            connection.items.all().delete()
+
+    def _pull(self, client, records):
+        """
+        Applies remote changes since the last sync token to `records` and returns the
+        records that now need to be pushed again. An empty list costs one 304 response.
+        """
+        connection = self.connection
+        try:
+            result = client.list_changes(connection.calendar_id, connection.sync_token or None, connection.list_etag or None)
+        except SyncTokenExpired:
+            connection.sync_token = connection.list_etag = ""
+            result = client.list_changes(connection.calendar_id)
+        if result is None:
+            return []
+
+        items, sync_token, etag = result
+        full_sync = not connection.sync_token
+        connection.sync_token, connection.list_etag = sync_token or "", etag or ""
+
+        remote = {item["id"]: item for item in items}
+        stale = []
+        for record in records.values():
+            item = remote.get(record.google_event_id)
+            if item is None and not full_sync:
+                continue
+            # Our own writes come back with the ETag we recorded; anything else was changed in the calendar
+            if item is None or item.get("status") == "cancelled" or item.get("etag") != record.etag:
+                if record.fingerprint:
+                    record.fingerprint = ""
+                    stale.append(record)
+        return stale
+
+    def _requests(self, client, operations):
+        calendar_id = self.connection.calendar_id
+        requests = []
+        for action, record, payload in operations:
+            if action == "insert":
+                requests.append(BatchRequest("POST", client.events_path(calendar_id), {**payload, "id": record.google_event_id}))
+            elif action == "update":
+                requests.append(BatchRequest("PUT", client.events_path(calendar_id, record.google_event_id), payload))
+            else:
+                requests.append(BatchRequest("DELETE", client.events_path(calendar_id, record.google_event_id)))
+        return requests
+
+    def _push(self, client, operations, result):
+        """Sends the operations in batches and returns (saved, deleted) records; conflicts are retried once."""
+        saved, deleted = [], []
+        for attempt in range(2):
+            retries = []
+            responses = client.batch(self._requests(client, operations)) if operations else []
+            for (action, record, payload), response in zip(operations, responses):
+                status = response.status if response is not None else 0
+                if action == "delete":
+                    # Already gone counts as deleted
+                    if status in (200, 204, 404, 410):
+                        deleted.append(record)
+                        result.deleted += 1
+                    else:
+                        result.failed.append((record.key, status))
+                elif response is not None and response.ok:
+                    record.fingerprint = digest(payload)
+                    record.etag = response.body.get("etag", "")
+                    saved.append(record)
+                    if action == "insert":
+                        result.inserted += 1
+                    else:
+                        result.updated += 1
+                elif attempt == 0 and (action, status) in (("insert", 409), ("update", 404), ("update", 410)):
+                    # The calendar already has it (an interrupted earlier push), or no longer has it
+                    retries.append(("update" if action == "insert" else "insert", record, payload))
+                else:
+                    result.failed.append((record.key, status))
+            operations = retries
+        return saved, deleted
+
+    def _sync(self, client, force):
+        connection = self.connection
+        result = SyncResult()
+        self._ensure_calendar(client)
+
+        items, source_fingerprint = desired_items(connection.user)
+        records = {record.key: record for record in connection.items.all()}
+        stale = self._pull(client, records)
+
+        if not stale and not force and source_fingerprint == connection.source_fingerprint:
+            result.unchanged = True
+            connection.last_synced_at = timezone.now()
+            connection.save(update_fields=["calendar_id", "sync_token", "list_etag", "last_synced_at", "updated_at"])
+            return result
+
+        operations = []
+        for key, payload in items.items():
+            record = records.get(key)
+            if record is None:
+                record = SyncedItem(connection=connection, key=key, google_event_id=google_event_id(connection, key))
+                operations.append(("insert", record, payload))
+            elif record.fingerprint != digest(payload):
+                operations.append(("update", record, payload))
+        operations.extend(("delete", record, None) for key, record in records.items() if key not in items)
+
+        saved, deleted = self._push(client, operations, result)
+        deleted_keys = {record.key for record in deleted}
+        changed = {record.key: record for record in [*stale, *saved]}
+        if operations:
+            # Move the sync token past our own writes so the next sync of an unchanged calendar is a 304
+            current = {key: record for key, record in {**records, **changed}.items() if key not in deleted_keys}
+            changed.update((record.key, record) for record in self._pull(client, current))
+
+        changed = [record for key, record in changed.items() if key not in deleted_keys]
+        if changed:
+            SyncedItem.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=["connection", "key"],
+                update_fields=["google_event_id", "fingerprint", "etag", "updated_at"]
+            )
+        if deleted_keys:
+            SyncedItem.objects.filter(connection=connection, key__in=deleted_keys).delete()
+
+        connection.source_fingerprint = "" if result.failed else source_fingerprint
+        connection.last_synced_at = timezone.now()
+        connection.save(update_fields=[
+            "calendar_id", "sync_token", "list_etag", "source_fingerprint", "last_synced_at", "updated_at"
+        ])
+        return result
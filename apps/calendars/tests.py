@@ -0,0 +1,301 @@
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.accounts.models import User
+from apps.groups.models import Group, GroupMembership
+from apps.schedules.models import Event, EventOverride, Schedule
+from . import fake, ics
+from .models import CalendarConnection, CalendarFeedToken
+from .sync import CalendarSyncEngine
+
+
+class FakeCalendarTestCase(TestCase):
+    """Runs against the fake Calendar server, started once per class."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = fake.serve()
+        cls.settings_override = override_settings(
+            GOOGLE_OAUTH_TOKEN_URL=f"{cls.server.url}{fake.TOKEN_PATH}",
+            GOOGLE_CALENDAR_API_URL=f"{cls.server.url}{fake.API_PREFIX}",
+            GOOGLE_CALENDAR_BATCH_URL=f"{cls.server.url}{fake.BATCH_PATH}",
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.store = self.server.store = fake.FakeCalendarStore()
+        self.user = User.objects.create(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+        self.group = Group.objects.create(name="Algebra", created_by=self.user)
+        GroupMembership.objects.create(user=self.user, group=self.group, role="admin")
+        self.schedule = Schedule.objects.create(group=self.group, name="Term", timezone="Europe/London", created_by=self.user)
+        self.connection = CalendarConnection.objects.create(
+            user=self.user, refresh_token="refresh", access_token="access",
+            access_token_expires_at=timezone.now() + timedelta(hours=1)
+        )
+
+    def add_event(self, title, days=1, **fields):
+        starts_at = timezone.now().replace(microsecond=0) + timedelta(days=days)
+        return Event.objects.create(
+            schedule=self.schedule, title=title, starts_at=starts_at, ends_at=starts_at + timedelta(hours=1), **fields
+        )
+
+    def sync(self, **kwargs):
+        self.connection.refresh_from_db()
+        return CalendarSyncEngine(self.connection).sync(**kwargs)
+
+    def remote_events(self):
+        calendar = self.store.calendars[self.connection.calendar_id]
+        return {event["summary"]: event for event in calendar["events"].values() if event["status"] != "cancelled"}
+
+
+class CalendarSyncEngineTests(FakeCalendarTestCase):
+
+    def test_first_sync_inserts_every_event(self):
+        self.add_event("Lecture")
+        self.add_event("Lab", rrule="FREQ=WEEKLY;COUNT=10")
+
+        result = self.sync()
+
+        self.assertEqual((result.inserted, result.updated, result.deleted, result.failed), (2, 0, 0, []))
+        remote = self.remote_events()
+        self.assertEqual(set(remote), {"Lecture", "Lab"})
+        self.assertEqual(remote["Lab"]["recurrence"], ["RRULE:FREQ=WEEKLY;COUNT=10"])
+        self.assertEqual(self.connection.items.count(), 2)
+
+    def test_only_changed_events_are_pushed(self):
+        lecture = self.add_event("Lecture")
+        lab = self.add_event("Lab", days=2)
+        self.add_event("Seminar", days=3)
+        self.sync()
+
+        lecture.title = "Lecture (moved)"
+        lecture.save()
+        lab.delete()
+        self.add_event("Tutorial", days=4)
+        result = self.sync()
+
+        self.assertEqual((result.inserted, result.updated, result.deleted), (1, 1, 1))
+        self.assertEqual(set(self.remote_events()), {"Lecture (moved)", "Seminar", "Tutorial"})
+        self.assertEqual(self.connection.items.count(), 3)
+
+    @override_settings(GOOGLE_CALENDAR_BATCH_SIZE=2)
+    def test_writes_are_grouped_into_batches(self):
+        for day in range(5):
+            self.add_event(f"Lecture {day}", days=day + 1)
+
+        self.sync()
+
+        self.assertEqual(self.store.stats["batch"], 3)
+        self.assertEqual(self.store.stats["batched"], 5)
+
+    def test_unchanged_sync_is_one_conditional_request(self):
+        self.add_event("Lecture")
+        self.sync()
+        stats = dict(self.store.stats)
+
+        result = self.sync()
+
+        self.assertTrue(result.unchanged)
+        self.assertEqual(self.store.stats["http"] - stats["http"], 1)
+        self.assertEqual(self.store.stats["not_modified"] - stats["not_modified"], 1)
+        self.assertEqual(self.store.stats["batch"], stats["batch"])
+
+    def test_remote_edits_are_pushed_again(self):
+        self.add_event("Lecture")
+        self.sync()
+        item = self.connection.items.get()
+        self.store.edit_event(self.connection.calendar_id, item.google_event_id, summary="Edited in Google")
+
+        result = self.sync()
+
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(set(self.remote_events()), {"Lecture"})
+
+    def test_expired_sync_token_falls_back_to_a_full_sync(self):
+        self.add_event("Lecture")
+        self.sync()
+        self.store.expire_sync_tokens()
+
+        result = self.sync()
+
+        self.assertTrue(result.unchanged)
+        self.assertTrue(self.connection.sync_token.startswith("1:"))
+
+    def test_revoked_access_token_is_refreshed_once(self):
+        self.add_event("Lecture")
+        self.store.revoke_access_token("access")
+
+        result = self.sync()
+
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual(self.store.stats["token"], 1)
+        self.connection.refresh_from_db()
+        self.assertNotEqual(self.connection.access_token, "access")
+
+    def test_expiring_access_token_is_refreshed_before_syncing(self):
+        CalendarConnection.objects.filter(pk=self.connection.pk).update(access_token_expires_at=timezone.now())
+        self.store.revoke_access_token("access")
+
+        result = self.sync()
+
+        self.assertEqual(result.failed, [])
+        self.assertEqual(self.store.stats["token"], 1)
+
+
+class CalendarConnectAPITests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+    def test_unreachable_token_endpoint_is_an_error_response(self):
+        with mock.patch("apps.calendars.google.requests.post", side_effect=requests.ConnectTimeout()):
+            response = self.client.post(
+                reverse("calendar-connect"), {"code": "code", "redirect_uri": "https://example.com/"},
+                content_type="application/json", headers=self.headers
+            )
+
+        self.assertEqual(response.status_code, 502)
+        self.assertEqual(response.json()["status"], "error")
+        self.assertFalse(CalendarConnection.objects.exists())
+
+
+def unfold(body):
+    return body.replace("\r\n ", "").split("\r\n")
+
+
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+        self.groups = [Group.objects.create(name=name, created_by=self.user) for name in ("Algebra", "Botany")]
+        for group in self.groups:
+            GroupMembership.objects.create(user=self.user, group=group, role="admin")
+        self.schedule = Schedule.objects.create(group=self.groups[0], name="Term", timezone="Europe/London", created_by=self.user)
+        starts_at = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        self.event = Event.objects.create(
+            schedule=self.schedule, title="Lecture", starts_at=starts_at, ends_at=starts_at + timedelta(hours=1),
+            rrule="FREQ=WEEKLY;COUNT=10"
+        )
+        self.group_url = reverse("group-calendar-feed", kwargs={"group_slug": self.groups[0].slug})
+
+    async def body(self, response):
+        return b"".join([chunk async for chunk in response.streaming_content]).decode()
+
+    def test_group_feed_revalidation_does_not_read_events(self):
+        etag = async_to_sync(self.async_client.get)(self.group_url)["ETag"]
+
+        # Sync, so the queries are captured on this thread's connection, which the view's run on
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.group_url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertTrue(queries)
+        self.assertFalse([query for query in queries if Event._meta.db_table in query["sql"]])
+
+    async def test_group_feed_etag_moves_on_edits(self):
+        first = (await self.async_client.get(self.group_url))["ETag"]
+
+        self.event.title = "Seminar"
+        await self.event.asave()
+        second = await self.async_client.get(self.group_url, headers={"If-None-Match": first})
+        self.assertEqual(second.status_code, 200)
+        self.assertIn("SUMMARY:Seminar", await self.body(second))
+
+        await EventOverride.objects.acreate(event=self.event, original_start=self.event.starts_at, cancelled=True)
+        third = await self.async_client.get(self.group_url, headers={"If-None-Match": second["ETag"]})
+        self.assertEqual(third.status_code, 200)
+        self.assertIn("EXDATE;TZID=Europe/London:", await self.body(third))
+
+    async def test_personal_feed_is_modified_by_leaving_a_group(self):
+        feed = await CalendarFeedToken.objects.acreate(user=self.user)
+        url = reverse("user-calendar-feed", kwargs={"token": feed.token})
+        # Everything happened an hour ago, so the leave below is strictly later
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        await Group.objects.filter(created_by=self.user).aupdate(timetable_updated_at=an_hour_ago, updated_at=an_hour_ago)
+        await GroupMembership.objects.filter(user=self.user).aupdate(updated_at=an_hour_ago)
+        await CalendarFeedToken.objects.filter(pk=feed.pk).aupdate(updated_at=an_hour_ago)
+        last_modified = (await self.async_client.get(url))["Last-Modified"]
+
+        await GroupMembership.objects.filter(user=self.user, group=self.groups[1]).aupdate(
+            active=False, updated_at=timezone.now()
+        )
+        response = await self.async_client.get(url, headers={"If-Modified-Since": last_modified})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["Last-Modified"], last_modified)
+
+    async def test_personal_feed_is_modified_by_renaming_a_group(self):
+        feed = await CalendarFeedToken.objects.acreate(user=self.user)
+        url = reverse("user-calendar-feed", kwargs={"token": feed.token})
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        await Group.objects.filter(created_by=self.user).aupdate(timetable_updated_at=an_hour_ago, updated_at=an_hour_ago)
+        await GroupMembership.objects.filter(user=self.user).aupdate(updated_at=an_hour_ago)
+        await CalendarFeedToken.objects.filter(pk=feed.pk).aupdate(updated_at=an_hour_ago)
+        first = await self.async_client.get(url)
+        await self.body(first)
+
+        group = await Group.objects.aget(pk=self.groups[0].pk)
+        group.name = "Linear Algebra"
+        await group.asave()
+        by_etag = await self.async_client.get(url, headers={"If-None-Match": first["ETag"]})
+        by_date = await self.async_client.get(url, headers={"If-Modified-Since": first["Last-Modified"]})
+
+        self.assertEqual((by_etag.status_code, by_date.status_code), (200, 200))
+        self.assertIn("CATEGORIES:Linear Algebra", unfold(await self.body(by_etag)))
+
+    async def test_group_feed_of_a_deactivated_group_is_not_found(self):
+        await Group.objects.filter(pk=self.groups[0].pk).aupdate(is_active=False)
+
+        response = await self.async_client.get(self.group_url)
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_long_and_special_text_is_escaped_and_folded(self):
+        title = "Lecture; room 1, then lab\\notes\nbring a calculator " + "é" * 60
+        await Event.objects.filter(pk=self.event.pk).aupdate(title=title)
+
+        body = await self.body(await self.async_client.get(self.group_url))
+
+        self.assertTrue(body.endswith("\r\n"))
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split("\r\n")))
+        summary = "SUMMARY:Lecture\\; room 1\\, then lab\\\\notes\\nbring a calculator " + "é" * 60
+        self.assertIn(summary, unfold(body))
+
+
+class ICSTests(TestCase):
+
+    def test_escape(self):
+        self.assertEqual(ics.escape("a;b,c\\d\r\ne\nf"), "a\\;b\\,c\\\\d\\ne\\nf")
+
+    def test_fold_counts_octets_not_characters(self):
+        line = "SUMMARY:" + "é" * 100
+        folded = ics.fold(line)
+
+        lines = folded.split("\r\n")
+        self.assertEqual(lines[-1], "")
+        self.assertTrue(all(len(part.encode()) <= 75 for part in lines))
+        self.assertTrue(all(part.startswith(" ") for part in lines[1:-1]))
+        self.assertEqual(folded.replace("\r\n ", "").removesuffix("\r\n"), line)
+
+    def test_short_lines_are_not_folded(self):
+        self.assertEqual(ics.fold("X" * 75), "X" * 75 + "\r\n")
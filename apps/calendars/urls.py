@@ -0,0 +1,19 @@
+from django.urls import path
+from .views import (
+    CalendarConnectAPIView,
+    CalendarSyncAPIView,
+    SyncQueueStatsAPIView,
+    GroupCalendarFeedAPIView,
+    UserCalendarFeedAPIView,
+    CalendarFeedAPIView
+)
+
+
+urlpatterns = [
+    path("calendar/connect/", CalendarConnectAPIView.as_view(), name="calendar-connect"),
+    path("calendar/sync/", CalendarSyncAPIView.as_view(), name="calendar-sync"),
+    path("calendar/feed/", CalendarFeedAPIView.as_view(), name="calendar-feed"),
+    path("calendar/feeds/<str:token>.ics", UserCalendarFeedAPIView.as_view(), name="user-calendar-feed"),
+    path("groups/<str:group_slug>/calendar.ics", GroupCalendarFeedAPIView.as_view(), name="group-calendar-feed"),
+    path("metrics/sync-queue/", SyncQueueStatsAPIView.as_view(), name="sync-queue-stats"),
+]
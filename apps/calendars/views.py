@@ -0,0 +1,306 @@
+import hashlib
+import requests
+from adrf.views import APIView
+from apps.common.response import CustomResponse
+from apps.groups.mixins import GroupMixin
+from apps.groups.models import GroupMembership
+from apps.schedules.models import Event, EventOverride
+from asgiref.sync import sync_to_async
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.negotiation import BaseContentNegotiation
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from drf_spectacular.utils import extend_schema
+from . import ics
+from .google import CalendarAPIError, GoogleOAuthClient
+from .models import PROVIDER_GOOGLE, CalendarConnection, CalendarFeedToken, SyncJob, new_feed_token
+from .serializers import (
+    CalendarConnectSerializer,
+    CalendarConnectionSerializer,
+    CalendarFeedSerializer,
+    SyncQueueStatsSerializer
+)
+
+tags = ["Calendar"]
+
+
+class CalendarConnectAPIView(APIView):
+    serializer_class = CalendarConnectSerializer
+    response_serializer = CalendarConnectionSerializer
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(tags=tags, summary="Get the calendar connection", responses=CalendarConnectionSerializer)
+    async def get(self, request):
+        connection = await CalendarConnection.objects.filter(user=request.user).afirst()
+        if not connection:
+            return CustomResponse.error(message="Google Calendar is not connected", status_code=404)
+
+        serializer = self.response_serializer(connection)
+        return CustomResponse.success(message="Calendar connection retreived successfully", data=serializer.data)
+
+    @extend_schema(
+        tags=tags,
+        summary="Connect Google Calendar",
+        description="""
+        This endpoint exchanges a Google OAuth authorization code (requested with the calendar scope and offline access)
+        for the tokens used to push the user's group timetables to their Google Calendar
+        """,
+        request=CalendarConnectSerializer,
+        responses=CalendarConnectionSerializer
+    )
+    async def post(self, request):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            tokens = await sync_to_async(GoogleOAuthClient().exchange_code, thread_sensitive=False)(
+                serializer.validated_data["code"], serializer.validated_data["redirect_uri"]
+            )
+        except CalendarAPIError:
+            return CustomResponse.error(message="Invalid authorization code")
+        except requests.RequestException:
+            return CustomResponse.error(message="Google could not be reached, try again later", status_code=502)
+
+        connection = await CalendarConnection.objects.filter(user=request.user).afirst()
+        refresh_token = tokens.get("refresh_token") or (connection and connection.refresh_token)
+        if not refresh_token:
+            return CustomResponse.error(message="Offline access was not granted")
+
+        connection, _ = await CalendarConnection.objects.aupdate_or_create(
+            user=request.user,
+            defaults={
+                "refresh_token": refresh_token,
+                "access_token": tokens["access_token"],
+                "access_token_expires_at": tokens["expires_at"],
+                "is_active": True,
+            }
+        )
+        await SyncJob.objects.aenqueue_users([request.user.id], PROVIDER_GOOGLE, delay=timedelta(0))
+
+        serializer = self.response_serializer(connection)
+        return CustomResponse.success(message="Google Calendar connected successfully", data=serializer.data)
+
+    @extend_schema(tags=tags, summary="Disconnect Google Calendar")
+    async def delete(self, request):
+        deleted, _ = await CalendarConnection.objects.filter(user=request.user).adelete()
+        if not deleted:
+            return CustomResponse.error(message="Google Calendar is not connected", status_code=404)
+        return CustomResponse.success(message="Google Calendar disconnected successfully")
+
+
+class CalendarSyncAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=tags,
+        summary="Sync Google Calendar now",
+        description="""
+        This endpoint queues a sync of the user's group timetables to their Google Calendar.
+        Syncs run in the background worker; `last_synced_at` on the connection shows when one finished.
+        """,
+        request=None
+    )
+    async def post(self, request):
+        connection = await CalendarConnection.objects.filter(user=request.user, is_active=True).afirst()
+        if not connection:
+            return CustomResponse.error(message="Google Calendar is not connected", status_code=404)
+
+        await SyncJob.objects.aenqueue_users([request.user.id], PROVIDER_GOOGLE, delay=timedelta(0))
+        return CustomResponse.success(message="Google Calendar sync queued", status_code=202)
+
+
+class SyncQueueStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=["Metrics"],
+        summary="Calendar sync queue statistics",
+        description="""
+        This endpoint reports the depth of the calendar sync queue, how long the oldest due job has waited,
+        and how many enqueues were coalesced into pending jobs
+        """,
+        responses=SyncQueueStatsSerializer
+    )
+    async def get(self, request):
+        serializer = SyncQueueStatsSerializer(await SyncJob.objects.astats())
+        return CustomResponse.success(message="Sync queue statistics retreived successfully", data=serializer.data)
+
+
+class FeedContentNegotiation(BaseContentNegotiation):
+    """Calendar apps send all sorts of Accept headers; feeds answer with iCalendar regardless."""
+
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+def feed_etag(*parts):
+    return '"%s"' % hashlib.sha1(":".join(str(part) for part in (ics.FEED_FORMAT, *parts)).encode()).hexdigest()
+
+
+class CalendarFeedMixin:
+    """
+    Conditional, cached iCalendar responses. The ETag and Last-Modified come from
+    the timetable markers on the groups, so a poll that matches is answered from
+    the group row(s) alone. Rendered feeds are cached under their ETag, and
+    feeds not in the cache are streamed and cached on the way out.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    content_negotiation_class = FeedContentNegotiation
+
+    def feed_events(self, **filters):
+        since = timezone.now() - timedelta(days=settings.ICS_FEED_HISTORY_DAYS)
+        return (
+            Event.objects
+            .filter(schedule__is_active=True, **filters)
+            .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=since))
+            .select_related("schedule__group")
+            .order_by("id")
+        )
+
+    def _set_headers(self, response, etag, last_modified, public):
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+        visibility = {"public": True} if public else {"private": True}
+        patch_cache_control(response, max_age=settings.ICS_FEED_MAX_AGE, **visibility)
+        return response
+
+    async def _stream_and_cache(self, cache_key, chunks):
+        kept, size = [], 0
+        async for chunk in chunks:
+            yield chunk
+            if kept is not None:
+                size += len(chunk)
+                kept = kept if size <= settings.ICS_FEED_CACHE_MAX_BYTES else None
+                if kept is not None:
+                    kept.append(chunk)
+        if kept is not None:
+            await cache.aset(cache_key, b"".join(kept), settings.ICS_FEED_CACHE_TIMEOUT)
+
+    async def feed_response(self, request, etag, last_modified, name, events, public, categories=False):
+        not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+        if not_modified is not None:
+            return self._set_headers(not_modified, etag, last_modified, public)
+
+        cache_key = "calendars:ics:" + etag.strip('"')
+        body = await cache.aget(cache_key)
+        if body is not None:
+            response = HttpResponse(body, content_type=ics.CONTENT_TYPE)
+        else:
+            overrides = (
+                EventOverride.objects
+                .filter(event__in=events.values("id"))
+                .order_by("event_id", "original_start")
+            )
+            chunks = ics.arender(name, events, overrides, last_modified, categories=categories)
+            response = StreamingHttpResponse(self._stream_and_cache(cache_key, chunks), content_type=ics.CONTENT_TYPE)
+
+        response["Content-Disposition"] = 'inline; filename="calendar.ics"'
+        return self._set_headers(response, etag, last_modified, public)
+
+
+class GroupCalendarFeedAPIView(CalendarFeedMixin, APIView, GroupMixin):
+
+    @extend_schema(
+        tags=tags,
+        summary="Group iCalendar feed",
+        description="""
+        This endpoint serves the group's timetable as an iCalendar feed that calendar apps can subscribe to.
+        Send the returned ETag as `If-None-Match` (or `If-Modified-Since`) to get a 304 when nothing changed.
+        """,
+        responses={(200, "text/calendar"): str}
+    )
+    async def get(self, request, group_slug):
+        group = await self.get_group(group_slug)
+        if not group or not group.is_active:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        etag = feed_etag("group", group.id, group.timetable_version, group.name)
+        # The name is the calendar's name, so a rename is a change too
+        last_modified = max(group.timetable_updated_at, group.updated_at)
+        return await self.feed_response(
+            request, etag, last_modified, group.name, self.feed_events(schedule__group=group), public=True
+        )
+
+
+class UserCalendarFeedAPIView(CalendarFeedMixin, APIView):
+
+    @extend_schema(
+        tags=tags,
+        summary="Personal iCalendar feed",
+        description="""
+        This endpoint serves the timetables of all the groups of the feed's owner as one iCalendar feed,
+        each event tagged with its group. The URL comes from `calendar/feed/` and is the only credential.
+        """,
+        responses={(200, "text/calendar"): str}
+    )
+    async def get(self, request, token):
+        feed = await CalendarFeedToken.objects.select_related("user").filter(token=token, user__is_active=True).afirst()
+        if not feed:
+            return CustomResponse.error(message="Feed not found", status_code=404)
+
+        # Every membership, left ones included, through the (user, group) index: leaving is a change too
+        memberships = [
+            row async for row in GroupMembership.objects
+            .filter(user_id=feed.user_id)
+            .order_by("group_id")
+            .values(
+                "group_id", "group__name", "group__timetable_version", "group__timetable_updated_at",
+                "group__updated_at", "updated_at", "active", "group__is_active"
+            )
+        ]
+        current = [row for row in memberships if row["active"] and row["group__is_active"]]
+        # Events are tagged with their group's name, so a rename is a change too
+        etag = feed_etag("user", feed.user_id, feed.token, *(
+            f"{row['group_id']}.{row['group__timetable_version']}.{row['group__name']}" for row in current
+        ))
+        last_modified = max([
+            feed.updated_at,
+            *(max(row["group__timetable_updated_at"], row["group__updated_at"]) for row in current),
+            *(row["updated_at"] for row in memberships),
+        ])
+        events = self.feed_events(schedule__group_id__in=[row["group_id"] for row in current])
+        return await self.feed_response(
+            request, etag, last_modified, f"ScheduleSync - {feed.user.full_name}", events, public=False, categories=True
+        )
+
+
+class CalendarFeedAPIView(APIView):
+    serializer_class = CalendarFeedSerializer
+    permission_classes = [IsAuthenticated]
+
+    def _data(self, request, feed):
+        url = request.build_absolute_uri(reverse("user-calendar-feed", kwargs={"token": feed.token}))
+        return self.serializer_class({"url": url, "updated_at": feed.updated_at}).data
+
+    @extend_schema(
+        tags=tags,
+        summary="Get the personal feed URL",
+        description="This endpoint returns the URL of the user's iCalendar feed, creating it on first use",
+        responses=CalendarFeedSerializer
+    )
+    async def get(self, request):
+        feed, _ = await CalendarFeedToken.objects.aget_or_create(user=request.user)
+        return CustomResponse.success(message="Calendar feed retreived successfully", data=self._data(request, feed))
+
+    @extend_schema(
+        tags=tags,
+        summary="Reset the personal feed URL",
+        description="This endpoint replaces the URL of the user's iCalendar feed; subscriptions to the old one stop working",
+        request=None,
+        responses=CalendarFeedSerializer
+    )
+    async def post(self, request):
+        feed, _ = await CalendarFeedToken.objects.aupdate_or_create(user=request.user, defaults={"token": new_feed_token()})
+        return CustomResponse.success(message="Calendar feed reset successfully", data=self._data(request, feed))
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import random
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from apps.common.limits import KeyedConcurrencyLimiter
+from apps.schedules.imports import run_import
+from .models import PROVIDER_GOOGLE, CalendarConnection, SyncJob
+from .sync import CalendarSyncEngine
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncFailed(Exception):
+    pass
+
+
+def fan_out(job):
+    SyncJob.objects.fan_out(job.target_id, PROVIDER_GOOGLE)
+
+
+def sync_user(job):
+    connection = CalendarConnection.objects.select_related("user").filter(user_id=job.target_id, is_active=True).first()
+    if connection is None:
+        return
+    result = CalendarSyncEngine(connection).sync()
+    if result.failed:
+        keys = ", ".join(f"{key} ({status})" for key, status in result.failed[:10])
+        raise SyncFailed(f"{len(result.failed)} items failed: {keys}")
+
+
+def event_import(job):
+    run_import(job.target_id)
+
+
+HANDLERS = {
+    "group": fan_out,
+    "user": sync_user,
+    "import": event_import,
+}
+
+
+def backoff(attempts):
+    """Exponential backoff with jitter for the given attempt number (1-based)."""
+    delay = min(settings.SYNC_JOB_BACKOFF_BASE * 2 ** (attempts - 1), settings.SYNC_JOB_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+class SyncWorker:
+    """
+    Runs queued sync jobs on an asyncio loop. At most `concurrency` jobs run at
+    once, at most `provider_concurrency` of them against the same calendar provider,
+    and the queue guarantees one running job per user across all workers. Jobs are
+    only claimed when a slot is free, so what a worker cannot run stays claimable
+    by the others. Failed jobs are retried with exponential backoff up to
+    SYNC_JOB_MAX_ATTEMPTS and then left as failed.
+    """
+
+    def __init__(self, concurrency=None, provider_concurrency=None, poll_interval=None, worker_id=None):
+        self.concurrency = concurrency or settings.SYNC_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval or settings.SYNC_WORKER_POLL_INTERVAL
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.provider_limiter = KeyedConcurrencyLimiter(
+            max_concurrency=provider_concurrency or settings.SYNC_WORKER_PROVIDER_CONCURRENCY,
+            max_waiting=self.concurrency
+        )
+        # Jobs are blocking I/O (ORM and HTTP), each gets its own thread and database connection
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency + 1, thread_name_prefix="sync-worker")
+        self.tasks = set()
+        self.stopping = asyncio.Event()
+        self.processed = 0
+
+    async def _db(self, function, *args):
+        def call():
+            try:
+                return function(*args)
+            finally:
+                connections.close_all()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    def _execute(self, job):
+        HANDLERS[job.kind](job)
+
+    async def _run(self, jobs):
+        # Several claimed jobs for one target (a reclaimed lease next to a new edit) run as one
+        job = max(jobs, key=lambda job: job.attempts)
+        try:
+            if job.provider:
+                async with self.provider_limiter.limit(job.provider):
+                    await self._db(self._execute, job)
+            else:
+                await self._db(self._execute, job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts >= settings.SYNC_JOB_MAX_ATTEMPTS:
+                logger.error("Sync job %s failed after %s attempts: %s", job, job.attempts, error)
+                await self._db(SyncJob.objects.fail, job, error)
+            else:
+                delay = backoff(job.attempts)
+                logger.warning("Sync job %s failed, retrying in %ss: %s", job, round(delay.total_seconds()), error)
+                await self._db(SyncJob.objects.retry, job, error, delay)
+            await self._db(SyncJob.objects.complete, [other.id for other in jobs if other is not job])
+        else:
+            await self._db(SyncJob.objects.complete, [job.id for job in jobs])
+        self.processed += 1
+
+    async def _claim(self):
+        free = self.concurrency - len(self.tasks)
+        if free <= 0:
+            return 0
+        jobs = await self._db(SyncJob.objects.claim, self.worker_id, free, settings.SYNC_JOB_LEASE)
+        by_target = {}
+        for job in jobs:
+            by_target.setdefault((job.kind, job.target_id), []).append(job)
+        for target_jobs in by_target.values():
+            task = asyncio.create_task(self._run(target_jobs))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return len(jobs)
+
+    def stop(self):
+        self.stopping.set()
+
+    async def run(self, drain=False):
+        """Claims and runs jobs until stopped; with `drain`, returns once nothing is due."""
+        try:
+            while not self.stopping.is_set():
+                claimed = await self._claim()
+                if drain and not claimed and not self.tasks:
+                    break
+                if claimed and len(self.tasks) < self.concurrency:
+                    # There may be more due jobs than this batch
+                    continue
+
+                waiters = [asyncio.create_task(self.stopping.wait())]
+                await asyncio.wait(
+                    [*self.tasks, *waiters], timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED
+                )
+                for waiter in waiters:
+                    waiter.cancel()
+        finally:
+            if self.tasks:
+                await asyncio.wait(self.tasks)
+            self.executor.shutdown(wait=True)
+        return self.processed
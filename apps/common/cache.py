@@ -0,0 +1,116 @@
+import asyncio
+
+from cachetools import TTLCache
+from django.core.cache import caches
+from .limits import SingleFlight
+
+
+class TieredCache:
+    """
+    Two-tier cache for hot, rebuildable values: a small in-process TTL cache in
+    front of a shared Django cache backend. Local entries are only trusted for
+    `local_ttl` seconds, which bounds how long another process's invalidation
+    can go unseen. Misses are rebuilt once per key: concurrent misses in this
+    process share one build, and across processes a short lock in the shared
+    backend lets a single process rebuild while the others wait for its result.
+
+    Every key has a generation in the shared backend, bumped by `adelete`.
+    Entries are stored with the generation their build started at and only
+    count as hits while it is still current, so a build that loses a race with
+    an invalidation is never served from the cache.
+    """
+
+    def __init__(self, prefix, timeout, alias="default", local_size=1024, local_ttl=2, lock_timeout=2):
+        self.prefix = prefix
+        self.timeout = timeout
+        self.alias = alias
+        self.local = TTLCache(maxsize=local_size, ttl=local_ttl)
+        self.lock_timeout = lock_timeout
+        self.flights = SingleFlight()
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    def make_key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def make_generation_key(self, key):
+        return f"{self.prefix}:{key}:generation"
+
+    async def ageneration(self, key):
+        return await self.shared.aget(self.make_generation_key(key), 0)
+
+    async def aget(self, key):
+        value = self.local.get(key)
+        if value is None:
+            entry_key, generation_key = self.make_key(key), self.make_generation_key(key)
+            found = await self.shared.aget_many([entry_key, generation_key])
+            entry = found.get(entry_key)
+            # Entries built before the last invalidation are misses
+            if entry is not None and entry[0] == found.get(generation_key, 0):
+                value = self.local[key] = entry[1]
+        return value
+
+    async def aset(self, key, value, generation=None):
+        if generation is None:
+            generation = await self.ageneration(key)
+        self.local[key] = value
+        await self.shared.aset(self.make_key(key), (generation, value), self.timeout)
+
+    async def adelete(self, key):
+        """Invalidates `key`, including any build of it still in progress."""
+        generation_key = self.make_generation_key(key)
+        try:
+            await self.shared.aincr(generation_key)
+        except ValueError:
+            # No generation yet, unless a concurrent invalidation just added it
+            if not await self.shared.aadd(generation_key, 1, None):
+                await self.shared.aincr(generation_key)
+        # After the bump, so a build storing its value in the meantime sees it (see _rebuild)
+        self.local.pop(key, None)
+        self.flights.forget(key)
+
+    async def _await_rebuild(self, key):
+        """Polls the shared tier while another process rebuilds `key`, up to the lock timeout."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(0.05)
+            value = await self.aget(key)
+            if value is not None:
+                return value
+        return None
+
+    async def _rebuild(self, key, build):
+        generation = await self.ageneration(key)
+        # One lock per generation: builds started after an invalidation do not wait on the stale one
+        lock = self.make_key(f"{key}:lock:{generation}")
+        locked = await self.shared.aadd(lock, 1, self.lock_timeout)
+        if not locked:
+            value = await self._await_rebuild(key)
+            if value is not None:
+                return value
+
+        try:
+            value = await build()
+            # Invalidated while building: the value may predate the change, so it is returned but not cached
+            if value is not None and await self.ageneration(key) == generation:
+                await self.aset(key, value, generation)
+                # Invalidated since the check: the shared entry is already a miss, drop the local copy too
+                if await self.ageneration(key) != generation:
+                    self.local.pop(key, None)
+            return value
+        finally:
+            if locked:
+                await self.shared.adelete(lock)
+
+    async def aget_or_build(self, key, build):
+        """
+        The cached value of `key`, or the result of the coroutine function `build`,
+        which is cached unless it is None.
+        """
+        value = await self.aget(key)
+        if value is not None:
+            return value
+        return await self.flights.do(key, lambda: self._rebuild(key, build))
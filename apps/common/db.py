@@ -0,0 +1,33 @@
+from django.db import connections
+
+
+def pool_stats():
+    """
+    Connection pool statistics per database alias, including how long requests
+    waited for a connection. Aliases without a pool are reported as None.
+    """
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], "pool", None)
+        if pool is None:
+            stats[alias] = None
+            continue
+
+        pool_stats = pool.get_stats()
+        queued = pool_stats.get("requests_queued", 0)
+        wait_ms = pool_stats.get("requests_wait_ms", 0)
+        stats[alias] = {
+            "min_size": pool_stats.get("pool_min", 0),
+            "max_size": pool_stats.get("pool_max", 0),
+            "size": pool_stats.get("pool_size", 0),
+            "available": pool_stats.get("pool_available", 0),
+            "waiting": pool_stats.get("requests_waiting", 0),
+            "requests": pool_stats.get("requests_num", 0),
+            "requests_queued": queued,
+            "requests_errors": pool_stats.get("requests_errors", 0),
+            "wait_ms_total": wait_ms,
+            "wait_ms_avg": round(wait_ms / queued, 2) if queued else 0,
+            "connections_opened": pool_stats.get("connections_num", 0),
+            "connections_errors": pool_stats.get("connections_errors", 0),
+        }
+    return stats
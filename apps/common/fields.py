@@ -0,0 +1,71 @@
+import random
+import re
+
+from autoslug import AutoSlugField
+from autoslug.utils import crop_slug, get_prepopulated_value, get_uniqueness_lookups
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
+
+
+# Suffixes are capped so they always fit in an integer column
+MAX_SUFFIX_DIGITS = 9
+
+
+class UniqueSlugField(AutoSlugField):
+    """
+    AutoSlugField that allocates unique slugs in one query.
+    Instead of probing `slug`, `slug-2`, `slug-3`, ... one by one, a single
+    indexed prefix query finds whether the base slug is taken and the highest
+    numeric suffix in use, so the cost stays flat as duplicates accumulate.
+    A slug that is already set is kept as is unless `always_update` is set.
+    Allocation reads before the insert, so concurrent inserts of one base can
+    get the same slug: callers retry on the unique constraint.
+    """
+
+    def pre_save(self, instance, add):
+        value = self.value_from_object(instance)
+        if value and not self.always_update:
+            return value
+
+        slug = self.slugify(get_prepopulated_value(self, instance) or "") or instance._meta.model_name
+        slug = self.generate_unique_slug(instance, self.slugify(crop_slug(self, slug)))
+        setattr(instance, self.name, slug)
+        return slug
+
+    def _allocate(self, instance, base, manager):
+        sep = self.index_sep
+        pattern = rf"^{re.escape(base)}({re.escape(sep)}[0-9]{{1,{MAX_SUFFIX_DIGITS}}})?$"
+        lookups = dict(get_uniqueness_lookups(self, instance, self.unique_with))
+
+        # The prefix lookup lets Postgres use the slug's pattern index; the regex narrows it to base-N
+        rivals = manager.filter(**lookups, **{f"{self.name}__startswith": base, f"{self.name}__regex": pattern})
+        if instance.pk:
+            rivals = rivals.exclude(pk=instance.pk)
+
+        suffix = Cast(Substr(self.name, len(base) + len(sep) + 1), IntegerField())
+        result = rivals.aggregate(
+            base_taken=Count("pk", filter=Q(**{self.name: base})),
+            last_index=Max(suffix, filter=~Q(**{self.name: base})),
+        )
+        if not result["base_taken"]:
+            return base
+        index = (result["last_index"] or 1) + 1
+        if index >= 10 ** MAX_SUFFIX_DIGITS:
+            # The family is full up to the cap: a random suffix, a collision being left to the caller's retry
+            index = random.randrange(2, 10 ** MAX_SUFFIX_DIGITS)
+        return f"{base}{sep}{index}"
+
+    def generate_unique_slug(self, instance, base):
+        if self.manager is not None:
+            manager = self.manager
+        elif self.manager_name is not None:
+            manager = getattr(self.model, self.manager_name)
+        else:
+            manager = self.model._default_manager
+
+        slug = self._allocate(instance, base, manager)
+        if len(slug) > self.max_length:
+            # No room for the suffix: allocate within the family of a shorter base instead
+            base = base[:self.max_length - len(self.index_sep) - MAX_SUFFIX_DIGITS].rstrip(self.index_sep)
+            slug = self._allocate(instance, base, manager)
+        return slug
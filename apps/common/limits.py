@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class Overloaded(Exception):
+    pass
+
+
+class KeyedConcurrencyLimiter:
+    """
+    Bounds concurrent work per key (e.g. per group) within this process.
+    Up to `max_concurrency` callers run at once, up to `max_waiting` more queue,
+    and anything beyond that is shed with `Overloaded` so a single hot key
+    cannot hold every database connection.
+    """
+
+    def __init__(self, max_concurrency: int, max_waiting: int):
+        self.max_concurrency = max_concurrency
+        self.max_waiting = max_waiting
+        self._slots = {}
+
+    @asynccontextmanager
+    async def limit(self, key):
+        semaphore, users = self._slots.get(key, (None, 0))
+        if users >= self.max_concurrency + self.max_waiting:
+            raise Overloaded()
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._slots[key] = (semaphore, users + 1)
+
+        try:
+            async with semaphore:
+                yield
+        finally:
+            semaphore, users = self._slots[key]
+            if users == 1:
+                del self._slots[key]
+            else:
+                self._slots[key] = (semaphore, users - 1)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key within this process: the first
+    caller runs the call and every caller that arrives while it is in flight
+    gets its result (or exception) instead of running it again.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    def _forget(self, key, future):
+        if self._calls.get(key) is future:
+            del self._calls[key]
+
+    def forget(self, key):
+        """Makes the next caller for `key` start a new call, for when the data the one in flight read has changed."""
+        self._calls.pop(key, None)
+
+    async def do(self, key, function):
+        future = self._calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(function())
+            self._calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        # A cancelled caller must not cancel the call the others are waiting on
+        return await asyncio.shield(future)
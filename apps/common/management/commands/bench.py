@@ -0,0 +1,503 @@
+import asyncio
+import contextvars
+import json
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+import rsa
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import setup_databases, teardown_databases
+from django.urls import reverse
+from google.auth import crypt, jwt
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.accounts.tokens import outstanding_tokens
+from apps.common.db import pool_stats
+
+
+query_counter = contextvars.ContextVar("bench_query_counter", default=None)
+
+BENCH_KEY_ID = "schedulesync-bench"
+BULK_BATCH_SIZE = 50
+EVENTS_PER_GROUP = 5
+SEMESTER_START = datetime(2026, 9, 7, 8, tzinfo=timezone.utc)
+SEMESTER_WEEKS = 15
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    query: str = ""
+    user: object = None
+    body: dict = None
+
+
+@dataclass
+class Dataset:
+    users: list
+    groups: list
+    members: dict
+    outsiders: dict
+    schedules: dict = field(default_factory=dict)
+    events: dict = field(default_factory=dict)
+    tokens: dict = field(default_factory=dict)
+    signer: object = None
+    audience: str = None
+
+    def token_for(self, user):
+        if user.id not in self.tokens:
+            self.tokens[user.id] = str(AccessToken.for_user(user))
+        return self.tokens[user.id]
+
+    def group(self, i):
+        return self.groups[i % len(self.groups)]
+
+    def member(self, group, i):
+        members = self.members[group.id]
+        return members[i % len(members)]
+
+    def outsider(self, group, i):
+        outsiders = self.outsiders[group.id]
+        return outsiders[i % len(outsiders)]
+
+    def event(self, group, i):
+        events = self.events[group.id]
+        return events[i % len(events)]
+
+
+# One scenario per (url name, method). Each builds the i-th request from the seeded dataset.
+# Mutating scenarios run after the read-only ones and in an order where each can succeed:
+# outsiders join, then leave again; admins remove and promote members.
+
+def list_groups(data, i):
+    group = data.group(i)
+    return Call("GET", reverse("group-list-create"), "group_filter=joined", user=data.member(group, i))
+
+
+def group_detail(data, i):
+    return Call("GET", reverse("group-detail", kwargs={"group_slug": data.group(i).slug}))
+
+
+def group_members(data, i):
+    return Call("GET", reverse("group-members", kwargs={"group_slug": data.group(i).slug}), "limit=50")
+
+
+def join_group(data, i):
+    group = data.group(i)
+    return Call("POST", reverse("join-group", kwargs={"group_slug": group.slug}), user=data.outsider(group, i // len(data.groups)))
+
+
+def leave_group(data, i):
+    group = data.group(i)
+    return Call("DELETE", reverse("leave-group", kwargs={"group_slug": group.slug}), user=data.outsider(group, i // len(data.groups)))
+
+
+def bulk_membership(data, i):
+    group = data.group(i)
+    offset = (i // len(data.groups)) * BULK_BATCH_SIZE
+    user_ids = [str(data.outsider(group, offset + k).id) for k in range(BULK_BATCH_SIZE)]
+    body = {"action": "add", "user_ids": user_ids}
+    return Call("POST", reverse("bulk-membership", kwargs={"group_slug": group.slug}), user=group.created_by, body=body)
+
+
+def remove_member(data, i):
+    group = data.group(i)
+    member = data.member(group, i // len(data.groups))
+    path = reverse("remove-user-from-group", kwargs={"group_slug": group.slug, "member_id": member.id})
+    return Call("DELETE", path, user=group.created_by)
+
+
+def assign_admin(data, i):
+    group = data.group(i)
+    # Promote from the other end of the roster than remove_member, which has already run
+    member = data.member(group, -1 - i // len(data.groups))
+    body = {"member_id": str(member.id), "group_slug": group.slug}
+    return Call("POST", reverse("assign-admin"), user=group.created_by, body=body)
+
+
+def create_group(data, i):
+    body = {"name": f"Bench Created {i}", "description": "Created by manage.py bench"}
+    return Call("POST", reverse("group-list-create"), user=data.users[i % len(data.users)], body=body)
+
+
+def update_group(data, i):
+    group = data.group(i)
+    body = {"description": f"Updated by manage.py bench ({i})"}
+    return Call("PATCH", reverse("group-detail", kwargs={"group_slug": group.slug}), user=group.created_by, body=body)
+
+
+def google_auth(data, i):
+    now = int(time.time())
+    payload = {
+        "iss": "https://accounts.google.com",
+        "aud": data.audience,
+        "sub": f"bench-{i}",
+        "email": f"bench-login-{i}@example.com",
+        "given_name": "Bench",
+        "family_name": f"Login{i}",
+        "picture": "https://example.com/avatar.png",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    body = {"id_token": jwt.encode(data.signer, payload).decode(), "provider": "google"}
+    return Call("POST", reverse("google-auth"), body=body)
+
+
+def list_schedules(data, i):
+    return Call("GET", reverse("schedule-list-create", kwargs={"group_slug": data.group(i).slug}))
+
+
+def list_events(data, i):
+    group = data.group(i)
+    kwargs = {"group_slug": group.slug, "schedule_id": data.schedules[group.id].id}
+    return Call("GET", reverse("event-list-create", kwargs=kwargs))
+
+
+def event_detail(data, i):
+    group = data.group(i)
+    kwargs = {"group_slug": group.slug, "event_id": data.event(group, i).id}
+    return Call("GET", reverse("event-detail", kwargs=kwargs))
+
+
+def group_occurrences(data, i):
+    end = SEMESTER_START + timedelta(weeks=SEMESTER_WEEKS)
+    query = f"start={SEMESTER_START:%Y-%m-%dT%H:%M:%SZ}&end={end:%Y-%m-%dT%H:%M:%SZ}"
+    return Call("GET", reverse("group-occurrences", kwargs={"group_slug": data.group(i).slug}), query)
+
+
+def create_schedule(data, i):
+    group = data.group(i)
+    body = {"name": f"Bench Schedule {i}", "timezone": "Europe/London"}
+    return Call("POST", reverse("schedule-list-create", kwargs={"group_slug": group.slug}), user=group.created_by, body=body)
+
+
+def create_event(data, i):
+    group = data.group(i)
+    starts_at = SEMESTER_START + timedelta(days=i % 5, hours=4)
+    body = {
+        "title": f"Bench Tutorial {i}",
+        "starts_at": starts_at.isoformat(),
+        "ends_at": (starts_at + timedelta(hours=1)).isoformat(),
+        "rrule": f"FREQ=WEEKLY;COUNT={SEMESTER_WEEKS}",
+    }
+    kwargs = {"group_slug": group.slug, "schedule_id": data.schedules[group.id].id}
+    return Call("POST", reverse("event-list-create", kwargs=kwargs), user=group.created_by, body=body)
+
+
+def update_event(data, i):
+    group = data.group(i)
+    kwargs = {"group_slug": group.slug, "event_id": data.event(group, i).id}
+    return Call("PATCH", reverse("event-detail", kwargs=kwargs), user=group.created_by, body={"location": f"Room {i}"})
+
+
+def cancel_occurrence(data, i):
+    group = data.group(i)
+    event = data.event(group, i)
+    # Weekly on the schedule's wall clock, so the semester's occurrences move an hour across the DST change
+    local_start = event.starts_at.astimezone(event.schedule.tzinfo)
+    original_start = (local_start + timedelta(weeks=(i // len(data.groups)) % SEMESTER_WEEKS)).astimezone(timezone.utc)
+    body = {"original_start": original_start.isoformat(), "cancelled": True}
+    kwargs = {"group_slug": group.slug, "event_id": event.id}
+    return Call("POST", reverse("event-overrides", kwargs=kwargs), user=group.created_by, body=body)
+
+
+SCENARIOS = [
+    ("group-list-create", "GET", list_groups),
+    ("group-detail", "GET", group_detail),
+    ("group-members", "GET", group_members),
+    ("join-group", "POST", join_group),
+    ("leave-group", "DELETE", leave_group),
+    ("bulk-membership", "POST", bulk_membership),
+    ("remove-user-from-group", "DELETE", remove_member),
+    ("assign-admin", "POST", assign_admin),
+    ("group-list-create", "POST", create_group),
+    ("group-detail", "PATCH", update_group),
+    ("google-auth", "POST", google_auth),
+    ("schedule-list-create", "GET", list_schedules),
+    ("event-list-create", "GET", list_events),
+    ("event-detail", "GET", event_detail),
+    ("group-occurrences", "GET", group_occurrences),
+    ("schedule-list-create", "POST", create_schedule),
+    ("event-list-create", "POST", create_event),
+    ("event-detail", "PATCH", update_event),
+    ("event-overrides", "POST", cancel_occurrence),
+]
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic dataset into a throwaway test database and load-tests every "
+        "accounts, groups and schedules endpoint through the in-process ASGI application."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500, help="Number of users to seed")
+        parser.add_argument("--groups", type=int, default=20, help="Number of groups to seed")
+        parser.add_argument("--members", type=int, default=100, help="Members seeded per group")
+        parser.add_argument("--requests", type=int, default=200, help="Requests sent per endpoint")
+        parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+        parser.add_argument("--endpoint", action="append", help="Only run these url names (repeatable)")
+        parser.add_argument("--output", default="bench.json", help="Where to write the JSON results")
+        parser.add_argument("--keepdb", action="store_true", help="Keep the test database between runs")
+
+    def handle(self, *args, **options):
+        if options["members"] >= options["users"]:
+            raise CommandError("--members must be lower than --users.")
+
+        self.check_coverage()
+        started_at = datetime.now(timezone.utc)
+
+        old_config = setup_databases(verbosity=options["verbosity"], interactive=False, keepdb=options["keepdb"])
+        try:
+            data = self.seed(options)
+            results = asyncio.run(self.run(data, options))
+            db_pool = pool_stats()
+        finally:
+            outstanding_tokens.flush()
+            connections.close_all()
+            teardown_databases(old_config, verbosity=options["verbosity"], keepdb=options["keepdb"])
+
+        report = {
+            "started_at": started_at.isoformat(),
+            "settings_module": settings.SETTINGS_MODULE,
+            "dataset": {key: options[key] for key in ("users", "groups", "members")},
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "endpoints": results,
+            "db_pool": db_pool,
+        }
+        with open(options["output"], "w") as output:
+            json.dump(report, output, indent=2)
+
+        self.print_summary(results)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def check_coverage(self):
+        from apps.accounts.urls import urlpatterns as accounts_urls
+        from apps.groups.urls import urlpatterns as groups_urls
+        from apps.schedules.urls import urlpatterns as schedules_urls
+
+        covered = {name for name, _, _ in SCENARIOS}
+        patterns = accounts_urls + groups_urls + schedules_urls
+        missing = [pattern.name for pattern in patterns if pattern.name not in covered]
+        if missing:
+            self.stderr.write(self.style.WARNING(f"No bench scenario for: {', '.join(missing)}"))
+
+    def seed(self, options):
+        from apps.accounts.models import User
+        from apps.groups.models import Group, GroupMembership
+        from apps.schedules.models import Schedule, Event
+
+        self.stdout.write("Seeding dataset...")
+        user_count, group_count, member_count = options["users"], options["groups"], options["members"]
+
+        users = User.objects.bulk_create([
+            User(
+                email=f"bench-{i}@example.com",
+                first_name=f"Bench{i}",
+                last_name="User",
+                provider_user_id=f"bench-seed-{i}",
+            )
+            for i in range(user_count)
+        ], batch_size=1000)
+
+        groups = Group.objects.bulk_create([
+            Group(name=f"Bench Group {g}", description="Seeded by manage.py bench", created_by=users[g % user_count])
+            for g in range(group_count)
+        ], batch_size=1000)
+
+        members, outsiders, memberships = {}, {}, []
+        for g, group in enumerate(groups):
+            memberships.append(GroupMembership(user=group.created_by, group=group, role="admin"))
+
+            joined = [users[(g * member_count + k) % user_count] for k in range(member_count + 1)]
+            joined = [user for user in joined if user.id != group.created_by_id][:member_count]
+            memberships.extend(GroupMembership(user=user, group=group) for user in joined)
+
+            member_ids = {user.id for user in joined} | {group.created_by_id}
+            members[group.id] = joined
+            outsiders[group.id] = [user for user in users if user.id not in member_ids]
+        GroupMembership.objects.bulk_create(memberships, batch_size=1000)
+        Group.objects.repair_counters([group.id for group in groups])
+
+        # A semester of weekly lectures per group
+        schedules = Schedule.objects.bulk_create([
+            Schedule(group=group, name="Bench Semester", timezone="Europe/London", created_by=group.created_by)
+            for group in groups
+        ], batch_size=1000)
+        events = {}
+        for schedule in schedules:
+            events[schedule.group_id] = []
+            for e in range(EVENTS_PER_GROUP):
+                starts_at = SEMESTER_START + timedelta(days=e % 5, hours=e)
+                event = Event(
+                    schedule=schedule,
+                    title=f"Bench Lecture {e}",
+                    starts_at=starts_at,
+                    ends_at=starts_at + timedelta(hours=1),
+                    rrule=f"FREQ=WEEKLY;COUNT={SEMESTER_WEEKS}",
+                )
+                # bulk_create skips Event.save
+                event.recurrence_end = event.compute_recurrence_end(schedule.tzinfo)
+                events[schedule.group_id].append(event)
+        Event.objects.bulk_create([event for group_events in events.values() for event in group_events], batch_size=1000)
+
+        return Dataset(
+            users=users,
+            groups=groups,
+            members=members,
+            outsiders=outsiders,
+            schedules={schedule.group_id: schedule for schedule in schedules},
+            events=events,
+        )
+
+    def prepare_google_auth(self, data):
+        from apps.accounts.utils import google_token_verifier
+
+        # Steady state of the verifier: signing keys are already cached in memory
+        public_key, private_key = rsa.newkeys(2048)
+        google_token_verifier.certs.set_certs({BENCH_KEY_ID: public_key.save_pkcs1().decode()}, max_age=3600)
+        data.signer = crypt.RSASigner.from_string(private_key.save_pkcs1().decode(), key_id=BENCH_KEY_ID)
+        data.audience = google_token_verifier.audience or BENCH_KEY_ID
+
+    async def run(self, data, options):
+        from schedulesync.asgi import application
+
+        connection_created.connect(install_query_counter)
+        self.prepare_google_auth(data)
+
+        results = {}
+        for name, method, scenario in SCENARIOS:
+            if options["endpoint"] and name not in options["endpoint"]:
+                continue
+
+            calls = [scenario(data, i) for i in range(options["requests"])]
+            for call in calls:
+                if call.user is not None:
+                    data.token_for(call.user)
+
+            key = f"{method} {name}"
+            self.stdout.write(f"Running {key}...")
+            results[key] = await self.run_endpoint(application, data, calls, options["concurrency"])
+
+        connection_created.disconnect(install_query_counter)
+        return results
+
+    async def run_endpoint(self, application, data, calls, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        samples = []
+
+        async def worker(call):
+            async with semaphore:
+                samples.append(await self.send(application, data, call))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(call) for call in calls))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency for latency, _, _ in samples)
+        queries = [count for _, _, count in samples]
+        status_codes = {}
+        for _, status, _ in samples:
+            status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+
+        return {
+            "requests": len(samples),
+            "status_codes": status_codes,
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99": round(percentile(latencies, 0.99) * 1000, 2),
+                "mean": round(statistics.fmean(latencies) * 1000, 2),
+                "max": round(latencies[-1] * 1000, 2),
+            },
+            "queries_per_request": {
+                "mean": round(statistics.fmean(queries), 2),
+                "max": max(queries),
+            },
+        }
+
+    async def send(self, application, data, call):
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+        body = json.dumps(call.body or {}).encode()
+        headers = [
+            (b"host", host.encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if call.user is not None:
+            headers.append((b"authorization", f"Bearer {data.token_for(call.user)}".encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": call.method,
+            "scheme": "http",
+            "path": call.path,
+            "raw_path": call.path.encode(),
+            "query_string": call.query.encode(),
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": (host, 80),
+        }
+        messages = [{"type": "http.request", "body": body, "more_body": False}]
+        disconnected = asyncio.Event()
+        response = {}
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+
+        counter = [0]
+        token = query_counter.set(counter)
+        started = time.perf_counter()
+        try:
+            await application(scope, receive, send)
+        finally:
+            latency = time.perf_counter() - started
+            query_counter.reset(token)
+            disconnected.set()
+
+        return latency, response.get("status"), counter[0]
+
+    def print_summary(self, results):
+        header = f"{'endpoint':<32} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}  status"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for key, result in results.items():
+            latency = result["latency_ms"]
+            self.stdout.write(
+                f"{key:<32} {result['throughput_rps']:>9} {latency['p50']:>9} {latency['p95']:>9} "
+                f"{latency['p99']:>9} {result['queries_per_request']['mean']:>8}  {result['status_codes']}"
+            )
@@ -0,0 +1,308 @@
+"""
+Per-request performance metrics.
+
+MetricsMiddleware times every request and, through a context variable, adds
+up the database queries, sync_to_async thread hops and response serialization
+that happen on its behalf. Totals are kept in histograms per resolved URL name
+and served in the Prometheus text format by MetricsView. Requests that send
+SERVER_TIMING_HEADER also get the breakdown back in a Server-Timing header.
+
+Metrics live in the memory of each process, so every process is scraped on
+its own (or the series summed across processes by the scraper).
+"""
+import contextvars
+import secrets
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+
+from asgiref.sync import SyncToAsync, iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpResponse
+from django.views import View
+
+
+SERVER_TIMING_HEADER = "X-Server-Timing"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+# [enqueued_at, returned_at] of the sync_to_async call in progress
+_thread_hop = contextvars.ContextVar("thread_hop", default=None)
+
+
+class RequestTimings:
+    __slots__ = ("started", "queries", "db", "thread_wait", "serialize")
+
+    def __init__(self):
+        self.started = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.thread_wait = 0.0
+        self.serialize = 0.0
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, values, amount=1):
+        self.series[values] = self.series.get(values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self.series.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """Counts observations in fixed buckets (upper bounds), plus their sum and count."""
+
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, values, value):
+        series = self.series.get(values)
+        if series is None:
+            # One count per bucket and one for +Inf, then the sum
+            series = self.series[values] = [0] * (len(self.buckets) + 1) + [0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                labels = _format_labels(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {series[-1]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    """The per-view request metrics of this process."""
+
+    def __init__(self):
+        # Observed from the event loop and, under WSGI, from request threads
+        self.lock = threading.Lock()
+        self.requests = Counter("http_requests_total", "Requests by view, method and status.", ("view", "method", "status"))
+        self.duration = Histogram(
+            "http_request_duration_seconds", "Wall time of requests.", ("view", "method"), DURATION_BUCKETS
+        )
+        self.queries = Histogram(
+            "http_request_db_queries", "Database queries per request.", ("view", "method"), QUERY_BUCKETS
+        )
+        self.db = Histogram(
+            "http_request_db_duration_seconds", "Time per request spent in database queries.",
+            ("view", "method"), DURATION_BUCKETS
+        )
+        self.thread_wait = Histogram(
+            "http_request_thread_wait_seconds", "Time per request spent waiting on sync_to_async thread hops.",
+            ("view", "method"), DURATION_BUCKETS
+        )
+        self.serialize = Histogram(
+            "http_request_serialize_seconds", "Time per request spent serializing and rendering the response.",
+            ("view", "method"), DURATION_BUCKETS
+        )
+
+    def observe(self, view, method, status, duration, timings):
+        values = (view, method)
+        with self.lock:
+            self.requests.inc((view, method, str(status)))
+            self.duration.observe(values, duration)
+            self.queries.observe(values, timings.queries)
+            self.db.observe(values, timings.db)
+            self.thread_wait.observe(values, timings.thread_wait)
+            self.serialize.observe(values, timings.serialize)
+
+    def render(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.duration, self.queries, self.db, self.thread_wait, self.serialize):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+request_metrics = RequestMetrics()
+
+
+@contextmanager
+def timing_serialization():
+    """Adds the time spent in the block to the current request's serialization time."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialize += perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.queries += 1
+        timings.db += perf_counter() - started
+
+
+def _add_query_wrapper(sender, connection, **kwargs):
+    # Sent on every connect, pooled connections reuse the same wrapper object
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+_instrumented = False
+
+
+def instrument():
+    """
+    Hooks query timing into every database connection and thread hop timing
+    into sync_to_async. Only requests run under MetricsMiddleware are timed.
+    """
+    global _instrumented
+    if _instrumented:
+        return
+    _instrumented = True
+    connection_created.connect(_add_query_wrapper, dispatch_uid="apps.common.metrics")
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(None, connection)
+
+    # asgiref internals (thread_handler's signature, `func` being a bound Context.run), checked by ThreadHopTests
+    original_call = SyncToAsync.__call__
+    original_thread_handler = SyncToAsync.thread_handler
+
+    async def __call__(self, *args, **kwargs):
+        timings = current_timings.get()
+        if timings is None:
+            return await original_call(self, *args, **kwargs)
+        hop = [perf_counter(), None]
+        token = _thread_hop.set(hop)
+        try:
+            return await original_call(self, *args, **kwargs)
+        finally:
+            _thread_hop.reset(token)
+            if hop[1] is not None:
+                # Back from the thread, until the event loop picked the result up
+                timings.thread_wait += perf_counter() - hop[1]
+
+    def thread_handler(self, loop, exc_info, task_context, func, *args, **kwargs):
+        # `func` runs the call in the caller's copied context, which holds the hop
+        context = getattr(func, "__self__", None)
+        hop = context.get(_thread_hop) if isinstance(context, contextvars.Context) else None
+        if hop is None:
+            return original_thread_handler(self, loop, exc_info, task_context, func, *args, **kwargs)
+        # Queued for the thread, until it started the call
+        context[current_timings].thread_wait += perf_counter() - hop[0]
+        try:
+            return original_thread_handler(self, loop, exc_info, task_context, func, *args, **kwargs)
+        finally:
+            hop[1] = perf_counter()
+
+    SyncToAsync.__call__ = __call__
+    SyncToAsync.thread_handler = thread_handler
+
+
+def server_timing(duration, timings):
+    return ", ".join([
+        f"app;dur={duration * 1000:.1f}",
+        f'db;dur={timings.db * 1000:.1f};desc="{timings.queries} queries"',
+        f"wait;dur={timings.thread_wait * 1000:.1f}",
+        f"serialize;dur={timings.serialize * 1000:.1f}",
+    ])
+
+
+class MetricsMiddleware:
+    """
+    Records the metrics of every request under its URL name. Goes first in
+    MIDDLEWARE so the wall time covers the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        instrument()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        duration = perf_counter() - timings.started
+        match = request.resolver_match
+        view = match.view_name if match is not None else "<unmatched>"
+        request_metrics.observe(view, request.method, response.status_code, duration, timings)
+        if settings.SERVER_TIMING_ENABLED and request.headers.get(SERVER_TIMING_HEADER):
+            response["Server-Timing"] = server_timing(duration, timings)
+        return response
+
+
+class MetricsView(View):
+    """
+    The request metrics of this process in the Prometheus text format, for
+    scrapers sending `Authorization: Bearer <METRICS_TOKEN>`. Without a
+    METRICS_TOKEN the endpoint does not exist.
+    """
+
+    async def get(self, request):
+        expected = settings.METRICS_TOKEN
+        if not expected:
+            raise Http404()
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not secrets.compare_digest(token.encode(), expected.encode()):
+            return HttpResponse(status=401, headers={"WWW-Authenticate": "Bearer"})
+        return HttpResponse(request_metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,157 @@
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.db import connections
+from django.db.models import Q, QuerySet
+from rest_framework.utils.urls import replace_query_param
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) pagination without COUNT(*) or OFFSET.
+    Cursors are the ordering values of the last row of a page, signed so
+    clients cannot forge positions. Querysets are filtered past the cursor
+    in SQL; other iterables (sync or async), which must already be in that
+    order, are streamed and skipped past it.
+    """
+
+    cursor_query_param = "cursor"
+    salt = "apps.common.pagination.cursor"
+
+    def __init__(self, ordering=None, page_size: int = 10, estimate_count: bool = False):
+        self.ordering = list(ordering) if ordering else None
+        self.page_size = page_size
+        self.estimate_count = estimate_count
+
+    def get_ordering(self, data):
+        ordering = list(self.ordering or [])
+        if not ordering and isinstance(data, QuerySet):
+            ordering = list(data.query.order_by or data.model._meta.ordering)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            raise ValueError("Cursor pagination requires an ordering by field names.")
+
+        # The last ordering field must be unique for positions to be unambiguous
+        if ordering[-1].lstrip("-") not in ("pk", "id"):
+            descending = ordering[-1].startswith("-")
+            ordering.append("-pk" if descending else "pk")
+        return ordering
+
+    @staticmethod
+    def _normalize(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return str(value)
+
+    @staticmethod
+    def _get_value(item, field):
+        if isinstance(item, dict):
+            if field == "pk" and "pk" not in item:
+                return item["id"]
+            return item[field]
+        for part in field.split("__"):
+            item = getattr(item, part)
+        return item
+
+    def _key(self, item, ordering):
+        return [self._normalize(self._get_value(item, field.lstrip("-"))) for field in ordering]
+
+    def encode_cursor(self, item, ordering):
+        return signing.dumps(self._key(item, ordering), salt=self.salt, compress=True)
+
+    def decode_cursor(self, request, ordering):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            position = signing.loads(cursor, salt=self.salt)
+        except signing.BadSignature:
+            raise InvalidCursor()
+        if not isinstance(position, list) or len(position) != len(ordering):
+            raise InvalidCursor()
+        return position
+
+    @staticmethod
+    def _keyset_filter(ordering, position):
+        # (a, b) > (x, y) expands to a > x OR (a = x AND b > y), per field direction
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _is_after(key, position, ordering):
+        for field, value, start in zip(ordering, key, position):
+            if value == start:
+                continue
+            return value < start if field.startswith("-") else value > start
+        return False
+
+    async def _fetch_queryset(self, queryset, ordering, position):
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._keyset_filter(ordering, position))
+        return [item async for item in queryset[:self.page_size + 1]]
+
+    async def _fetch_iterable(self, data, ordering, position):
+        page = []
+
+        def consume(item):
+            if position is None or self._is_after(self._key(item, ordering), position, ordering):
+                page.append(item)
+            return len(page) > self.page_size
+
+        if hasattr(data, "__aiter__"):
+            async for item in data:
+                if consume(item):
+                    break
+        else:
+            for item in data:
+                if consume(item):
+                    break
+        return page
+
+    @staticmethod
+    def _estimate_count(queryset):
+        """Row estimate from the planner statistics, None when unavailable."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    async def paginate(self, data, request):
+        """
+        Returns the page and its pagination details.
+        Raises InvalidCursor when the request carries a cursor that was not issued here.
+        """
+        ordering = self.get_ordering(data)
+        position = self.decode_cursor(request, ordering)
+
+        if isinstance(data, QuerySet):
+            page = await self._fetch_queryset(data, ordering, position)
+        else:
+            page = await self._fetch_iterable(data, ordering, position)
+
+        next_link = None
+        if len(page) > self.page_size:
+            page = page[:self.page_size]
+            next_cursor = self.encode_cursor(page[-1], ordering)
+            next_link = replace_query_param(request.build_absolute_uri(), self.cursor_query_param, next_cursor)
+
+        pagination_details = {"next": next_link}
+        if self.estimate_count and isinstance(data, QuerySet):
+            pagination_details["estimated_count"] = await sync_to_async(self._estimate_count, thread_sensitive=True)(data)
+        return page, pagination_details
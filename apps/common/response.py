@@ -1,5 +1,16 @@
-from rest_framework.response import Response
+from rest_framework.response import Response as BaseResponse
 from rest_framework.pagination import PageNumberPagination
+from .metrics import timing_serialization
+from .pagination import KeysetPaginator, InvalidCursor
+
+
+class Response(BaseResponse):
+
+    @property
+    def rendered_content(self):
+        # Rendered by the handler after the view returns, still within the request's metrics
+        with timing_serialization():
+            return super().rendered_content
 
 
 class CustomResponse:
@@ -47,6 +58,43 @@ class CustomResponse:
 
         return Response(response, status=status_code)
 
+    @staticmethod
+    async def asuccess(message: str, data=None, paginate=False, request=None, view=None, page_size: int = 10, status_code: int = 200, ordering=None, estimate_count: bool = False, serializer_class=None, encoder=None) -> Response:
+
+        """
+        Async variant of `success` that additionally supports `paginate="cursor"`.
+        Cursor mode pages a queryset or (async) iterable by keyset on `ordering`
+        (defaults to the queryset's ordering) and serializes the page with `serializer_class`,
+        or with `encoder` (e.g. `ProjectionSerializer.encode`) for `values()` rows.
+        `estimate_count` adds the planner's row estimate instead of an exact COUNT(*).
+        """
+
+        if paginate != "cursor" or data is None:
+            return CustomResponse.success(message, data, paginate, request, view, page_size, status_code)
+
+        if request is None:
+            raise ValueError("Request is required for pagination.")
+
+        paginator = KeysetPaginator(ordering=ordering, page_size=page_size, estimate_count=estimate_count)
+        try:
+            page, pagination_details = await paginator.paginate(data, request)
+        except InvalidCursor:
+            return CustomResponse.error(message="Invalid cursor")
+
+        with timing_serialization():
+            if encoder is not None:
+                page = encoder(page)
+            elif serializer_class is not None:
+                page = serializer_class(page, many=True).data
+
+        response = {
+            "status": "success",
+            "message": message,
+            "pagination": pagination_details,
+            "data": page
+        }
+        return Response(response, status=status_code)
+
     @staticmethod
     def error(message: str, status_code: int=400) -> Response:
 
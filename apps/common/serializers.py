@@ -0,0 +1,67 @@
+from rest_framework import serializers
+
+
+# Fields whose representation of a DB value is the value itself
+PASSTHROUGH_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.FloatField,
+    serializers.BooleanField,
+)
+
+
+class ProjectionSerializer:
+    """
+    Read-only fast path for a DRF serializer over `values()` rows.
+    The serializer's declared fields are compiled once into a plain function,
+    so rows are encoded without model instances or per-field machinery.
+    `expressions` maps fields whose source is not a column (e.g. a property)
+    to query expressions computed by the database.
+    """
+
+    def __init__(self, serializer_class, expressions=None):
+        self.serializer_class = serializer_class
+        self.expressions = expressions or {}
+        self.columns = []
+        self.encode_row = self._compile()
+
+    def _compile(self):
+        namespace = {}
+        items = []
+        for index, (name, field) in enumerate(self.serializer_class().fields.items()):
+            if field.write_only:
+                continue
+
+            if name in self.expressions:
+                key = name
+            elif isinstance(field, serializers.SerializerMethodField) or field.source == "*":
+                raise ValueError(f"Field '{name}' needs an entry in `expressions` to be projected.")
+            else:
+                key = field.source.replace(".", "__")
+                self.columns.append(key)
+
+            value = f"row[{key!r}]"
+            if not isinstance(field, PASSTHROUGH_FIELDS):
+                namespace[f"convert_{index}"] = field.to_representation
+                value = f"(None if {value} is None else convert_{index}({value}))"
+            items.append(f"{name!r}: {value}")
+
+        source = "def encode_row(row):\n    return {" + ", ".join(items) + "}\n"
+        exec(compile(source, f"<projection {self.serializer_class.__name__}>", "exec"), namespace)
+        return namespace["encode_row"]
+
+    def project(self, queryset):
+        """
+        Narrows the queryset to the columns the encoder reads, plus the primary
+        key and ordering columns so the rows can be keyset-paginated.
+        """
+        ordering = [field.lstrip("-") for field in queryset.query.order_by if isinstance(field, str)]
+        extra = []
+        for field in ["id", *ordering]:
+            if field != "pk" and field not in self.columns and field not in extra:
+                extra.append(field)
+        return queryset.values(*self.columns, *extra, **self.expressions)
+
+    def encode(self, rows):
+        encode_row = self.encode_row
+        return [encode_row(row) for row in rows]
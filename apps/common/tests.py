@@ -1,3 +1,163 @@
-from django.test import TestCase
+import asyncio
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from apps.accounts.models import User
+from apps.groups.models import Group
+from .cache import TieredCache
+from .metrics import SERVER_TIMING_HEADER, Histogram, RequestMetrics, RequestTimings, current_timings, instrument
+
+
+class TieredCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cache = TieredCache(prefix="tests", timeout=60)
+
+    async def test_builds_are_cached(self):
+        builds = []
+
+        async def build():
+            builds.append(1)
+            return "value"
+
+        self.assertEqual(await self.cache.aget_or_build("key", build), "value")
+        self.assertEqual(await self.cache.aget_or_build("key", build), "value")
+        self.assertEqual(len(builds), 1)
+
+    async def test_build_racing_an_invalidation_is_not_cached(self):
+        state = {"value": "old"}
+        read = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_build():
+            value = state["value"]
+            read.set()
+            await release.wait()
+            return value
+
+        async def build():
+            return state["value"]
+
+        stale = asyncio.ensure_future(self.cache.aget_or_build("key", slow_build))
+        await read.wait()
+        # The change lands, and is invalidated, after the build read the old value
+        state["value"] = "new"
+        await self.cache.adelete("key")
+        release.set()
+
+        self.assertEqual(await stale, "old")
+        self.assertIsNone(await self.cache.aget("key"))
+        self.assertEqual(await self.cache.aget_or_build("key", build), "new")
+
+    async def test_callers_after_an_invalidation_do_not_join_the_stale_build(self):
+        read = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_build():
+            read.set()
+            await release.wait()
+            return "old"
+
+        async def build():
+            return "new"
+
+        stale = asyncio.ensure_future(self.cache.aget_or_build("key", slow_build))
+        await read.wait()
+        await self.cache.adelete("key")
+
+        self.assertEqual(await self.cache.aget_or_build("key", build), "new")
+        release.set()
+        self.assertEqual(await stale, "old")
+        self.assertEqual(await self.cache.aget("key"), "new")
+
+    async def test_stale_entries_written_by_other_processes_are_misses(self):
+        # Another process: its own local tier, the same shared one
+        other = TieredCache(prefix="tests", timeout=60)
+        generation = await other.ageneration("key")
+        await self.cache.adelete("key")
+
+        await other.aset("key", "old", generation)
+
+        self.assertIsNone(await self.cache.aget("key"))
+
+
+class HistogramTests(SimpleTestCase):
+
+    def test_renders_cumulative_buckets_sum_and_count(self):
+        histogram = Histogram("latency_seconds", "Latency.", ("view",), (0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(('say "hi"',), value)
+
+        self.assertEqual(histogram.render(), [
+            "# HELP latency_seconds Latency.",
+            "# TYPE latency_seconds histogram",
+            'latency_seconds_bucket{view="say \\"hi\\"",le="0.1"} 2',
+            'latency_seconds_bucket{view="say \\"hi\\"",le="1"} 3',
+            'latency_seconds_bucket{view="say \\"hi\\"",le="+Inf"} 4',
+            'latency_seconds_sum{view="say \\"hi\\""} 3.65',
+            'latency_seconds_count{view="say \\"hi\\""} 4',
+        ])
+
+
+class ThreadHopTests(SimpleTestCase):
+    """Guards the patch of asgiref's SyncToAsync internals, which an upgrade breaks silently."""
+
+    async def test_sync_to_async_hops_are_timed(self):
+        instrument()
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            await sync_to_async(lambda: None)()
+        finally:
+            current_timings.reset(token)
+
+        self.assertGreater(timings.thread_wait, 0)
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+        self.group = Group.objects.create(name="Algebra", created_by=self.user)
+        self.url = reverse("group-detail", kwargs={"group_slug": self.group.slug})
+
+    def test_requests_are_counted_with_their_queries(self):
+        metrics = RequestMetrics()
+        with mock.patch("apps.common.metrics.request_metrics", metrics):
+            self.client.get(self.url)
+            self.client.get(reverse("group-detail", kwargs={"group_slug": "missing"}))
+
+        self.assertEqual(metrics.requests.series, {("group-detail", "GET", "200"): 1, ("group-detail", "GET", "404"): 1})
+        queries = metrics.queries.series[("group-detail", "GET")]
+        # A count per bucket and +Inf, then the sum: one observation per request, the found group's lookup included
+        self.assertEqual(sum(queries[:-1]), 2)
+        self.assertGreaterEqual(queries[-1], 1)
+        self.assertEqual(sum(metrics.thread_wait.series[("group-detail", "GET")][:-1]), 2)
+
+    def test_server_timing_is_sent_on_request(self):
+        self.assertNotIn("Server-Timing", self.client.get(self.url))
+
+        response = self.client.get(self.url, headers={SERVER_TIMING_HEADER: "1"})
+
+        self.assertRegex(response["Server-Timing"], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", wait;dur=')
+
+    def test_metrics_need_the_token(self):
+        self.client.get(self.url)
+
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code, 401)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn('http_requests_total{view="group-detail",method="GET",status="200"}', response.content.decode())
+
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_are_off_without_a_token(self):
+        self.assertEqual(self.client.get("/metrics", headers={"Authorization": "Bearer "}).status_code, 404)
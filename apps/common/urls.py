@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import DatabasePoolStatsAPIView
+
+
+urlpatterns = [
+    path("metrics/db-pool/", DatabasePoolStatsAPIView.as_view(), name="db-pool-stats"),
+]
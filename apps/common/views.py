@@ -1,3 +1,21 @@
-from django.shortcuts import render
+from adrf.views import APIView
+from rest_framework.permissions import IsAdminUser
+from drf_spectacular.utils import extend_schema
+from .db import pool_stats
+from .response import CustomResponse
 
-# Create your views here.
+tags = ["Metrics"]
+
+
+class DatabasePoolStatsAPIView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        tags=tags,
+        summary="Database pool statistics",
+        description="""
+        This endpoint reports the size, usage and connection wait times of the database connection pools
+        """
+    )
+    async def get(self, request):
+        return CustomResponse.success(message="Pool statistics retreived successfully", data=pool_stats())
@@ -0,0 +1,12 @@
+from django.conf import settings
+from apps.common.cache import TieredCache
+
+
+# Serialized group detail payloads by slug, as {"etag": ..., "data": ...}
+group_detail_cache = TieredCache(
+    prefix="groups:detail",
+    timeout=settings.GROUP_DETAIL_CACHE_TIMEOUT,
+    alias=settings.GROUP_DETAIL_CACHE_ALIAS,
+    local_size=settings.GROUP_DETAIL_LOCAL_CACHE_SIZE,
+    local_ttl=settings.GROUP_DETAIL_LOCAL_CACHE_TTL
+)
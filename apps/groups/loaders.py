@@ -0,0 +1,64 @@
+from django.db.models import F, FilteredRelation, Q
+from .models import Group, GroupMembership
+
+
+MEMBERSHIP_FIELDS = [field.attname for field in GroupMembership._meta.concrete_fields]
+
+
+class GroupLoader:
+    """
+    Request-scoped loader for a group and the requesting user's membership.
+    Both are fetched in one query and memoized, so permission classes and
+    the view share a single round trip.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._cache = {}
+
+    @classmethod
+    def for_request(cls, request):
+        loader = getattr(request, "group_loader", None)
+        if loader is None:
+            loader = cls(request.user)
+            request.group_loader = loader
+        return loader
+
+    def _queryset(self):
+        queryset = Group.objects.select_related("created_by")
+        if not self.user.is_authenticated:
+            return queryset
+
+        # unique_together on (user, group) keeps this LEFT JOIN to at most one row
+        return queryset.annotate(
+            caller_membership=FilteredRelation(
+                "groupmembership", condition=Q(groupmembership__user_id=self.user.id)
+            )
+        ).annotate(**{
+            f"membership_{name}": F(f"caller_membership__{name}") for name in MEMBERSHIP_FIELDS
+        })
+
+    def _build_membership(self, group):
+        if getattr(group, "membership_id", None) is None:
+            return None
+
+        values = [getattr(group, f"membership_{name}") for name in MEMBERSHIP_FIELDS]
+        membership = GroupMembership.from_db(group._state.db, MEMBERSHIP_FIELDS, values)
+        membership.group = group
+        membership.user = self.user
+        return membership
+
+    async def load(self, group_slug):
+        if group_slug not in self._cache:
+            group = await self._queryset().aget_or_none(slug=group_slug)
+            membership = self._build_membership(group) if group else None
+            self._cache[group_slug] = (group, membership)
+        return self._cache[group_slug]
+
+    async def get_group(self, group_slug):
+        group, _ = await self.load(group_slug)
+        return group
+
+    async def get_membership(self, group_slug):
+        _, membership = await self.load(group_slug)
+        return membership
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from apps.groups.models import Group
+
+
+class Command(BaseCommand):
+    help = "Recomputes drifted member_count and admin_count values of groups, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Groups checked per statement")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        checked = repaired = 0
+        last_id = None
+
+        # Keyset over group ids so each batch is a short, independent statement
+        while True:
+            queryset = Group.objects.order_by("id").values_list("id", flat=True)
+            if last_id is not None:
+                queryset = queryset.filter(id__gt=last_id)
+            group_ids = list(queryset[:batch_size])
+            if not group_ids:
+                break
+
+            repaired += len(Group.objects.repair_counters(group_ids))
+            checked += len(group_ids)
+            last_id = group_ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} groups, repaired {repaired}."))
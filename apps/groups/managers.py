@@ -0,0 +1,233 @@
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.accounts.models import User
+import uuid
+from apps.common.managers import GetOrNoneManager
+
+
+class GroupManager(GetOrNoneManager):
+
+    CREATE_ATTEMPTS = 5
+
+    def create_unique(self, **fields):
+        """
+        Creates a group, allocating its slug again when a concurrent create took
+        the same one between the allocation and the insert. Every round of such a
+        race has a winner, so up to CREATE_ATTEMPTS simultaneous creates of one
+        name all succeed. Each attempt runs in a savepoint, so a lost race does
+        not abort the caller's transaction.
+        """
+        for attempt in range(self.CREATE_ATTEMPTS):
+            try:
+                with transaction.atomic(using=router.db_for_write(self.model)):
+                    return self.create(**fields)
+            except IntegrityError as e:
+                constraint = getattr(getattr(e.__cause__, "diag", None), "constraint_name", None) or ""
+                if "slug" not in constraint or attempt == self.CREATE_ATTEMPTS - 1:
+                    raise
+
+    async def acreate_unique(self, **fields):
+        return await sync_to_async(self.create_unique)(**fields)
+
+    def touch_timetable(self, **lookup):
+        """Records a change to the timetable of the groups matching `lookup`, in one UPDATE."""
+        return self.filter(**lookup).update(
+            timetable_version=F("timetable_version") + 1, timetable_updated_at=timezone.now()
+        )
+
+    def repair_counters(self, group_ids):
+        """
+        Recomputes member_count and admin_count of the given groups from their
+        memberships and returns the ids of the groups whose counters had drifted.
+        """
+        table = self.model._meta.db_table
+        membership_table = self.model.members.through._meta.db_table
+        sql = f"""
+            WITH actual AS (
+                SELECT g.id,
+                       count(m.id) FILTER (WHERE m.active) AS members,
+                       count(m.id) FILTER (WHERE m.active AND m.role = 'admin') AS admins
+                FROM {table} g
+                LEFT JOIN {membership_table} m ON m.group_id = g.id
+                WHERE g.id = ANY(%s)
+                GROUP BY g.id
+            )
+            UPDATE {table} SET member_count = actual.members, admin_count = actual.admins, version = version + 1
+            FROM actual
+            WHERE {table}.id = actual.id
+              AND ({table}.member_count <> actual.members OR {table}.admin_count <> actual.admins)
+            RETURNING {table}.id
+        """
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, [list(group_ids)])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class GroupMembershipManager(GetOrNoneManager):
+    """
+    Set-based membership administration. Every change runs as one statement
+    that also updates the group's member_count, admin_count and version, so
+    they move atomically with the memberships. Bulk methods run a constant
+    number of statements regardless of how many users they are given, and
+    return a status per user id.
+    """
+
+    def _execute(self, sql, params):
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @property
+    def _group_table(self):
+        return self.model._meta.get_field("group").related_model._meta.db_table
+
+    def _upsert(self, group_id, user_ids, role, update_role):
+        """
+        Inserts memberships, or reactivates those the users left. Active memberships
+        are left untouched and are absent from the result, which maps each changed
+        user id to whether it was inserted (xmax = 0 only holds for fresh rows).
+        """
+        table = self.model._meta.db_table
+        now = timezone.now()
+        set_role = ", role = EXCLUDED.role" if update_role else ""
+        sql = f"""
+            WITH upserted AS (
+                INSERT INTO {table} (id, created_at, updated_at, user_id, group_id, role, joined_at, active)
+                SELECT new.id, %s, %s, new.user_id, %s, %s, %s, true
+                FROM unnest(%s::uuid[], %s::uuid[]) AS new(id, user_id)
+                ON CONFLICT (user_id, group_id) DO UPDATE
+                    SET active = true, updated_at = EXCLUDED.updated_at{set_role}
+                    WHERE NOT {table}.active
+                RETURNING user_id, role, (xmax = 0) AS inserted
+            ), counters AS (
+                UPDATE {self._group_table}
+                SET member_count = member_count + (SELECT count(*) FROM upserted),
+                    admin_count = admin_count + (SELECT count(*) FROM upserted WHERE role = 'admin'),
+                    version = version + 1
+                WHERE id = %s AND EXISTS (SELECT 1 FROM upserted)
+            )
+            SELECT user_id, inserted FROM upserted
+        """
+        ids = [uuid.uuid4() for _ in user_ids]
+        rows = self._execute(sql, [now, now, group_id, role, now, ids, list(user_ids), group_id])
+        return dict(rows)
+
+    def _set_active(self, group_id, user_ids, active):
+        table = self.model._meta.db_table
+        sign = 1 if active else -1
+        sql = f"""
+            WITH changed AS (
+                UPDATE {table} SET active = %s, updated_at = %s
+                WHERE group_id = %s AND user_id = ANY(%s) AND active = %s
+                RETURNING user_id, role
+            ), counters AS (
+                UPDATE {self._group_table}
+                SET member_count = member_count + %s * (SELECT count(*) FROM changed),
+                    admin_count = admin_count + %s * (SELECT count(*) FROM changed WHERE role = 'admin'),
+                    version = version + 1
+                WHERE id = %s AND EXISTS (SELECT 1 FROM changed)
+            )
+            SELECT user_id FROM changed
+        """
+        rows = self._execute(sql, [active, timezone.now(), group_id, list(user_ids), not active, sign, sign, group_id])
+        return {row[0] for row in rows}
+
+    def _set_role(self, group_id, user_ids, role):
+        table = self.model._meta.db_table
+        sign = 1 if role == "admin" else -1
+        sql = f"""
+            WITH changed AS (
+                UPDATE {table} SET role = %s, updated_at = %s
+                WHERE group_id = %s AND user_id = ANY(%s) AND active AND role <> %s
+                RETURNING user_id
+            ), counters AS (
+                UPDATE {self._group_table}
+                SET admin_count = admin_count + %s * (SELECT count(*) FROM changed), version = version + 1
+                WHERE id = %s AND EXISTS (SELECT 1 FROM changed)
+            )
+            SELECT user_id FROM changed
+        """
+        rows = self._execute(sql, [role, timezone.now(), group_id, list(user_ids), role, sign, group_id])
+        return {row[0] for row in rows}
+
+    async def ajoin(self, group, user, role="member"):
+        """
+        Joins or rejoins a group in one idempotent statement, without racing the
+        (user, group) unique constraint. Returns "joined", "rejoined" or "already_member".
+        """
+        changed = await sync_to_async(self._upsert)(group.id, [user.id], role, False)
+        if user.id not in changed:
+            return "already_member"
+        return "joined" if changed[user.id] else "rejoined"
+
+    async def adeactivate(self, group, user_ids):
+        """Deactivates active memberships and returns the user ids that were deactivated."""
+        return await sync_to_async(self._set_active)(group.id, user_ids, False)
+
+    async def aset_role(self, group, user_ids, role):
+        """Changes the role of active members and returns the user ids whose role changed."""
+        return await sync_to_async(self._set_role)(group.id, user_ids, role)
+
+    async def _states(self, group, user_ids):
+        rows = self.filter(group=group, user_id__in=user_ids).values("user_id", "active", "role")
+        return {row["user_id"]: row async for row in rows}
+
+    async def abulk_add(self, group, user_ids, role="member"):
+        """Adds users to the group, reactivating memberships of users who left."""
+        user_ids = list(dict.fromkeys(user_ids))
+        states = await self._states(group, user_ids)
+        known_users = {pk async for pk in User.objects.filter(id__in=user_ids).values_list("id", flat=True)}
+
+        results, pending = {}, []
+        for user_id in user_ids:
+            state = states.get(user_id)
+            if user_id not in known_users:
+                results[user_id] = "user_not_found"
+            elif state and state["active"]:
+                results[user_id] = "already_member"
+            else:
+                results[user_id] = "added"
+                pending.append(user_id)
+
+        if pending:
+            changed = await sync_to_async(self._upsert)(group.id, pending, role, True)
+            for user_id in pending:
+                # Missing from `changed` when a concurrent request added the user first
+                inserted = changed.get(user_id)
+                results[user_id] = "already_member" if inserted is None else ("added" if inserted else "reactivated")
+        return results
+
+    async def abulk_set_active(self, group, user_ids, active):
+        """Reactivates (active=True) or deactivates (active=False) existing memberships."""
+        user_ids = list(dict.fromkeys(user_ids))
+        states = await self._states(group, user_ids)
+        changed = await sync_to_async(self._set_active)(group.id, user_ids, active)
+
+        results = {}
+        for user_id in user_ids:
+            if user_id in changed:
+                results[user_id] = "reactivated" if active else "deactivated"
+            elif user_id not in states:
+                results[user_id] = "not_member"
+            else:
+                results[user_id] = "already_active" if active else "already_inactive"
+        return results
+
+    async def abulk_set_role(self, group, user_ids, role):
+        """Changes the role of active members."""
+        user_ids = list(dict.fromkeys(user_ids))
+        states = await self._states(group, user_ids)
+        changed = await sync_to_async(self._set_role)(group.id, user_ids, role)
+
+        results = {}
+        for user_id in user_ids:
+            state = states.get(user_id)
+            if user_id in changed:
+                results[user_id] = "role_changed"
+            elif state is None or not state["active"]:
+                results[user_id] = "not_member"
+            else:
+                results[user_id] = "unchanged"
+        return results
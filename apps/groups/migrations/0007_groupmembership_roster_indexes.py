@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0006_groupmembership_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(condition=models.Q(('active', True)), fields=['group', 'joined_at', 'id'], name='groupmembership_roster_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(condition=models.Q(('active', True)), fields=['group', 'role', 'joined_at', 'id'], name='groupmembership_role_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0007_groupmembership_roster_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='group_created_by_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='groupmembership',
+            index=models.Index(condition=models.Q(('active', True)), fields=['user', '-joined_at', '-group'], name='groupmembership_user_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0008_group_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='admin_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='member_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE groups_group SET
+                    member_count = (
+                        SELECT count(*) FROM groups_groupmembership m
+                        WHERE m.group_id = groups_group.id AND m.active
+                    ),
+                    admin_count = (
+                        SELECT count(*) FROM groups_groupmembership m
+                        WHERE m.group_id = groups_group.id AND m.active AND m.role = 'admin'
+                    )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
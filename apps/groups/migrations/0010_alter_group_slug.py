@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-18 10:48
+
+import apps.common.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0009_group_member_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='group',
+            name='slug',
+            field=apps.common.fields.UniqueSlugField(editable=False, populate_from='name', unique=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:08
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0010_alter_group_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='timetable_updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='timetable_version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('groups', '0011_group_timetable_updated_at_group_timetable_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
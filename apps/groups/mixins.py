@@ -1,22 +1,77 @@
+import hashlib
+
 from .models import Group, GroupMembership
-from asgiref.sync import sync_to_async
+from .loaders import GroupLoader
+from .cache import group_detail_cache
+from django.contrib.postgres.aggregates import StringAgg
+from django.db.models import CharField, Count, F, Value
+from django.db.models.functions import Cast, Concat, MD5
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 
 
 class GroupMixin:
-    async def __filter__(self, filters):
-        queryset = await sync_to_async(lambda: list(Group.objects.filter(**filters)),thread_sensitive=True)()
-        return queryset
-    
-    async def get_groups(self, user_id, group_filter):
+    def get_groups(self, user_id, group_filter):
+        """
+        Returns the user's groups as a single query, newest first,
+        or None for an unknown filter.
+        """
 
         if group_filter.lower() == "created":
-            return await self.__filter__({"created_by": user_id})
+            return Group.objects.filter(created_by=user_id).order_by("-created_at", "-id")
         
         elif group_filter.lower() == "joined":
-            group_ids = await sync_to_async(lambda: list(GroupMembership.objects.filter(user_id=user_id).values_list("group_id", flat=True)),thread_sensitive=True)()
-            filter = {"id__in": group_ids}
-            return await self.__filter__(filter)
+            return (
+                Group.objects
+                .filter(groupmembership__user_id=user_id, groupmembership__active=True)
+                .annotate(joined_at=F("groupmembership__joined_at"))
+                .order_by("-joined_at", "-id")
+            )
 
     async def get_group(self, group_slug):
-        return await Group.objects.select_related("created_by").prefetch_related("members").aget_or_none(slug=group_slug)
+        return await GroupLoader.for_request(self.request).get_group(group_slug)
+
+    async def get_membership(self, group_slug):
+        return await GroupLoader.for_request(self.request).get_membership(group_slug)
+
+    async def invalidate_group(self, group):
+        """Drops the cached detail payload of a group after a change to it or its roster."""
+        await group_detail_cache.adelete(group.slug)
+
+    def get_roster(self, group, role=None):
+        """Active memberships of a group in (joined_at, id) order, served by the roster indexes."""
+        queryset = GroupMembership.objects.filter(group=group, active=True).order_by("joined_at", "id")
+        if role:
+            queryset = queryset.filter(role=role)
+        return queryset
+
+    def get_group_etag(self, group):
+        return f'"{group.id}-{group.version}"'
+
+    async def get_groups_etag(self, groups, request):
+        """
+        ETag of a page of a group listing: the request's query string and the
+        (id, version) of every listed group, digested in the database in one query.
+        """
+        state = await groups.order_by().aaggregate(
+            count=Count("id"),
+            digest=MD5(StringAgg(
+                Concat(Cast("id", CharField()), Value(":"), Cast("version", CharField())),
+                delimiter=",",
+                order_by="id"
+            ))
+        )
+        parts = [request.get_full_path(), state["count"], state["digest"] or ""]
+        return '"%s"' % hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+    def get_not_modified(self, request, etag, private=False):
+        """A 304 response when the client's copy still matches `etag`, else None."""
+        response = get_conditional_response(request, etag=etag)
+        return response and self.set_etag(response, etag, private)
 
+    def set_etag(self, response, etag, private=False):
+        response["ETag"] = etag
+        # Clients keep their copy but revalidate it on every use
+        patch_cache_control(response, no_cache=True, **({"private": True} if private else {}))
+        if private:
+            patch_vary_headers(response, ["Authorization"])
+        return response
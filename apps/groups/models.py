@@ -2,18 +2,27 @@ from django.db import models
 from apps.common.models import BaseModel
 from apps.common.managers import GetOrNoneManager
 from apps.accounts.models import User
-from django.db import models
-from autoslug import AutoSlugField
+from .managers import GroupManager, GroupMembershipManager
+from django.utils import timezone
+from apps.common.fields import UniqueSlugField
 
 
 class Group(BaseModel):
     name = models.CharField(max_length=100)
     description = models.TextField(null=True, blank=True)
-    slug = AutoSlugField(populate_from='name', unique=True, always_update=False)
+    slug = UniqueSlugField(populate_from='name', unique=True)
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='created_groups')
     members = models.ManyToManyField(User, through='GroupMembership', related_name='joined_groups')
     is_active = models.BooleanField(default=True)
-    objects = GetOrNoneManager()
+    # Active members and active admins, maintained by GroupMembershipManager
+    member_count = models.PositiveIntegerField(default=0)
+    admin_count = models.PositiveIntegerField(default=0)
+    # Moved by every change to the group's details or roster; keys the group ETags
+    version = models.PositiveIntegerField(default=1)
+    # Moved by every change to the group's schedules, events or overrides; keys the calendar feeds
+    timetable_version = models.PositiveIntegerField(default=1)
+    timetable_updated_at = models.DateTimeField(default=timezone.now)
+    objects = GroupManager()
 
     def __str__(self):
         return self.name
@@ -21,6 +30,10 @@ class Group(BaseModel):
     class Meta:
         verbose_name = 'SyncGroup'
         verbose_name_plural = 'SyncGroups'
+        indexes = [
+            # "created" listing: a user's groups, newest first
+            models.Index(fields=["created_by", "-created_at", "-id"], name="group_created_by_idx"),
+        ]
 
 
 class GroupMembership(BaseModel):
@@ -34,11 +47,31 @@ class GroupMembership(BaseModel):
     group = models.ForeignKey(Group, on_delete=models.CASCADE)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default="member")
     joined_at = models.DateTimeField(auto_now_add=True)
-    objects = GetOrNoneManager()
+    objects = GroupMembershipManager()
     active = models.BooleanField(default=True)
 
     class Meta:
         unique_together = ('user', 'group')
+        indexes = [
+            # "joined" listing: a user's active memberships, most recent first
+            models.Index(
+                fields=["user", "-joined_at", "-group"],
+                condition=models.Q(active=True),
+                name="groupmembership_user_idx"
+            ),
+            # Keyset pagination of a group's active roster, optionally by role
+            models.Index(
+                fields=["group", "joined_at", "id"],
+                condition=models.Q(active=True),
+                name="groupmembership_roster_idx"
+            ),
+            # Also serves (group, role) lookups of active memberships, e.g. admins
+            models.Index(
+                fields=["group", "role", "joined_at", "id"],
+                condition=models.Q(active=True),
+                name="groupmembership_role_idx"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.full_name} - {self.group.name} ({self.role})"
@@ -1,18 +1,15 @@
 from rest_framework.permissions import BasePermission
-from .models import Group, GroupMembership
+from .loaders import GroupLoader
 
 
 class IsGroupAdmin(BasePermission):
     async def has_permission(self, request, view):
         group_slug = view.kwargs.get("group_slug")
+        if group_slug is None and isinstance(request.data, dict):
+            group_slug = request.data.get("group_slug")
         if not group_slug or not request.user.is_authenticated:
             return False
 
-        try:
-            group = await Group.objects.aget(slug=group_slug)
-        except Group.DoesNotExist:
-            return False
-
-        membership = await GroupMembership.objects.aget_or_none(user=request.user, group=group, active=True)
-        return membership and membership.role == "admin"
+        membership = await GroupLoader.for_request(request).get_membership(group_slug)
+        return membership is not None and membership.active and membership.role == "admin"
     
@@ -1,22 +1,35 @@
 from adrf.serializers import Serializer as AsyncSerializer
 from .models import GroupMembership
-from asgiref.sync import sync_to_async
 from rest_framework import serializers
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 
 
 class CreateGroupSerializer(AsyncSerializer):
     name = serializers.CharField()
     description = serializers.CharField()
 
+    async def aupdate(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.version = F("version") + 1
+        await instance.asave(update_fields=[*validated_data, "version", "updated_at"])
+        await instance.arefresh_from_db(fields=["version"])
+        return instance
+
 
 class GroupsSerializer(serializers.Serializer):
     name = serializers.CharField()
     slug = serializers.CharField()
+    member_count = serializers.IntegerField()
+    admin_count = serializers.IntegerField()
 
 class GroupDetailSerializer(serializers.Serializer):
     name = serializers.CharField()
     description = serializers.CharField()
     slug = serializers.CharField()
+    member_count = serializers.IntegerField()
+    admin_count = serializers.IntegerField()
     created_by = serializers.SerializerMethodField()
     admins = serializers.SerializerMethodField()
     members = serializers.SerializerMethodField()
@@ -25,8 +38,7 @@ class GroupDetailSerializer(serializers.Serializer):
         return obj.created_by.full_name
     
     def get_members(self, obj):
-        members = obj.members.all()
-        return [{"id":member.id, "full_name":member.full_name} for member in members]
+        return self.context.get("members", [])
     
     def get_admins(self, obj):
         return self.context.get("admins", [])
@@ -34,4 +46,38 @@ class GroupDetailSerializer(serializers.Serializer):
 
 class AssignAdminSerializer(serializers.Serializer):
     member_id = serializers.UUIDField()
-    group_slug = serializers.CharField()
\ No newline at end of file
+    group_slug = serializers.CharField()
+
+
+# Computes User.full_name in the database for values() projections of memberships
+MEMBER_FULL_NAME = Concat("user__first_name", Value(" "), "user__last_name")
+
+
+class GroupMemberSerializer(serializers.Serializer):
+    id = serializers.UUIDField(source="user.id")
+    full_name = serializers.CharField(source="user.full_name")
+    role = serializers.CharField()
+    joined_at = serializers.DateTimeField()
+
+
+class BulkMembershipSerializer(serializers.Serializer):
+    ACTION_CHOICES = [
+        ("add", "Add"),
+        ("reactivate", "Reactivate"),
+        ("deactivate", "Deactivate"),
+        ("set_role", "Set role"),
+    ]
+
+    action = serializers.ChoiceField(choices=ACTION_CHOICES)
+    user_ids = serializers.ListField(child=serializers.UUIDField(), min_length=1, max_length=1000)
+    role = serializers.ChoiceField(choices=GroupMembership.ROLE_CHOICES, required=False)
+
+    def validate(self, attrs):
+        if attrs["action"] == "set_role" and "role" not in attrs:
+            raise serializers.ValidationError({"role": "This field is required to set roles."})
+        return attrs
+
+
+class BulkMembershipResultSerializer(serializers.Serializer):
+    user_id = serializers.UUIDField()
+    status = serializers.CharField()
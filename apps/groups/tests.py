@@ -1,3 +1,276 @@
-from django.test import TestCase
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.accounts.models import User
+from apps.common.fields import MAX_SUFFIX_DIGITS
+from apps.common.limits import KeyedConcurrencyLimiter
+from .cache import group_detail_cache
+from .managers import GroupMembershipManager
+from .mixins import GroupMixin
+from .models import Group, GroupMembership
+from .views import GROUPS_PAGE_SIZE, GroupDetailAPIView
+
+
+def make_user(i):
+    return User.objects.create(email=f"user-{i}@example.com", first_name=f"User{i}", last_name="Tester")
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {AccessToken.for_user(user)}"}
+
+
+class ConcurrentJoinTests(TransactionTestCase):
+    # Concurrent requests run on connections of their own, so nothing can be left in a test transaction
+    users = 12
+
+    def setUp(self):
+        self.owner = make_user("owner")
+        self.group = Group.objects.create(name="Crowded", created_by=self.owner)
+        GroupMembership.objects.create(user=self.owner, group=self.group, role="admin")
+        Group.objects.repair_counters([self.group.id])
+        self.members = [make_user(i) for i in range(self.users)]
+        self.join_url = reverse("join-group", kwargs={"group_slug": self.group.slug})
+        self.leave_url = reverse("leave-group", kwargs={"group_slug": self.group.slug})
+
+    async def request(self, method, url, user):
+        # Like ASGIHandler: a thread (and so a connection) per request, closed when it ends
+        async with ThreadSensitiveContext():
+            try:
+                return await getattr(self.async_client, method)(url, headers=auth(user))
+            finally:
+                await sync_to_async(connections.close_all)()
+
+    def fire(self, method, url, users):
+        async def requests():
+            return await asyncio.gather(*(self.request(method, url, user) for user in users))
+        # A loop of its own, the sync test is not running one
+        return asyncio.run(requests())
+
+    def assert_roster(self, active_users):
+        rows = GroupMembership.objects.filter(group=self.group).exclude(user=self.owner)
+        self.assertEqual(rows.count(), len(self.members))
+        self.assertEqual(rows.values("user").distinct().count(), len(self.members))
+        self.assertEqual(set(rows.filter(active=True).values_list("user_id", flat=True)), {user.id for user in active_users})
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.member_count, len(active_users) + 1)
+        self.assertEqual(Group.objects.repair_counters([self.group.id]), [])
+
+    def test_simultaneous_joins_and_rejoins(self):
+        # Every user joins twice at once: one of each pair joins, the other is told it already is a member
+        responses = self.fire("post", self.join_url, self.members * 2)
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] * self.users + [400] * self.users)
+        self.assert_roster(self.members)
+
+        leavers = self.members[::2]
+        responses = self.fire("delete", self.leave_url, leavers)
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assert_roster(self.members[1::2])
+
+        # Rejoins race fresh joins of the same rows
+        responses = self.fire("post", self.join_url, leavers * 3)
+        statuses = sorted(response.status_code for response in responses)
+        self.assertEqual(statuses, [201] * len(leavers) + [400] * 2 * len(leavers))
+        self.assert_roster(self.members)
+
+    def test_joins_beyond_the_wait_limit_are_shed(self):
+        original = GroupMembershipManager.ajoin
+
+        async def slow_join(manager, *args, **kwargs):
+            # Holds the slot long enough for every request to queue behind it
+            await asyncio.sleep(0.2)
+            return await original(manager, *args, **kwargs)
+
+        limiter = KeyedConcurrencyLimiter(max_concurrency=2, max_waiting=3)
+        with mock.patch("apps.groups.views.join_limiter", limiter), \
+                mock.patch.object(GroupMembershipManager, "ajoin", slow_join):
+            responses = self.fire("post", self.join_url, self.members)
+
+        joined = [response for response in responses if response.status_code == 201]
+        shed = [response for response in responses if response.status_code == 503]
+        self.assertEqual(len(joined) + len(shed), self.users)
+        self.assertEqual(len(joined), 5)
+        self.assertTrue(all(response["Retry-After"] == "1" for response in shed))
+
+        count = GroupMembership.objects.filter(group=self.group, active=True).exclude(user=self.owner).count()
+        self.assertEqual(count, len(joined))
+
+
+class ConcurrentCreateTests(TransactionTestCase):
+
+    def test_racing_creates_of_one_name_get_their_own_slugs(self):
+        owner = make_user("owner")
+        # Every round of the race has a winner, so this many creates are always served by the retries
+        racers = Group.objects.CREATE_ATTEMPTS
+        barrier = threading.Barrier(racers)
+
+        def create():
+            try:
+                barrier.wait()
+                return Group.objects.create_unique(name="Algebra", created_by=owner).slug
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=racers) as executor:
+            slugs = list(executor.map(lambda _: create(), range(racers)))
+
+        self.assertEqual(len(set(slugs)), racers)
+        self.assertIn("algebra", slugs)
+
+
+class GroupSlugTests(TestCase):
+
+    def test_suffixes_past_the_cap_are_not_handed_out_again(self):
+        owner = make_user("owner")
+        last = f"algebra-{10 ** MAX_SUFFIX_DIGITS - 1}"
+        Group.objects.create(name="Algebra", created_by=owner)
+        Group.objects.create(name="Algebra", slug=last, created_by=owner)
+
+        slugs = {Group.objects.create_unique(name="Algebra", created_by=owner).slug for _ in range(3)}
+
+        self.assertEqual(len(slugs), 3)
+        self.assertTrue(all(len(slug.rpartition("-")[2]) <= MAX_SUFFIX_DIGITS for slug in slugs))
+        self.assertNotIn(last, slugs)
+
+
+class GroupListingPlanTests(TestCase):
+    """The listings are served by their indexes, in index order, without sorting the user's groups."""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([
+            User(email=f"user-{i}@example.com", first_name=f"User{i}", last_name="Tester", username=f"user-{i}")
+            for i in range(60)
+        ])
+        # The first user created and joined half of the groups: too many to fetch and sort per page
+        owners = [users[0] if i % 2 else users[i % len(users)] for i in range(2000)]
+        groups = Group.objects.bulk_create([
+            Group(name=f"Group {i}", slug=f"group-{i}", created_by=owner) for i, owner in enumerate(owners)
+        ])
+        GroupMembership.objects.bulk_create([
+            GroupMembership(user=users[0] if i % 2 else users[i % len(users)], group=group, active=i % 7 != 0)
+            for i, group in enumerate(reversed(groups))
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Group._meta.db_table}, {GroupMembership._meta.db_table}")
+        cls.user = users[0]
+
+    def explain(self, group_filter):
+        # The first page, as the cursor paginator asks for it
+        return GroupMixin().get_groups(self.user.id, group_filter)[:GROUPS_PAGE_SIZE + 1].explain()
+
+    def test_created_listing_uses_created_by_index(self):
+        plan = self.explain("created")
+        self.assertIn("group_created_by_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_joined_listing_uses_membership_index(self):
+        plan = self.explain("joined")
+        self.assertIn("groupmembership_user_idx", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class GroupDetailCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        group_detail_cache.local.clear()
+        self.owner = make_user("owner")
+        self.group = Group.objects.create(name="Algebra", description="Rings", created_by=self.owner)
+        GroupMembership.objects.create(user=self.owner, group=self.group, role="admin")
+        self.url = reverse("group-detail", kwargs={"group_slug": self.group.slug})
+
+    async def test_update_during_a_detail_build_is_not_hidden_by_it(self):
+        original = GroupDetailAPIView.build_detail
+        read = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_build(view, group_slug):
+            detail = await original(view, group_slug)
+            if not read.is_set():
+                read.set()
+                await release.wait()
+            return detail
+
+        with mock.patch.object(GroupDetailAPIView, "build_detail", slow_build):
+            stale = asyncio.ensure_future(self.async_client.get(self.url))
+            await read.wait()
+            response = await self.async_client.patch(
+                self.url, {"name": "Linear Algebra"}, content_type="application/json", headers=auth(self.owner)
+            )
+            self.assertEqual(response.status_code, 200)
+            release.set()
+            self.assertEqual((await stale).json()["data"]["name"], "Algebra")
+
+            response = await self.async_client.get(self.url)
+
+        self.assertEqual(response.json()["data"]["name"], "Linear Algebra")
+
+
+class GroupETagTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        group_detail_cache.local.clear()
+        self.owner = make_user("owner")
+        self.student = make_user("student")
+        self.group = Group.objects.create(name="Algebra", description="Rings", created_by=self.owner)
+        GroupMembership.objects.create(user=self.owner, group=self.group, role="admin")
+        self.detail_url = reverse("group-detail", kwargs={"group_slug": self.group.slug})
+        self.list_url = reverse("group-list-create")
+
+    def test_detail_is_not_modified_until_the_group_changes(self):
+        first = self.client.get(self.detail_url)
+        self.assertEqual(first["ETag"], f'"{self.group.id}-{self.group.version}"')
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        # Served from the cached payload
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], first["ETag"])
+
+        self.client.post(reverse("join-group", kwargs={"group_slug": self.group.slug}), headers=auth(self.student))
+        response = self.client.get(self.detail_url, headers={"If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+
+    def test_list_is_private_and_moves_with_its_groups(self):
+        url = f"{self.list_url}?group_filter=joined"
+        first = self.client.get(url, headers=auth(self.owner))
+        self.assertIn("private", first["Cache-Control"])
+        self.assertIn("Authorization", first["Vary"])
+        response = self.client.get(url, headers={**auth(self.owner), "If-None-Match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        self.client.patch(
+            self.detail_url, {"name": "Linear Algebra"}, content_type="application/json", headers=auth(self.owner)
+        )
+        second = self.client.get(url, headers={**auth(self.owner), "If-None-Match": first["ETag"]})
+        self.assertEqual(second.status_code, 200)
+
+        # Another page, or another user, never matches
+        created = self.client.get(self.list_url, headers={**auth(self.owner), "If-None-Match": second["ETag"]})
+        self.assertEqual(created.status_code, 200)
+        self.client.post(reverse("join-group", kwargs={"group_slug": self.group.slug}), headers=auth(self.student))
+        student = self.client.get(url, headers={**auth(self.student), "If-None-Match": second["ETag"]})
+        self.assertEqual(student.status_code, 200)
+
+    def test_leaving_moves_the_joined_listing(self):
+        self.client.post(reverse("join-group", kwargs={"group_slug": self.group.slug}), headers=auth(self.student))
+        url = f"{self.list_url}?group_filter=joined"
+        etag = self.client.get(url, headers=auth(self.student))["ETag"]
+
+        self.client.delete(reverse("leave-group", kwargs={"group_slug": self.group.slug}), headers=auth(self.student))
+        response = self.client.get(url, headers={**auth(self.student), "If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], [])
@@ -4,26 +4,64 @@ from .serializers import (
     GroupsSerializer,
     CreateGroupSerializer,
     GroupDetailSerializer,
-    AssignAdminSerializer
+    GroupMemberSerializer,
+    AssignAdminSerializer,
+    BulkMembershipSerializer,
+    BulkMembershipResultSerializer,
+    MEMBER_FULL_NAME
 )
+from apps.common.serializers import ProjectionSerializer
+from apps.common.limits import KeyedConcurrencyLimiter, Overloaded
+from apps.calendars.models import PROVIDER_GOOGLE, SyncJob
+from apps.schedules.clashes import clash_index
+from apps.schedules.mixins import ClashMixin
+from apps.schedules.serializers import ClashSerializer
+from django.conf import settings
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from asgiref.sync import sync_to_async
 from .models import Group, GroupMembership  
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from .mixins import GroupMixin
 from .permissions import IsGroupAdmin
+from .cache import group_detail_cache
 
 tags = ["Group"]
 
+GROUPS_PAGE_SIZE = 20
+MEMBERS_PREVIEW_SIZE = 20
+MEMBERS_PAGE_SIZE = 50
+MEMBERS_MAX_PAGE_SIZE = 200
+
+# Invite-link bursts: bounds concurrent joins per group so a hot group cannot starve the pool
+join_limiter = KeyedConcurrencyLimiter(
+    max_concurrency=settings.GROUP_JOIN_MAX_CONCURRENCY,
+    max_waiting=settings.GROUP_JOIN_MAX_WAITING
+)
+
+# Bulk statuses that change which timetables a user's calendar shows
+MEMBERSHIP_CHANGES = {"added", "reactivated", "deactivated"}
+# Bulk statuses that change the group's roster
+ROSTER_CHANGES = MEMBERSHIP_CHANGES | {"role_changed"}
+
+BULK_ACTIONS = {
+    "add": lambda group, data: GroupMembership.objects.abulk_add(group, data["user_ids"], data.get("role", "member")),
+    "reactivate": lambda group, data: GroupMembership.objects.abulk_set_active(group, data["user_ids"], True),
+    "deactivate": lambda group, data: GroupMembership.objects.abulk_set_active(group, data["user_ids"], False),
+    "set_role": lambda group, data: GroupMembership.objects.abulk_set_role(group, data["user_ids"], data["role"]),
+}
+
 class GroupListCreateAPIView(APIView, GroupMixin):
     serializer_class = GroupsSerializer
+    projection = ProjectionSerializer(GroupsSerializer)
     post_serializer = CreateGroupSerializer
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
             tags = tags,
             summary = "Retreive user's groups",
-            description = "This endpoint retrieves the groups a user is admin or member of",
+            description = """
+            This endpoint retrieves the groups a user is admin or member of.
+            Responses carry an ETag, send it back in If-None-Match to get a 304 while the page is unchanged
+            """,
             parameters = [
                 OpenApiParameter(
                     name="group_filter",
@@ -37,10 +75,27 @@ class GroupListCreateAPIView(APIView, GroupMixin):
     )
     async def get(self, request):
         group_filter = request.query_params.get("group_filter", "created")
-        groups = await self.get_groups(request.user.id, group_filter)
-
-        serializers = self.serializer_class(groups, many=True)
-        return CustomResponse.success(message="Groups retreived successfully", data=serializers.data)
+        groups = self.get_groups(request.user.id, group_filter)
+        if groups is None:
+            return CustomResponse.error(message="Invalid group filter")
+
+        etag = await self.get_groups_etag(groups, request)
+        not_modified = self.get_not_modified(request, etag, private=True)
+        if not_modified:
+            return not_modified
+
+        response = await CustomResponse.asuccess(
+            message="Groups retreived successfully",
+            data=self.projection.project(groups),
+            paginate="cursor",
+            request=request,
+            view=self,
+            page_size=GROUPS_PAGE_SIZE,
+            encoder=self.projection.encode
+        )
+        if response.status_code != 200:
+            return response
+        return self.set_etag(response, etag, private=True)
 
     @extend_schema(
         tags = tags,
@@ -53,17 +108,14 @@ class GroupListCreateAPIView(APIView, GroupMixin):
         serializer = self.post_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        group = await Group.objects.acreate(
+        group = await Group.objects.acreate_unique(
             created_by=request.user,
             name=serializer.validated_data["name"],
             description=serializer.validated_data["description"]
         )
 
-        await GroupMembership.objects.acreate(
-            user=request.user,
-            group=group,
-            role="admin"
-        )
+        await GroupMembership.objects.ajoin(group, request.user, role="admin")
+        group.member_count = group.admin_count = 1
 
         serializer = self.serializer_class(group)
         return CustomResponse.success(message="Group created successfully", data=serializer.data, status_code=201)
@@ -82,46 +134,122 @@ class GroupDetailAPIView(APIView, GroupMixin):
         tags=tags,
         summary="Get group details",
         description="""
-        This endpoint retreives the details of a group
+        This endpoint retreives the details of a group.
+        Responses carry an ETag, send it back in If-None-Match to get a 304 while the group is unchanged
         """
     )
     async def get(self, request, group_slug):
+        detail = await group_detail_cache.aget_or_build(group_slug, lambda: self.build_detail(group_slug))
+        if detail is None:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        not_modified = self.get_not_modified(request, detail["etag"])
+        if not_modified:
+            return not_modified
+
+        response = CustomResponse.success(message="Group retreived successfully", data=detail["data"])
+        return self.set_etag(response, detail["etag"])
+
+    async def build_detail(self, group_slug):
         group = await self.get_group(group_slug)
         if not group:
-            return CustomResponse.error(message="Group not found", status_code=404)
-        
-        admins_qs = await sync_to_async(lambda: list(GroupMembership.objects.select_related("user").filter(group=group, role="admin", active=True)),thread_sensitive=True)()
-        admins = [{"id": admin.user.id, "admin":admin.user.full_name} for admin in admins_qs]
+            return None
+
+        # Bounded summary, the full roster is paged through GroupMembersAPIView
+        admins_qs = self.get_roster(group, role="admin").values("user_id", full_name=MEMBER_FULL_NAME)
+        members_qs = self.get_roster(group).values("user_id", full_name=MEMBER_FULL_NAME)
+        admins = [{"id": admin["user_id"], "admin": admin["full_name"]} async for admin in admins_qs[:MEMBERS_PREVIEW_SIZE]]
+        members = [{"id": member["user_id"], "full_name": member["full_name"]} async for member in members_qs[:MEMBERS_PREVIEW_SIZE]]
 
-        serializer = self.serializer_class(group, context={"admins":admins})
-        return CustomResponse.success(message="Group retreived successfully", data=serializer.data)
+        serializer = self.serializer_class(group, context={"admins":admins, "members":members})
+        return {"etag": self.get_group_etag(group), "data": dict(serializer.data)}
 
     async def patch(self, request, group_slug):
+        # IsGroupAdmin has already loaded the group for this request
         group = await self.get_group(group_slug)
         if not group:
             return CustomResponse.error(message="Group not found", status_code=404)
 
-        for permission in self.get_permissions():
-            if not await sync_to_async(permission.has_object_permission)(request, self, group):
-                return CustomResponse.error(message="Permission denied", status_code=403)
-            
-        
-        serializer = self.patch_serializer(group, data=request.data)
+        serializer = self.patch_serializer(group, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        await serializer.asave()
+        await self.invalidate_group(group)
 
         return CustomResponse.success(message="Group updated successfully", data=serializer.data)
 
 
-class JoinGroupAPIView(APIView, GroupMixin):
+class GroupMembersAPIView(APIView, GroupMixin):
+    serializer_class = GroupMemberSerializer
+    projection = ProjectionSerializer(GroupMemberSerializer, expressions={"full_name": MEMBER_FULL_NAME})
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        tags=tags,
+        summary="List group members",
+        description="""
+        This endpoint pages through the active members of a group, oldest first
+        """,
+        parameters=[
+            OpenApiParameter(
+                name="role",
+                description="Only return members with this role",
+                type=str,
+                enum=["member", "admin"],
+                required=False
+            ),
+            OpenApiParameter(
+                name="cursor",
+                description="The `next` cursor returned by the previous page",
+                type=str,
+                required=False
+            ),
+            OpenApiParameter(
+                name="limit",
+                description=f"Page size, at most {MEMBERS_MAX_PAGE_SIZE}",
+                type=int,
+                default=MEMBERS_PAGE_SIZE,
+                required=False
+            )
+        ]
+    )
+    async def get(self, request, group_slug):
+        group = await self.get_group(group_slug)
+        if not group:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        role = request.query_params.get("role")
+        if role and role not in dict(GroupMembership.ROLE_CHOICES):
+            return CustomResponse.error(message="Invalid role")
+
+        try:
+            limit = min(int(request.query_params.get("limit", MEMBERS_PAGE_SIZE)), MEMBERS_MAX_PAGE_SIZE)
+        except ValueError:
+            return CustomResponse.error(message="Invalid limit")
+        if limit < 1:
+            return CustomResponse.error(message="Invalid limit")
+
+        return await CustomResponse.asuccess(
+            message="Group members retreived successfully",
+            data=self.projection.project(self.get_roster(group, role=role)),
+            paginate="cursor",
+            request=request,
+            view=self,
+            page_size=limit,
+            encoder=self.projection.encode
+        )
+
+
+class JoinGroupAPIView(APIView, GroupMixin, ClashMixin):
     permission_classes = [IsAuthenticated]
 
     @extend_schema(
         tags=tags,
         summary="Join a group",
         description="""
-        This endpoint adds a user to a group
-        """
+        This endpoint adds a user to a group, and returns the first clashes between the group's timetable
+        and those of the user's other groups
+        """,
+        responses=ClashSerializer(many=True)
     )
     async def post(self, request, group_slug):
         group = await self.get_group(group_slug=group_slug)
@@ -131,20 +259,24 @@ class JoinGroupAPIView(APIView, GroupMixin):
         if not group.is_active:
             return CustomResponse.error(message="Group is inactive", status_code=400)
         
-        # Check if the user is already an active member
-        is_active_member = await GroupMembership.objects.aget_or_none(user=request.user, group=group, active=True)
-        if is_active_member:
+        try:
+            async with join_limiter.limit(group.id):
+                result = await GroupMembership.objects.ajoin(group, request.user)
+        except Overloaded:
+            response = CustomResponse.error(message="This group is busy, please try again shortly", status_code=503)
+            response["Retry-After"] = "1"
+            return response
+
+        if result == "already_member":
             return CustomResponse.error(message="You are already a member of this group", status_code=400)
-        
-        # Check if the user is an inactive member, if yes, simply update active to true
-        is_inactive_member = await GroupMembership.objects.aget_or_none(user=request.user, group=group, active=False)
-        if is_inactive_member:
-            is_inactive_member.active = True
-            await is_inactive_member.asave()
-            return CustomResponse.success(message="Joined group successfully", status_code=201)
+        await self.invalidate_group(group)
+        await SyncJob.objects.aenqueue_users([request.user.id], PROVIDER_GOOGLE)
 
-        await GroupMembership.objects.acreate(user=request.user, group=group, role="member")
-        return CustomResponse.success(message="Joined group successfully", status_code=201)
+        # Only the new group's index is built, the user's other groups are usually indexed already
+        timetables = await self.get_user_timetables(request.user, exclude=group.id)
+        clashes = await clash_index.group_clashes((group.id, group.timetable_version), timetables)
+        data = ClashSerializer(clashes[:settings.CLASH_JOIN_LIMIT], many=True).data
+        return CustomResponse.success(message="Joined group successfully", data=data, status_code=201)
 
 
 class LeaveGroupAPIView(APIView, GroupMixin):
@@ -163,12 +295,12 @@ class LeaveGroupAPIView(APIView, GroupMixin):
         if not group:
             return CustomResponse.error(message="Group not found", status_code=404)
         
-        is_active_member = await GroupMembership.objects.aget_or_none(user=request.user, group=group, active=True)
-        if not is_active_member:
+        left = await GroupMembership.objects.adeactivate(group, [request.user.id])
+        if not left:
             return CustomResponse.error(message="You are not a member of this group", status_code=400)
+        await self.invalidate_group(group)
+        await SyncJob.objects.aenqueue_users(left, PROVIDER_GOOGLE)
 
-        is_active_member.active = False
-        await is_active_member.asave()
         return CustomResponse.success(message="Left group successfully", status_code=200)
 
 
@@ -187,15 +319,52 @@ class RemoveUserFromGroupAPIView(APIView, GroupMixin):
         if not group:
             return CustomResponse.error(message="Group not found", status_code=404)
 
-        member = await GroupMembership.objects.aget_or_none(user_id=member_id, group=group, active=True)
-        if not member:
+        removed = await GroupMembership.objects.adeactivate(group, [member_id])
+        if not removed:
             return CustomResponse.error(message="Member not found", status_code=404)
+        await self.invalidate_group(group)
+        await SyncJob.objects.aenqueue_users(removed, PROVIDER_GOOGLE)
         
-        member.active = False
-        await member.asave()
         return CustomResponse.success(message="Removed user from group successfully", status_code=200)
 
 
+class BulkMembershipAPIView(APIView, GroupMixin):
+    serializer_class = BulkMembershipSerializer
+    response_serializer = BulkMembershipResultSerializer
+    permission_classes = [IsAuthenticated, IsGroupAdmin]
+
+    @extend_schema(
+        tags=tags,
+        summary="Bulk membership administration",
+        description="""
+        This endpoint allows a group admin to add, reactivate, deactivate or change the role of many users at once.
+        Each user id gets its own status in the response.
+        """,
+        request=BulkMembershipSerializer,
+        responses=BulkMembershipResultSerializer(many=True)
+    )
+    async def post(self, request, group_slug):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        group = await self.get_group(group_slug)
+        if not group:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        action = BULK_ACTIONS[serializer.validated_data["action"]]
+        results = await action(group, serializer.validated_data)
+        if set(results.values()) & ROSTER_CHANGES:
+            await self.invalidate_group(group)
+        changed = [user_id for user_id, status in results.items() if status in MEMBERSHIP_CHANGES]
+        if changed:
+            await SyncJob.objects.aenqueue_users(changed, PROVIDER_GOOGLE)
+
+        response = self.response_serializer(
+            [{"user_id": user_id, "status": status} for user_id, status in results.items()], many=True
+        )
+        return CustomResponse.success(message="Memberships updated successfully", data=response.data)
+
+
 class AssignAdminAPIView(APIView, GroupMixin):
     serializer_class = AssignAdminSerializer
     permission_classes = [IsAuthenticated, IsGroupAdmin]
@@ -204,8 +373,8 @@ class AssignAdminAPIView(APIView, GroupMixin):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        group_slug = serializer.validated_data["group"]
-        group = await self.get_group(slug=group_slug)
+        group_slug = serializer.validated_data["group_slug"]
+        group = await self.get_group(group_slug)
         if not group:
             return CustomResponse.error(message="Group not found", status_code=404)
 
@@ -214,8 +383,8 @@ class AssignAdminAPIView(APIView, GroupMixin):
         if not member:
             return CustomResponse.error(message="Member not found", status_code=404)
 
-        member.role = "admin"
-        await member.asave()
+        if await GroupMembership.objects.aset_role(group, [member_id], "admin"):
+            await self.invalidate_group(group)
 
         return CustomResponse.success(message="Assigned admin successfully")
 
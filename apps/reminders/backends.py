@@ -0,0 +1,102 @@
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parseaddr
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+class SendGridError(Exception):
+    pass
+
+
+def _address(value):
+    name, email = parseaddr(value)
+    return {"email": email, "name": name} if name else {"email": email}
+
+
+class SendGridBackend(BaseEmailBackend):
+    """
+    Email backend for the SendGrid v3 Mail Send API. A batch of messages is sent
+    over one pooled session with SENDGRID_CONCURRENCY requests in flight.
+    """
+
+    def __init__(self, api_key=None, api_url=None, concurrency=None, timeout=10, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.api_key = api_key or settings.SENDGRID_API_KEY
+        self.api_url = api_url or settings.SENDGRID_API_URL
+        self.concurrency = concurrency or settings.SENDGRID_CONCURRENCY
+        self.timeout = timeout
+        self.session = None
+
+    def open(self):
+        if self.session is not None:
+            return False
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {self.api_key}"
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        return True
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    @staticmethod
+    def _payload(message):
+        personalization = {"to": [_address(address) for address in message.to]}
+        if message.cc:
+            personalization["cc"] = [_address(address) for address in message.cc]
+        if message.bcc:
+            personalization["bcc"] = [_address(address) for address in message.bcc]
+
+        content = [{"type": f"text/{message.content_subtype}", "value": message.body}]
+        content.extend(
+            {"type": mimetype, "value": alternative}
+            for alternative, mimetype in getattr(message, "alternatives", [])
+        )
+        payload = {
+            "personalizations": [personalization],
+            "from": _address(message.from_email),
+            "subject": message.subject,
+            "content": content,
+        }
+        if message.reply_to:
+            payload["reply_to"] = _address(message.reply_to[0])
+        if message.extra_headers:
+            payload["headers"] = {name: str(value) for name, value in message.extra_headers.items()}
+        return payload
+
+    def _send(self, message):
+        response = self.session.post(self.api_url, json=self._payload(message), timeout=self.timeout)
+        if response.status_code >= 300:
+            raise SendGridError(f"{response.status_code}: {response.text[:200]}")
+
+    def send_messages(self, email_messages):
+        messages = [message for message in email_messages if message.recipients()]
+        if not messages:
+            return 0
+
+        new_session = self.open()
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                results = list(executor.map(self._capture, messages))
+        finally:
+            if new_session:
+                self.close()
+
+        errors = [error for error in results if error is not None]
+        if errors and not self.fail_silently:
+            # Every message was attempted, so a failure does not hold back the rest of the batch
+            raise SendGridError(f"{len(errors)} of {len(messages)} messages failed, first: {errors[0]}")
+        return len(messages) - len(errors)
+
+    def _capture(self, message):
+        try:
+            self._send(message)
+        except (requests.RequestException, SendGridError) as e:
+            return e
+        return None
@@ -0,0 +1,154 @@
+from collections import namedtuple
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Exists, OuterRef
+from apps.groups.models import GroupMembership
+from apps.schedules.models import Event
+from apps.schedules.occurrences import expand_events
+from .models import ReminderDigest
+
+
+Entry = namedtuple("Entry", ["starts_at", "ends_at", "title", "location", "group_name", "tzinfo"])
+
+
+def day_window(day, tzinfo):
+    """[start, end) of `day` in `tzinfo`."""
+    return (
+        datetime.combine(day, time.min, tzinfo=tzinfo),
+        datetime.combine(day + timedelta(days=1), time.min, tzinfo=tzinfo),
+    )
+
+
+def group_agendas(start, end):
+    """
+    {group_id: [Entry]} of the occurrences starting in [start, end) across every
+    active schedule, expanded in one pass over the events of the window.
+    """
+    events = list(
+        Event.objects.in_window(start, end)
+        .filter(schedule__is_active=True, schedule__group__is_active=True)
+        .select_related("schedule__group")
+    )
+    schedules = {event.schedule_id: event.schedule for event in events}
+
+    agendas = {}
+    for occurrence in expand_events(events, start, end):
+        if occurrence.starts_at < start:
+            continue
+        schedule = schedules[occurrence.schedule_id]
+        agendas.setdefault(schedule.group_id, []).append(Entry(
+            occurrence.starts_at, occurrence.ends_at, occurrence.title, occurrence.location,
+            schedule.group.name, schedule.tzinfo
+        ))
+    return agendas
+
+
+def recipients(day, group_ids, retry_failed=False):
+    """
+    (user_id, email, first_name, group_id) rows of the active members of the
+    groups, ordered by user, without the users already handled for `day`.
+    """
+    handled = ReminderDigest.objects.filter(user_id=OuterRef("user_id"), day=day)
+    if retry_failed:
+        handled = handled.exclude(status="failed")
+    return (
+        GroupMembership.objects
+        .filter(group_id__in=group_ids, active=True, user__is_active=True)
+        .filter(~Exists(handled))
+        .order_by("user_id")
+        .values_list("user_id", "user__email", "user__first_name", "group_id")
+    )
+
+
+def render_digest(first_name, day, entries):
+    """Returns (subject, body) of a digest."""
+    lines = [f"Hi {first_name},", "", f"Here is your schedule for {day:%A, %d %B %Y}:", ""]
+    for entry in entries:
+        starts_at = entry.starts_at.astimezone(entry.tzinfo)
+        ends_at = entry.ends_at.astimezone(entry.tzinfo)
+        line = f"  {starts_at:%H:%M}-{ends_at:%H:%M} {starts_at:%Z}  {entry.title}"
+        if entry.location:
+            line += f" @ {entry.location}"
+        lines.append(f"{line} ({entry.group_name})")
+    lines.extend(["", "ScheduleSync"])
+    return f"Your schedule for {day:%A, %d %B}", "\n".join(lines)
+
+
+def digests(day, agendas, rows):
+    """Folds the recipient rows into one (user_id, email, subject, body, count) per user, lazily."""
+    for user_id, user_rows in groupby(rows, key=itemgetter(0)):
+        entries = []
+        for _, email, first_name, group_id in user_rows:
+            entries.extend(agendas[group_id])
+        entries.sort(key=attrgetter("starts_at"))
+        subject, body = render_digest(first_name, day, entries)
+        yield user_id, email, subject, body, len(entries)
+
+
+@dataclass
+class DigestRun:
+    users: int = 0
+    sent: int = 0
+    failed: int = 0
+    # Users another run had already claimed
+    skipped: int = 0
+
+
+class DigestSendFailed(Exception):
+    def __init__(self, run, error):
+        super().__init__(str(error))
+        self.run = run
+
+
+def send_digests(day, chunk_size=None, retry_failed=False, connection=None):
+    """
+    Sends the reminder digests of `day` to every member of a group with events
+    that day. Recipients are streamed, and each chunk is claimed in one statement,
+    handed to the mail backend as one batch, and marked sent in one more, so the
+    query count grows with the number of chunks, not of users.
+
+    A run can be repeated or restarted at any time: users with a digest row for
+    the day are skipped. Rows of a chunk the backend rejected are marked failed
+    and only retried with `retry_failed`, since part of the chunk may have been
+    delivered; the run stops there so the remaining users stay unclaimed.
+    """
+    chunk_size = chunk_size or settings.REMINDER_CHUNK_SIZE
+    start, end = day_window(day, ZoneInfo(settings.REMINDER_TIMEZONE))
+    agendas = group_agendas(start, end)
+    run = DigestRun()
+    if not agendas:
+        return run
+
+    rows = recipients(day, list(agendas), retry_failed).iterator(chunk_size=chunk_size * 4)
+    pending = digests(day, agendas, rows)
+    connection = connection or get_connection()
+    with connection:
+        while chunk := list(islice(pending, chunk_size)):
+            run.users += len(chunk)
+            claimed = ReminderDigest.objects.claim(
+                day, {user_id: count for user_id, _, _, _, count in chunk}, retry_failed
+            )
+            run.skipped += len(chunk) - len(claimed)
+            if not claimed:
+                continue
+
+            messages = [
+                EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, [email])
+                for user_id, email, subject, body, _ in chunk if user_id in claimed
+            ]
+            try:
+                connection.send_messages(messages)
+            except Exception as e:
+                ReminderDigest.objects.mark_failed(day, claimed, f"{type(e).__name__}: {e}")
+                run.failed += len(claimed)
+                raise DigestSendFailed(run, e)
+
+            ReminderDigest.objects.mark_sent(day, claimed)
+            run.sent += len(claimed)
+    return run
@@ -0,0 +1,33 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.reminders.digest import DigestSendFailed, send_digests
+
+
+class Command(BaseCommand):
+    help = "Emails every group member the next day's schedule. Safe to rerun: nobody gets a day twice."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--day", type=date.fromisoformat,
+            help="Day to send the schedule of, YYYY-MM-DD (default tomorrow in REMINDER_TIMEZONE)"
+        )
+        parser.add_argument("--chunk-size", type=int, help="Digests per mail batch (default REMINDER_CHUNK_SIZE)")
+        parser.add_argument(
+            "--retry-failed", action="store_true",
+            help="Also resend digests whose batch failed; some of them may already have been delivered"
+        )
+
+    def handle(self, *args, **options):
+        day = options["day"] or datetime.now(ZoneInfo(settings.REMINDER_TIMEZONE)).date() + timedelta(days=1)
+        try:
+            run = send_digests(day, chunk_size=options["chunk_size"], retry_failed=options["retry_failed"])
+        except DigestSendFailed as e:
+            run = e.run
+            raise CommandError(
+                f"{day}: stopped after {run.sent} sent, {run.failed} failed: {e}. "
+                "Rerun to continue with the remaining users."
+            )
+        self.stdout.write(f"{day}: {run.sent} sent, {run.skipped} already handled, {run.users} recipients")
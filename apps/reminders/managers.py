@@ -0,0 +1,43 @@
+import uuid
+
+from django.db import connections, router
+from django.utils import timezone
+from apps.common.managers import GetOrNoneManager
+
+
+class ReminderDigestManager(GetOrNoneManager):
+
+    def claim(self, day, counts, retry_failed=False):
+        """
+        Claims the day's digest for each user id in `counts` ({user_id: occurrence count})
+        in one statement and returns the user ids this run now owns. Users another run
+        already claimed are left out; failed claims are taken over only with `retry_failed`.
+        """
+        table = self.model._meta.db_table
+        now = timezone.now()
+        on_conflict = "DO NOTHING"
+        if retry_failed:
+            on_conflict = f"""DO UPDATE SET status = 'sending', error = '', updated_at = EXCLUDED.updated_at
+                WHERE {table}.status = 'failed'"""
+        sql = f"""
+            INSERT INTO {table} (id, created_at, updated_at, user_id, day, status, occurrence_count, error)
+            SELECT new.id, %s, %s, new.user_id, %s, 'sending', new.occurrence_count, ''
+            FROM unnest(%s::uuid[], %s::uuid[], %s::integer[]) AS new(id, user_id, occurrence_count)
+            ON CONFLICT (user_id, day) {on_conflict}
+            RETURNING user_id
+        """
+        user_ids = list(counts)
+        ids = [uuid.uuid4() for _ in user_ids]
+        with connections[router.db_for_write(self.model)].cursor() as cursor:
+            cursor.execute(sql, [now, now, day, ids, user_ids, [counts[user_id] for user_id in user_ids]])
+            return {row[0] for row in cursor.fetchall()}
+
+    def mark_sent(self, day, user_ids):
+        return self.filter(day=day, user_id__in=user_ids, status="sending").update(
+            status="sent", sent_at=timezone.now(), updated_at=timezone.now()
+        )
+
+    def mark_failed(self, day, user_ids, error):
+        return self.filter(day=day, user_id__in=user_ids, status="sending").update(
+            status="failed", error=error, updated_at=timezone.now()
+        )
@@ -0,0 +1,32 @@
+from django.db import models
+from apps.common.models import BaseModel
+from apps.accounts.models import User
+from .managers import ReminderDigestManager
+
+
+class ReminderDigest(BaseModel):
+    """
+    One user's reminder for one day. The row is claimed before the email goes
+    out, so a day is never sent twice, even across crashed or concurrent runs.
+    """
+
+    STATUS_CHOICES = [
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reminder_digests")
+    day = models.DateField()
+    # Claimed rows stay "sending" if the run died before the backend confirmed them
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="sending")
+    occurrence_count = models.PositiveIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+    objects = ReminderDigestManager()
+
+    class Meta:
+        unique_together = ("user", "day")
+
+    def __str__(self):
+        return f"{self.user} - {self.day}"
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from apps.accounts.models import User
+from apps.groups.models import Group, GroupMembership
+from apps.schedules.models import Event, Schedule
+from .digest import DigestSendFailed, send_digests
+from .models import ReminderDigest
+
+
+DAY = date(2026, 10, 20)
+
+
+@override_settings(REMINDER_TIMEZONE="UTC")
+class SendDigestsTests(TestCase):
+
+    def setUp(self):
+        self.users = [
+            User.objects.create(email=f"user-{i}@example.com", first_name=f"User{i}", last_name="Tester")
+            for i in range(5)
+        ]
+        self.groups = [Group.objects.create(name=name, created_by=self.users[0]) for name in ("Algebra", "Botany")]
+        for i, user in enumerate(self.users):
+            GroupMembership.objects.create(user=user, group=self.groups[i % 2])
+        # The first user is in both groups
+        GroupMembership.objects.create(user=self.users[0], group=self.groups[1])
+        for hour, group in ((9, self.groups[0]), (11, self.groups[1])):
+            schedule = Schedule.objects.create(group=group, name="Term", created_by=self.users[0])
+            starts_at = datetime(2026, 10, 13, hour, tzinfo=timezone.utc)
+            Event.objects.create(
+                schedule=schedule, title=f"{group.name} lecture", starts_at=starts_at,
+                ends_at=starts_at + timedelta(hours=1), rrule="FREQ=WEEKLY;COUNT=4"
+            )
+
+    def statuses(self):
+        return dict(ReminderDigest.objects.filter(day=DAY).values_list("user__email", "status"))
+
+    def test_every_member_gets_one_digest_of_all_their_groups(self):
+        run = send_digests(DAY, chunk_size=2)
+
+        self.assertEqual((run.users, run.sent, run.failed, run.skipped), (5, 5, 0, 0))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), sorted(user.email for user in self.users))
+        both = next(message for message in mail.outbox if message.to == [self.users[0].email])
+        self.assertLess(both.body.index("Algebra lecture"), both.body.index("Botany lecture"))
+        self.assertEqual(set(self.statuses().values()), {"sent"})
+
+    def test_reruns_send_nothing_twice(self):
+        send_digests(DAY)
+        mail.outbox.clear()
+
+        run = send_digests(DAY)
+
+        self.assertEqual((run.users, run.sent), (0, 0))
+        self.assertEqual(mail.outbox, [])
+
+    def test_users_claimed_by_another_run_are_skipped(self):
+        ReminderDigest.objects.claim(DAY, {self.users[1].id: 1})
+
+        claimed = ReminderDigest.objects.claim(DAY, {user.id: 1 for user in self.users[:3]})
+
+        self.assertEqual(claimed, {self.users[0].id, self.users[2].id})
+
+    def test_failed_batches_are_only_resent_on_request(self):
+        connection = get_connection()
+        with mock.patch.object(connection, "send_messages", side_effect=ConnectionError("down")):
+            with self.assertRaises(DigestSendFailed) as failure:
+                send_digests(DAY, chunk_size=2, connection=connection)
+
+        # The run stops at the failed chunk, leaving the other users unclaimed
+        self.assertEqual((failure.exception.run.failed, failure.exception.run.sent), (2, 0))
+        self.assertEqual(list(self.statuses().values()), ["failed", "failed"])
+        failed = set(self.statuses())
+
+        run = send_digests(DAY)
+        self.assertEqual((run.users, run.sent), (3, 3))
+        self.assertTrue(failed.isdisjoint(message.to[0] for message in mail.outbox))
+
+        mail.outbox.clear()
+        run = send_digests(DAY, retry_failed=True)
+        self.assertEqual(run.sent, 2)
+        self.assertEqual({message.to[0] for message in mail.outbox}, failed)
+        self.assertEqual(set(self.statuses().values()), {"sent"})
+
+    def test_sent_and_sending_claims_are_not_taken_over_by_retries(self):
+        ReminderDigest.objects.claim(DAY, {self.users[0].id: 1})
+        ReminderDigest.objects.mark_sent(DAY, [self.users[0].id])
+        ReminderDigest.objects.claim(DAY, {self.users[1].id: 1})
+
+        claimed = ReminderDigest.objects.claim(DAY, {user.id: 1 for user in self.users[:2]}, retry_failed=True)
+
+        self.assertEqual(claimed, set())
@@ -0,0 +1,7 @@
+from django.contrib import admin
+from .models import Schedule, Event, EventOverride
+
+
+admin.site.register(Schedule)
+admin.site.register(Event)
+admin.site.register(EventOverride)
@@ -0,0 +1,123 @@
+from collections import namedtuple
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from cachetools import LRUCache
+from django.conf import settings
+from django.utils import timezone
+from .intervals import IntervalTree
+from .models import Event
+from .occurrences import aexpand_events, expand_event
+
+
+Clash = namedtuple("Clash", ["occurrence", "group_id", "other", "other_group_id"])
+
+
+def occurrence_key(occurrence):
+    return (occurrence.event_id, occurrence.original_start)
+
+
+class TimetableIndex:
+    """The occurrences of one group's timetable within a window, in an interval tree."""
+
+    def __init__(self, group_id):
+        self.group_id = group_id
+        self.version = None
+        self.window = None
+        self.tree = IntervalTree()
+        self.occurrences = {}
+
+    def update(self, occurrences, version, window):
+        """
+        Brings the index to `version` by diffing against the occurrences it holds:
+        only occurrences that appeared, disappeared or moved touch the tree.
+        """
+        current = {occurrence_key(occurrence): occurrence for occurrence in occurrences}
+        for key, occurrence in self.occurrences.items():
+            if current.get(key) != occurrence:
+                self.tree.remove(occurrence.starts_at, occurrence.ends_at, key)
+        for key, occurrence in current.items():
+            if self.occurrences.get(key) != occurrence:
+                self.tree.insert(occurrence.starts_at, occurrence.ends_at, key, occurrence)
+        self.occurrences = current
+        self.version = version
+        self.window = window
+
+    def overlapping(self, start, end):
+        return self.tree.overlapping(start, end)
+
+
+class ClashIndex:
+    """
+    Per-process store of timetable indexes, one per group, covering CLASH_HORIZON_DAYS
+    from the start of the current day. A user's merged timetable is the indexes of
+    their groups, so a change to one group's timetable (its `timetable_version`)
+    or a join only updates that group's index, never the others.
+    """
+
+    def __init__(self, maxsize=None):
+        self.indexes = LRUCache(maxsize=maxsize or settings.CLASH_INDEX_CACHE_SIZE)
+
+    def window(self):
+        start = datetime.combine(timezone.now().date(), time.min, tzinfo=dt_timezone.utc)
+        return start, start + timedelta(days=settings.CLASH_HORIZON_DAYS)
+
+    async def group_index(self, group_id, version):
+        window = self.window()
+        index = self.indexes.get(group_id)
+        if index is not None and index.version == version and index.window == window:
+            return index
+
+        start, end = window
+        # Unchanged events come from the occurrence cache, only edited ones are expanded again
+        occurrences = await aexpand_events(Event.objects.for_groups([group_id], start, end), start, end)
+        index = index or TimetableIndex(group_id)
+        index.update(occurrences, version, window)
+        self.indexes[group_id] = index
+        return index
+
+    async def indexes_for(self, groups):
+        """Indexes of the given (group_id, timetable_version) pairs."""
+        return [await self.group_index(group_id, version) for group_id, version in groups]
+
+    def _against(self, occurrences, group_id, indexes):
+        clashes = []
+        for occurrence in occurrences:
+            key = occurrence_key(occurrence)
+            for index in indexes:
+                for other in index.overlapping(occurrence.starts_at, occurrence.ends_at):
+                    if other.event_id != occurrence.event_id or occurrence_key(other) != key:
+                        clashes.append(Clash(occurrence, group_id, other, index.group_id))
+        return clashes
+
+    async def user_clashes(self, groups, start, end):
+        """
+        Clashes between the occurrences of the given groups overlapping [start, end),
+        each pair reported once.
+        """
+        indexes = await self.indexes_for(groups)
+        clashes = []
+        for position, index in enumerate(indexes):
+            occurrences = index.overlapping(start, end)
+            for clash in self._against(occurrences, index.group_id, indexes[position:]):
+                # Within one group each pair is met from both sides, keep the first
+                if clash.other_group_id != clash.group_id or (
+                    (clash.other.starts_at, occurrence_key(clash.other))
+                    > (clash.occurrence.starts_at, occurrence_key(clash.occurrence))
+                ):
+                    clashes.append(clash)
+        clashes.sort(key=lambda clash: (clash.occurrence.starts_at, clash.other.starts_at))
+        return clashes
+
+    async def group_clashes(self, group, groups):
+        """Clashes between the occurrences of `group` (group_id, version) and those of `groups`."""
+        index, *others = await self.indexes_for([group, *groups])
+        return self._against(list(index.tree), index.group_id, others)
+
+    async def event_clashes(self, event, groups):
+        """Clashes between the occurrences of `event` (with `schedule` loaded) and those of `groups`."""
+        start, end = self.window()
+        occurrences = expand_event(event, start, end, [override async for override in event.overrides.all()])
+        return self._against(occurrences, event.schedule.group_id, await self.indexes_for(groups))
+
+
+clash_index = ClashIndex()
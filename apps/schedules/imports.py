@@ -0,0 +1,173 @@
+"""
+Streaming import of events from CSV or JSON lines uploads.
+
+Uploads are stored on their job and imported by the sync worker, off the
+request. Rows are read and validated one at a time and inserted
+IMPORT_CHUNK_SIZE at a time, each chunk with one INSERT and one UPDATE of its
+job in a transaction of its own. Memory stays flat whatever the size of the
+file, and a rejected row is reported on the job without rolling back the rows
+around it. The UPDATE of every chunk is also the job's heartbeat: an import
+whose job has not moved for SYNC_JOB_LEASE is taken for dead.
+"""
+import csv
+import io
+import json
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+from apps.calendars.models import SyncJob
+from apps.groups.models import Group
+from .models import Event, EventImport
+from .serializers import CreateEventSerializer
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = set(CreateEventSerializer().fields)
+REQUIRED_COLUMNS = {name for name, field in CreateEventSerializer().fields.items() if field.required}
+
+
+class ImportFileError(Exception):
+    """The file cannot be read any further, as opposed to a single bad row."""
+
+
+class ImportInterrupted(Exception):
+    """The job stopped running under its worker, which was taken for dead."""
+
+
+def read_csv(stream):
+    """Yields (line, data, error) for every record of a CSV file with a header row."""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    missing = REQUIRED_COLUMNS - set(reader.fieldnames or ())
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(sorted(missing))}")
+    for row in reader:
+        # Empty cells are left out, so optional columns can be blank
+        data = {name: value for name, value in row.items() if name in COLUMNS and value not in (None, "")}
+        yield reader.line_num, data, None
+
+
+def read_jsonl(stream):
+    """Yields (line, data, error) for every non-empty line of a JSON lines file."""
+    for line, text in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), start=1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError as e:
+            yield line, None, {"non_field_errors": [f"Invalid JSON: {e}"]}
+            continue
+        if not isinstance(data, dict):
+            yield line, None, {"non_field_errors": ["Expected a JSON object."]}
+            continue
+        yield line, data, None
+
+
+READERS = {
+    "csv": read_csv,
+    "jsonl": read_jsonl,
+}
+
+
+def build_event(schedule, data):
+    """Validates one row like the event API does; returns (event, errors)."""
+    serializer = CreateEventSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+    event = Event(schedule=schedule, **serializer.validated_data)
+    # bulk_create skips Event.save, which sets it
+    event.recurrence_end = event.compute_recurrence_end(schedule.tzinfo)
+    return event, None
+
+
+def save_chunk(job, events, errors, size):
+    """Commits a chunk and beats the job's heartbeat, unless the job was failed as interrupted meanwhile."""
+    kept = job.errors + errors[:max(settings.IMPORT_MAX_ERRORS - len(job.errors), 0)]
+    with transaction.atomic():
+        # Locks the job first, so it cannot be failed between the check and the insert
+        updated = EventImport.objects.filter(pk=job.pk, status="running").update(
+            processed_rows=F("processed_rows") + size,
+            imported_rows=F("imported_rows") + len(events),
+            failed_rows=F("failed_rows") + len(errors),
+            errors=kept,
+            updated_at=timezone.now()
+        )
+        if not updated:
+            raise ImportInterrupted("The import was interrupted.")
+        Event.objects.bulk_create(events)
+    job.processed_rows += size
+    job.imported_rows += len(events)
+    job.failed_rows += len(errors)
+    job.errors = kept
+
+
+def import_events(job):
+    """
+    Imports the rows of the job's file into its schedule (loaded). Whatever
+    stops the file from being read to the end fails the job, keeping the
+    chunks already committed. The outcome is only written over a running job,
+    never over one failed as interrupted while this worker was still on it.
+    """
+    try:
+        with job.file.open("rb") as stream:
+            rows = READERS[job.format](stream)
+            while chunk := list(islice(rows, settings.IMPORT_CHUNK_SIZE)):
+                events, errors = [], []
+                for line, data, error in chunk:
+                    event = None
+                    if error is None:
+                        event, error = build_event(job.schedule, data)
+                    if event is not None:
+                        events.append(event)
+                    else:
+                        errors.append({"line": line, "errors": error})
+                save_chunk(job, events, errors, len(chunk))
+    except (ImportFileError, ImportInterrupted, UnicodeDecodeError, csv.Error, DatabaseError) as e:
+        job.status = "failed"
+        job.error = str(e)
+    except Exception:
+        logger.exception("Event import %s failed", job.pk)
+        job.status = "failed"
+        job.error = "The import failed unexpectedly."
+    else:
+        job.status = "completed"
+
+    job.finished_at = job.updated_at = timezone.now()
+    finished = EventImport.objects.filter(pk=job.pk, status="running").update(
+        status=job.status, error=job.error, finished_at=job.finished_at, updated_at=job.updated_at
+    )
+    if not finished:
+        job.refresh_from_db(fields=["status", "error", "finished_at", "updated_at"])
+    if job.imported_rows:
+        Group.objects.touch_timetable(pk=job.schedule.group_id)
+    return job
+
+
+def run_import(import_id):
+    """
+    Runs a pending import, for the sync worker, and deletes its file. An import
+    runs at most once: one found running is left to its worker while its
+    heartbeat is fresh (the worker's lease ran out, not the worker), and failed
+    once it is stale, since running it again would insert its committed chunks
+    twice.
+    """
+    now = timezone.now()
+    if not EventImport.objects.filter(pk=import_id, status="pending").update(status="running", updated_at=now):
+        EventImport.objects.filter(
+            pk=import_id, status="running", updated_at__lt=now - settings.SYNC_JOB_LEASE
+        ).update(status="failed", error="The import was interrupted.", finished_at=now, updated_at=now)
+        return None
+
+    job = EventImport.objects.select_related("schedule").get(pk=import_id)
+    try:
+        import_events(job)
+    finally:
+        job.file.delete(save=False)
+        EventImport.objects.filter(pk=job.pk).update(file="")
+    if job.imported_rows:
+        SyncJob.objects.enqueue("group", [job.schedule.group_id], delay=settings.SYNC_JOB_DEBOUNCE)
+    return job
@@ -0,0 +1,117 @@
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "value", "priority", "max_end", "left", "right")
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.priority = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+    @property
+    def order(self):
+        return (self.start, self.end, self.key)
+
+    def update(self):
+        max_end = self.end
+        if self.left is not None and self.left.max_end > max_end:
+            max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > max_end:
+            max_end = self.right.max_end
+        self.max_end = max_end
+
+
+def _split(node, order, inclusive=False):
+    """Splits a treap into the nodes ordered before `order` (or at it, if inclusive) and the rest."""
+    if node is None:
+        return None, None
+    if node.order < order or (inclusive and node.order == order):
+        node.right, right = _split(node.right, order, inclusive)
+        node.update()
+        return node, right
+    left, node.left = _split(node.left, order, inclusive)
+    node.update()
+    return left, node
+
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+
+class IntervalTree:
+    """
+    Half-open intervals [start, end) in a treap ordered by (start, end, key), where
+    every node also holds the latest end in its subtree. Inserts and removals take
+    O(log n) expected; listing the k intervals overlapping a range takes O(log n + k)
+    since subtrees that end before the range or start after it are never visited.
+    `key` tells apart intervals with the same bounds and must be comparable.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def insert(self, start, end, key, value):
+        node = _Node(start, end, key, value)
+        left, right = _split(self.root, node.order)
+        self.root = _merge(_merge(left, node), right)
+        self.size += 1
+
+    def remove(self, start, end, key):
+        """Removes the interval and returns whether it was there."""
+        order = (start, end, key)
+        left, rest = _split(self.root, order)
+        found, right = _split(rest, order, inclusive=True)
+        self.root = _merge(left, right)
+        if found is None:
+            return False
+        self.size -= 1
+        return True
+
+    def overlapping(self, start, end):
+        """Values of the intervals overlapping [start, end), in start order."""
+        values = []
+        stack, node = [], self.root
+        while stack or node is not None:
+            # In-order walk that skips subtrees ending at or before `start`
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                break
+            node = stack.pop()
+            if node.start >= end:
+                break
+            if node.end > start:
+                values.append(node.value)
+            node = node.right
+        return values
+
+    def __iter__(self):
+        stack, node = [], self.root
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.value
+            node = node.right
@@ -0,0 +1,45 @@
+from django.db.models import Case, F, Q, Value, When
+from apps.common.managers import GetOrNoneManager
+from apps.groups.models import Group
+
+
+class EventManager(GetOrNoneManager):
+
+    def in_window(self, start, end):
+        """Events with at least one occurrence that may overlap [start, end)."""
+        return (
+            self.filter(starts_at__lt=end)
+            .filter(Q(recurrence_end__isnull=True) | Q(recurrence_end__gte=start))
+            .select_related("schedule")
+        )
+
+    def for_groups(self, group_ids, start, end):
+        return self.in_window(start, end).filter(schedule__group_id__in=group_ids, schedule__is_active=True)
+
+    def touch(self, event_id, ends_at=None):
+        """
+        Bumps the event's revision, invalidating its cached occurrences, and
+        stretches its recurrence_end to cover an occurrence moved to `ends_at`.
+        The group's timetable is marked as changed too.
+        """
+        Group.objects.touch_timetable(schedules__events=event_id)
+        changes = {"revision": F("revision") + 1}
+        if ends_at is not None:
+            changes["recurrence_end"] = Case(
+                When(recurrence_end__lt=ends_at, then=Value(ends_at)),
+                default=F("recurrence_end")
+            )
+        return self.filter(pk=event_id).update(**changes)
+
+
+class EventOverrideManager(GetOrNoneManager):
+
+    def overlapping(self, event_ids, start, end, span):
+        """
+        Overrides of occurrences that originally started within `span` before the
+        window or inside it, plus those moved into the window from elsewhere.
+        """
+        return self.filter(event_id__in=event_ids).filter(
+            Q(original_start__gte=start - span, original_start__lt=end)
+            | Q(starts_at__lt=end, ends_at__gt=start)
+        )
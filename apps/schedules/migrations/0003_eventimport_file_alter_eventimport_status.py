@@ -0,0 +1,23 @@
+# Generated by Django 5.2.2 on 2026-10-18 11:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedules', '0002_eventimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventimport',
+            name='file',
+            field=models.FileField(blank=True, upload_to='imports/'),
+        ),
+        migrations.AlterField(
+            model_name='eventimport',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.groups.models import GroupMembership
+from .models import Schedule, Event, EventImport
+
+
+class ScheduleMixin:
+    async def get_schedule(self, group, schedule_id):
+        return await Schedule.objects.filter(group=group, pk=schedule_id).afirst()
+
+    async def get_event(self, group, event_id):
+        return await Event.objects.select_related("schedule").filter(schedule__group=group, pk=event_id).afirst()
+
+    async def get_import(self, group, import_id):
+        return await EventImport.objects.filter(schedule__group=group, pk=import_id).afirst()
+
+    def get_window(self, request):
+        """
+        Parses the `start` and `end` query parameters into aware datetimes.
+        Returns (start, end, error) where error is a message when they are invalid.
+        """
+        bounds = []
+        for name in ("start", "end"):
+            value = request.query_params.get(name)
+            try:
+                parsed = parse_datetime(value) if value else None
+            except ValueError:
+                parsed = None
+            if parsed is None:
+                return None, None, f"`{name}` must be an ISO 8601 datetime"
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            bounds.append(parsed)
+
+        start, end = bounds
+        if end <= start:
+            return None, None, "`end` must be after `start`"
+        if end - start > timedelta(days=settings.OCCURRENCE_MAX_WINDOW_DAYS):
+            return None, None, f"The window cannot exceed {settings.OCCURRENCE_MAX_WINDOW_DAYS} days"
+        return start, end, None
+
+
+class ClashMixin:
+    async def get_timetables(self, memberships):
+        """(group_id, timetable_version) of the active groups of the given memberships."""
+        rows = (
+            memberships.filter(active=True, group__is_active=True)
+            .values_list("group_id", "group__timetable_version").distinct()
+        )
+        return [row async for row in rows]
+
+    async def get_user_timetables(self, user, exclude=None):
+        memberships = GroupMembership.objects.filter(user=user)
+        if exclude is not None:
+            memberships = memberships.exclude(group_id=exclude)
+        return await self.get_timetables(memberships)
+
+    async def get_related_timetables(self, group):
+        """Timetables of every group sharing an active member with `group`, `group` included."""
+        members = GroupMembership.objects.filter(group=group, active=True).values("user_id")
+        return await self.get_timetables(GroupMembership.objects.filter(user_id__in=members))
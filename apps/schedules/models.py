@@ -0,0 +1,178 @@
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.db import models
+from apps.common.models import BaseModel
+from apps.accounts.models import User
+from apps.groups.models import Group
+from .managers import EventManager, EventOverrideManager
+from .recurrence import parse_rrule
+
+
+# How far ahead the end of an open-ended series is looked for when it has a COUNT
+RECURRENCE_HORIZON = timedelta(days=366 * 50)
+
+
+class Schedule(BaseModel):
+    group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name="schedules")
+    name = models.CharField(max_length=100)
+    description = models.TextField(null=True, blank=True)
+    timezone = models.CharField(max_length=64, default="UTC")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="created_schedules")
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.group.name} - {self.name}"
+
+    @property
+    def tzinfo(self):
+        return ZoneInfo(self.timezone)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Group.objects.touch_timetable(pk=self.group_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Group.objects.touch_timetable(pk=self.group_id)
+        return result
+
+
+class Event(BaseModel):
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name="events")
+    title = models.CharField(max_length=200)
+    description = models.TextField(null=True, blank=True)
+    location = models.CharField(max_length=200, null=True, blank=True)
+    # First occurrence of the series
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    rrule = models.CharField(max_length=255, blank=True, default="")
+    # End of the last occurrence, null for series without an end
+    recurrence_end = models.DateTimeField(null=True, blank=True)
+    # Bumped on every change to the event or its overrides, keys the occurrence cache
+    revision = models.PositiveIntegerField(default=1)
+    objects = EventManager()
+
+    class Meta:
+        indexes = [
+            # Events of a schedule overlapping a window
+            models.Index(fields=["schedule", "starts_at", "recurrence_end"], name="event_window_idx"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @property
+    def duration(self):
+        return self.ends_at - self.starts_at
+
+    @property
+    def rule(self):
+        return parse_rrule(self.rrule) if self.rrule else None
+
+    def compute_recurrence_end(self, tzinfo):
+        rule = self.rule
+        if rule is None:
+            return self.ends_at
+        if rule.until is not None:
+            return rule.until + self.duration
+        if rule.count is not None:
+            starts = rule.between(self.starts_at, tzinfo, self.starts_at, self.starts_at + RECURRENCE_HORIZON)
+            return (starts[-1] if starts else self.starts_at) + self.duration
+        return None
+
+    def save(self, *args, **kwargs):
+        bump = not self._state.adding
+        if bump:
+            # Bumped in the UPDATE, so concurrent edits never share a revision (and cached occurrences)
+            self.revision = models.F("revision") + 1
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "revision", "recurrence_end"}
+        self.recurrence_end = self.compute_recurrence_end(self.schedule.tzinfo)
+        if bump and self.recurrence_end is not None:
+            # Keeps the stretch EventManager.touch made for an occurrence moved past the rule's end
+            moved_end = self.overrides.filter(cancelled=False).aggregate(end=models.Max("ends_at"))["end"]
+            if moved_end is not None and moved_end > self.recurrence_end:
+                self.recurrence_end = moved_end
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=["revision"])
+        Group.objects.touch_timetable(pk=self.schedule.group_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Group.objects.touch_timetable(pk=self.schedule.group_id)
+        return result
+
+
+class EventOverride(BaseModel):
+    """
+    Changes a single occurrence of a recurring event, identified by the start the
+    rule gives it: either cancels it (an exception) or moves and/or renames it.
+    """
+
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="overrides")
+    original_start = models.DateTimeField()
+    cancelled = models.BooleanField(default=False)
+    starts_at = models.DateTimeField(null=True, blank=True)
+    ends_at = models.DateTimeField(null=True, blank=True)
+    title = models.CharField(max_length=200, null=True, blank=True)
+    location = models.CharField(max_length=200, null=True, blank=True)
+    objects = EventOverrideManager()
+
+    class Meta:
+        unique_together = ("event", "original_start")
+        indexes = [
+            # Overrides that moved an occurrence into a window
+            models.Index(fields=["event", "starts_at"], name="eventoverride_moved_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event.title} @ {self.original_start}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        Event.objects.touch(self.event_id, ends_at=None if self.cancelled else self.ends_at)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Event.objects.touch(self.event_id)
+        return result
+
+
+class EventImport(BaseModel):
+    """
+    A bulk upload of events into a schedule, processed by the sync worker. The
+    counters are updated in the transaction of every chunk, so they always
+    match what was inserted.
+    """
+
+    FORMAT_CHOICES = [
+        ("csv", "CSV"),
+        ("jsonl", "JSON lines"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name="imports")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="event_imports")
+    file_name = models.CharField(max_length=255, blank=True, default="")
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    # The uploaded file, until the worker has imported it
+    file = models.FileField(upload_to="imports/", blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default="pending")
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    failed_rows = models.PositiveIntegerField(default=0)
+    # The first IMPORT_MAX_ERRORS rejected rows, as {"line": ..., "errors": ...}
+    errors = models.JSONField(default=list, blank=True)
+    # Why the file could not be read to the end, when it failed
+    error = models.TextField(blank=True, default="")
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.schedule} - {self.file_name or self.format}"
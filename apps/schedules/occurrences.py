@@ -0,0 +1,119 @@
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from .models import EventOverride
+
+
+Occurrence = namedtuple(
+    "Occurrence",
+    ["event_id", "schedule_id", "title", "location", "starts_at", "ends_at", "original_start", "overridden"]
+)
+
+
+def cache_key(event, start, end):
+    # The revision moves on every edit of the event or its overrides, so stale windows are never read
+    return (
+        f"schedules:occurrences:{event.id}:{event.revision}:{event.schedule.timezone}"
+        f":{start.timestamp():.0f}:{end.timestamp():.0f}"
+    )
+
+
+def expand_event(event, start, end, overrides=()):
+    """Occurrences of one event overlapping [start, end), with its overrides applied."""
+    duration = event.duration
+    rule = event.rule
+    if rule is None:
+        # Half-open like the recurring case: an event ending at `start` is outside, a zero-length one at it inside
+        overlaps = event.starts_at < end and (event.ends_at > start or event.starts_at >= start)
+        starts = [event.starts_at] if overlaps else []
+    else:
+        starts = rule.between(event.starts_at, event.schedule.tzinfo, start, end, duration)
+
+    event_id, schedule_id, title, location = event.id, event.schedule_id, event.title, event.location
+    if not overrides:
+        return [
+            Occurrence(event_id, schedule_id, title, location, starts_at, starts_at + duration, starts_at, False)
+            for starts_at in starts
+        ]
+
+    overrides = {override.original_start: override for override in overrides}
+    occurrences = [
+        Occurrence(event_id, schedule_id, title, location, starts_at, starts_at + duration, starts_at, False)
+        for starts_at in starts if starts_at not in overrides
+    ]
+    # Overridden occurrences, including those moved into the window from outside of it
+    in_window = set(starts)
+    for original_start, override in overrides.items():
+        if override.cancelled or (override.starts_at is None and original_start not in in_window):
+            continue
+        starts_at = override.starts_at or original_start
+        ends_at = override.ends_at or starts_at + duration
+        if starts_at < end and (ends_at > start or starts_at >= start):
+            occurrences.append(Occurrence(
+                event_id, schedule_id, override.title or title, override.location or location,
+                starts_at, ends_at, original_start, True
+            ))
+
+    occurrences.sort(key=lambda occurrence: occurrence.starts_at)
+    return occurrences
+
+
+def _group_overrides(overrides):
+    grouped = {}
+    for override in overrides:
+        grouped.setdefault(override.event_id, []).append(override)
+    return grouped
+
+
+def _overrides_query(events, start, end):
+    span = max((event.duration for event in events), default=timedelta(0))
+    return EventOverride.objects.overlapping([event.id for event in events], start, end, span)
+
+
+def _merge(events, keys, cached, computed):
+    occurrences = []
+    for event in events:
+        key = keys[event.id]
+        occurrences.extend(computed[key] if key in computed else cached[key])
+    occurrences.sort(key=lambda occurrence: (occurrence.starts_at, occurrence.event_id))
+    return occurrences
+
+
+def expand_events(events, start, end):
+    """
+    Occurrences of many events overlapping [start, end), in start order.
+    Cached windows are fetched in one round trip and the overrides of all
+    uncached events in one query, so the cost does not grow with per-event I/O.
+    """
+    events = list(events)
+    keys = {event.id: cache_key(event, start, end) for event in events}
+    cached = cache.get_many(keys.values())
+    missing = [event for event in events if keys[event.id] not in cached]
+
+    computed = {}
+    if missing:
+        overrides = _group_overrides(_overrides_query(missing, start, end))
+        computed = {
+            keys[event.id]: expand_event(event, start, end, overrides.get(event.id, ())) for event in missing
+        }
+        cache.set_many(computed, timeout=settings.OCCURRENCE_CACHE_TIMEOUT)
+    return _merge(events, keys, cached, computed)
+
+
+async def aexpand_events(events, start, end):
+    """Async variant of `expand_events`."""
+    events = [event async for event in events] if hasattr(events, "__aiter__") else list(events)
+    keys = {event.id: cache_key(event, start, end) for event in events}
+    cached = await cache.aget_many(keys.values())
+    missing = [event for event in events if keys[event.id] not in cached]
+
+    computed = {}
+    if missing:
+        overrides = _group_overrides([override async for override in _overrides_query(missing, start, end)])
+        computed = {
+            keys[event.id]: expand_event(event, start, end, overrides.get(event.id, ())) for event in missing
+        }
+        await cache.aset_many(computed, timeout=settings.OCCURRENCE_CACHE_TIMEOUT)
+    return _merge(events, keys, cached, computed)
@@ -0,0 +1,178 @@
+import calendar
+from dataclasses import dataclass
+from functools import lru_cache
+from datetime import date, datetime, time, timedelta, timezone
+
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ["DAILY", "WEEKLY", "MONTHLY"]
+
+
+def _parse_until(value):
+    if len(value) == 8:
+        # A bare date includes the whole day
+        return datetime.combine(datetime.strptime(value, "%Y%m%d").date(), time.max, tzinfo=timezone.utc)
+    return datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """
+    The subset of RFC 5545 RRULEs timetables need: DAILY, WEEKLY (BYDAY) and
+    MONTHLY (BYMONTHDAY) with INTERVAL and either COUNT or UNTIL, weeks starting
+    on Monday. Occurrences keep the wall-clock time of the first one in the
+    schedule's timezone, so a 9am lecture stays at 9am across DST changes.
+    """
+
+    freq: str
+    interval: int = 1
+    count: int | None = None
+    until: datetime | None = None
+    by_day: tuple = ()
+    by_month_day: tuple = ()
+
+    @classmethod
+    def parse(cls, value):
+        """Parses an RRULE string, raising ValueError for anything unsupported."""
+        parts = {}
+        for part in value.strip().upper().removeprefix("RRULE:").split(";"):
+            if not part:
+                continue
+            name, _, part_value = part.partition("=")
+            if not part_value or name in parts:
+                raise ValueError(f"Malformed rule part '{part}'.")
+            parts[name] = part_value
+
+        unsupported = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "BYMONTHDAY", "WKST"}
+        if unsupported:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unsupported))}.")
+        if parts.get("FREQ") not in FREQUENCIES:
+            raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}.")
+        if parts.get("WKST", "MO") != "MO":
+            raise ValueError("Only WKST=MO is supported.")
+        if "COUNT" in parts and "UNTIL" in parts:
+            raise ValueError("COUNT and UNTIL cannot be combined.")
+
+        by_day = ()
+        if "BYDAY" in parts:
+            if parts["FREQ"] != "WEEKLY" or not set(parts["BYDAY"].split(",")) <= set(WEEKDAYS):
+                raise ValueError("BYDAY is only supported as plain weekdays of WEEKLY rules.")
+            by_day = tuple(sorted({WEEKDAYS.index(day) for day in parts["BYDAY"].split(",")}))
+
+        by_month_day = ()
+        if "BYMONTHDAY" in parts:
+            if parts["FREQ"] != "MONTHLY":
+                raise ValueError("BYMONTHDAY is only supported for MONTHLY rules.")
+            by_month_day = tuple(sorted({int(day) for day in parts["BYMONTHDAY"].split(",")}))
+            if not all(1 <= day <= 31 for day in by_month_day):
+                raise ValueError("BYMONTHDAY must be between 1 and 31.")
+
+        rule = cls(
+            freq=parts["FREQ"],
+            interval=int(parts.get("INTERVAL", 1)),
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=_parse_until(parts["UNTIL"]) if "UNTIL" in parts else None,
+            by_day=by_day,
+            by_month_day=by_month_day,
+        )
+        if rule.interval < 1 or (rule.count is not None and rule.count < 1):
+            raise ValueError("INTERVAL and COUNT must be positive.")
+        return rule
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.by_day:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.by_day))
+        if self.by_month_day:
+            parts.append("BYMONTHDAY=" + ",".join(map(str, self.by_month_day)))
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append("UNTIL=" + self.until.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ"))
+        return ";".join(parts)
+
+    def _daily(self, first, low, high):
+        step = self.interval
+        start = max(0, -(-(low - first).days // step))
+        stop = (high - first).days // step + 1
+        if self.count is not None:
+            stop = min(stop, self.count)
+        return [(index, first + timedelta(days=index * step)) for index in range(start, stop)]
+
+    def _weekly(self, first, low, high):
+        days = self.by_day or (first.weekday(),)
+        week = first - timedelta(days=first.weekday())
+        span = 7 * self.interval
+        # Occurrences in the (partial) first week; every later period has len(days)
+        head = [day for day in days if day >= first.weekday()]
+
+        start = max(0, (low - week).days // span)
+        stop = (high - week).days // span + 1
+        if self.count is not None:
+            stop = min(stop, (self.count - len(head)) // len(days) + 2)
+
+        dates = []
+        for period in range(start, stop):
+            period_start = week + timedelta(days=period * span)
+            if period == 0:
+                dates.extend((index, period_start + timedelta(days=day)) for index, day in enumerate(head))
+            else:
+                offset = len(head) + (period - 1) * len(days)
+                dates.extend((offset + index, period_start + timedelta(days=day)) for index, day in enumerate(days))
+        if self.count is not None:
+            dates = [(index, day) for index, day in dates if index < self.count]
+        return dates
+
+    def _monthly(self, first, low, high):
+        days = self.by_month_day or (first.day,)
+        months = (high.year - first.year) * 12 + high.month - first.month
+        # Days a month lacks are skipped and not counted, so COUNT needs the ordinals from the start
+        start = 0 if self.count is not None else max(0, ((low.year - first.year) * 12 + low.month - first.month) // self.interval)
+
+        dates, index = [], 0
+        for period in range(start, months // self.interval + 1):
+            year, month = divmod(first.year * 12 + first.month - 1 + period * self.interval, 12)
+            length = calendar.monthrange(year, month + 1)[1]
+            for day in days:
+                if day > length or (period == 0 and day < first.day):
+                    continue
+                if self.count is not None and index >= self.count:
+                    return dates
+                dates.append((index, date(year, month + 1, day)))
+                index += 1
+        return dates
+
+    def between(self, dtstart, tz, start, end, duration=timedelta(0)):
+        """
+        Returns the start (in UTC) of every occurrence overlapping [start, end).
+        Periods are computed arithmetically from the window, so the cost depends on
+        the occurrences in the window rather than on how long the series has run.
+        """
+        local_first = dtstart.astimezone(tz)
+        wall_time = local_first.time()
+        # A day of slack on each side absorbs UTC offsets; exact bounds are applied below
+        low = (start - duration).astimezone(tz).date() - timedelta(days=1)
+        high = end.astimezone(tz).date() + timedelta(days=1)
+        if self.until is not None:
+            high = min(high, self.until.astimezone(tz).date())
+
+        # Comparing datetimes that share a tzinfo skips the per-comparison offset lookups
+        utc = timezone.utc
+        dtstart, start, end = dtstart.astimezone(utc), start.astimezone(utc), end.astimezone(utc)
+        until = self.until.astimezone(utc) if self.until is not None else end
+        after = start - duration
+
+        expand = {"DAILY": self._daily, "WEEKLY": self._weekly, "MONTHLY": self._monthly}[self.freq]
+        candidates = (datetime.combine(day, wall_time, tzinfo=tz).astimezone(utc) for _, day in expand(local_first.date(), low, high))
+        return [
+            occurrence for occurrence in candidates
+            if dtstart <= occurrence < end and occurrence <= until and (occurrence > after or occurrence >= start)
+        ]
+
+
+@lru_cache(maxsize=4096)
+def parse_rrule(value):
+    """Cached RecurrenceRule.parse, rules are shared by many events and parsed on every expansion."""
+    return RecurrenceRule.parse(value)
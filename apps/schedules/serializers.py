@@ -0,0 +1,157 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from datetime import timedelta
+
+from adrf.serializers import Serializer as AsyncSerializer
+from django.conf import settings
+from rest_framework import serializers
+from .recurrence import RecurrenceRule
+
+
+class CreateScheduleSerializer(AsyncSerializer):
+    name = serializers.CharField(max_length=100)
+    description = serializers.CharField(required=False, allow_blank=True)
+    timezone = serializers.CharField(max_length=64, default="UTC")
+
+    def validate_timezone(self, value):
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise serializers.ValidationError("Unknown timezone.")
+        return value
+
+
+class ScheduleSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    name = serializers.CharField()
+    description = serializers.CharField()
+    timezone = serializers.CharField()
+    is_active = serializers.BooleanField()
+
+
+class CreateEventSerializer(AsyncSerializer):
+    title = serializers.CharField(max_length=200)
+    description = serializers.CharField(required=False, allow_blank=True)
+    location = serializers.CharField(max_length=200, required=False, allow_blank=True)
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+    rrule = serializers.CharField(max_length=255, required=False, allow_blank=True)
+
+    def validate_rrule(self, value):
+        if not value:
+            return ""
+        try:
+            return str(RecurrenceRule.parse(value))
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+
+    def validate(self, attrs):
+        starts_at = attrs.get("starts_at", getattr(self.instance, "starts_at", None))
+        ends_at = attrs.get("ends_at", getattr(self.instance, "ends_at", None))
+        if starts_at and ends_at and ends_at < starts_at:
+            raise serializers.ValidationError({"ends_at": "An event cannot end before it starts."})
+        return attrs
+
+    async def aupdate(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        await instance.asave(update_fields=[*validated_data, "updated_at"])
+        return instance
+
+
+class EventSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    schedule_id = serializers.UUIDField()
+    title = serializers.CharField()
+    description = serializers.CharField()
+    location = serializers.CharField()
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+    rrule = serializers.CharField()
+
+
+class EventOverrideSerializer(serializers.Serializer):
+    original_start = serializers.DateTimeField()
+    cancelled = serializers.BooleanField(default=False)
+    starts_at = serializers.DateTimeField(required=False)
+    ends_at = serializers.DateTimeField(required=False)
+    title = serializers.CharField(max_length=200, required=False)
+    location = serializers.CharField(max_length=200, required=False)
+
+    def validate(self, attrs):
+        event = self.context["event"]
+        original_start = attrs["original_start"]
+        rule = event.rule
+        if rule is None:
+            is_occurrence = original_start == event.starts_at
+        else:
+            window_end = original_start + timedelta(microseconds=1)
+            is_occurrence = original_start in rule.between(event.starts_at, event.schedule.tzinfo, original_start, window_end)
+        if not is_occurrence:
+            raise serializers.ValidationError({"original_start": "The event has no occurrence starting then."})
+
+        if not attrs["cancelled"] and not {"starts_at", "ends_at", "title", "location"} & set(attrs):
+            raise serializers.ValidationError("Cancel the occurrence or change at least one of its fields.")
+
+        # Moving an occurrence keeps its duration unless a new end is given
+        if "starts_at" in attrs and "ends_at" not in attrs:
+            attrs["ends_at"] = attrs["starts_at"] + event.duration
+        starts_at = attrs.get("starts_at", original_start)
+        if "ends_at" in attrs and attrs["ends_at"] < starts_at:
+            raise serializers.ValidationError({"ends_at": "An occurrence cannot end before it starts."})
+        if starts_at < event.starts_at:
+            raise serializers.ValidationError({"starts_at": "An occurrence cannot move before the first one of its event."})
+        return attrs
+
+
+class OccurrenceSerializer(serializers.Serializer):
+    event_id = serializers.UUIDField()
+    schedule_id = serializers.UUIDField()
+    title = serializers.CharField()
+    location = serializers.CharField()
+    starts_at = serializers.DateTimeField()
+    ends_at = serializers.DateTimeField()
+    original_start = serializers.DateTimeField()
+    overridden = serializers.BooleanField()
+
+
+class ClashSerializer(serializers.Serializer):
+    occurrence = OccurrenceSerializer()
+    group_id = serializers.UUIDField()
+    other = OccurrenceSerializer()
+    other_group_id = serializers.UUIDField()
+
+
+
+class CreateEventImportSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    format = serializers.ChoiceField(choices=["csv", "jsonl"], required=False)
+
+    def validate_file(self, value):
+        if value.size > settings.IMPORT_MAX_FILE_SIZE:
+            raise serializers.ValidationError(f"The file cannot exceed {settings.IMPORT_MAX_FILE_SIZE} bytes.")
+        return value
+
+    def validate(self, attrs):
+        # Without an explicit format, the file extension decides
+        if "format" not in attrs:
+            extension = attrs["file"].name.rpartition(".")[2].lower()
+            formats = {"csv": "csv", "jsonl": "jsonl", "ndjson": "jsonl"}
+            if extension not in formats:
+                raise serializers.ValidationError({"format": "Give the format of a file without a .csv or .jsonl extension."})
+            attrs["format"] = formats[extension]
+        return attrs
+
+
+class EventImportSerializer(serializers.Serializer):
+    id = serializers.UUIDField()
+    schedule_id = serializers.UUIDField()
+    file_name = serializers.CharField()
+    format = serializers.CharField()
+    status = serializers.CharField()
+    processed_rows = serializers.IntegerField()
+    imported_rows = serializers.IntegerField()
+    failed_rows = serializers.IntegerField()
+    errors = serializers.JSONField()
+    error = serializers.CharField()
+    created_at = serializers.DateTimeField()
+    finished_at = serializers.DateTimeField()
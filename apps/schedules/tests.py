@@ -0,0 +1,372 @@
+import random
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone as django_timezone
+from rest_framework_simplejwt.tokens import AccessToken
+from apps.accounts.models import User
+from apps.calendars.models import SyncJob
+from apps.groups.models import Group, GroupMembership
+from .clashes import ClashIndex
+from .imports import run_import, save_chunk
+from .intervals import IntervalTree
+from .models import Event, EventImport, EventOverride, Schedule
+from .occurrences import expand_event, expand_events
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class ScheduleTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(email="ada@example.com", first_name="Ada", last_name="Lovelace")
+        self.group = Group.objects.create(name="Algebra", created_by=self.user)
+        GroupMembership.objects.create(user=self.user, group=self.group, role="admin")
+        self.schedule = Schedule.objects.create(group=self.group, name="Term", timezone="Europe/London", created_by=self.user)
+
+    def add_event(self, starts_at, duration=timedelta(hours=1), title="Lecture", **fields):
+        return Event.objects.create(
+            schedule=self.schedule, title=title, starts_at=starts_at, ends_at=starts_at + duration, **fields
+        )
+
+
+class ExpandEventTests(ScheduleTestCase):
+
+    def test_weekly_occurrences_keep_their_wall_clock_time_across_dst(self):
+        # 9am in London, BST until the 25th of October, GMT after it
+        event = self.add_event(utc(2026, 10, 12, 8), rrule="FREQ=WEEKLY;COUNT=4")
+
+        occurrences = expand_event(event, utc(2026, 10, 1), utc(2026, 12, 1))
+
+        self.assertEqual(
+            [occurrence.starts_at for occurrence in occurrences],
+            [utc(2026, 10, 12, 8), utc(2026, 10, 19, 8), utc(2026, 10, 26, 9), utc(2026, 11, 2, 9)]
+        )
+        self.assertTrue(all(occurrence.ends_at - occurrence.starts_at == timedelta(hours=1) for occurrence in occurrences))
+
+    def test_window_is_half_open_for_one_off_events(self):
+        event = self.add_event(utc(2026, 10, 12, 8))
+
+        self.assertEqual(expand_event(event, utc(2026, 10, 12, 9), utc(2026, 10, 13)), [])
+        self.assertEqual(expand_event(event, utc(2026, 10, 12), utc(2026, 10, 12, 8)), [])
+        self.assertEqual(len(expand_event(event, utc(2026, 10, 12, 8, 59), utc(2026, 10, 13))), 1)
+
+    def test_zero_length_events_at_the_window_start_are_included(self):
+        one_off = self.add_event(utc(2026, 10, 12, 8), duration=timedelta(0))
+        recurring = self.add_event(utc(2026, 10, 12, 8), duration=timedelta(0), rrule="FREQ=DAILY;COUNT=3")
+
+        self.assertEqual(len(expand_event(one_off, utc(2026, 10, 12, 8), utc(2026, 10, 13))), 1)
+        self.assertEqual(len(expand_event(recurring, utc(2026, 10, 12, 8), utc(2026, 10, 13))), 1)
+
+    def test_overrides_cancel_move_and_rename_occurrences(self):
+        event = self.add_event(utc(2026, 10, 12, 8), rrule="FREQ=WEEKLY;COUNT=4")
+        overrides = [
+            EventOverride(event=event, original_start=utc(2026, 10, 19, 8), cancelled=True),
+            EventOverride(event=event, original_start=utc(2026, 10, 26, 9), title="Revision class"),
+            # Moved into the window from the week after it
+            EventOverride(
+                event=event, original_start=utc(2026, 11, 2, 9),
+                starts_at=utc(2026, 10, 30, 14), ends_at=utc(2026, 10, 30, 16)
+            ),
+        ]
+
+        occurrences = expand_event(event, utc(2026, 10, 1), utc(2026, 11, 1), overrides)
+
+        self.assertEqual(
+            [(occurrence.starts_at, occurrence.title, occurrence.overridden) for occurrence in occurrences],
+            [
+                (utc(2026, 10, 12, 8), "Lecture", False),
+                (utc(2026, 10, 26, 9), "Revision class", True),
+                (utc(2026, 10, 30, 14), "Lecture", True),
+            ]
+        )
+        self.assertEqual(occurrences[-1].original_start, utc(2026, 11, 2, 9))
+        self.assertEqual(occurrences[-1].ends_at, utc(2026, 10, 30, 16))
+
+
+class IntervalTreeTests(SimpleTestCase):
+
+    def test_overlapping_matches_a_brute_force_scan(self):
+        rng = random.Random(7)
+        tree, intervals = IntervalTree(), {}
+        for key in range(300):
+            start = rng.randrange(1000)
+            intervals[key] = (start, start + rng.randrange(50))
+            tree.insert(*intervals[key], key, key)
+        for key in rng.sample(range(300), 100):
+            self.assertTrue(tree.remove(*intervals.pop(key), key))
+        self.assertFalse(tree.remove(0, 0, -1))
+        self.assertEqual(len(tree), 200)
+
+        for _ in range(200):
+            start = rng.randrange(1000)
+            end = start + rng.randrange(1, 80)
+            expected = sorted((s, e, key) for key, (s, e) in intervals.items() if s < end and e > start)
+            self.assertEqual(tree.overlapping(start, end), [key for _, _, key in expected])
+
+
+class ClashTests(ScheduleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_group = Group.objects.create(name="Botany", created_by=self.user)
+        GroupMembership.objects.create(user=self.user, group=self.other_group, role="admin")
+        self.other_schedule = Schedule.objects.create(group=self.other_group, name="Term", created_by=self.user)
+        self.tomorrow = datetime.combine(
+            django_timezone.now().date() + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc
+        )
+        # Weekly at 10, twice; another lecture of the same group at 10:45 and one of the other group at 10:30
+        self.lecture = self.add_event(self.tomorrow + timedelta(hours=10), rrule="FREQ=WEEKLY;COUNT=2")
+        self.seminar = self.add_event(
+            self.tomorrow + timedelta(hours=10, minutes=45), duration=timedelta(minutes=30), title="Seminar"
+        )
+        self.lab = Event.objects.create(
+            schedule=self.other_schedule, title="Lab", starts_at=self.tomorrow + timedelta(hours=10, minutes=30),
+            ends_at=self.tomorrow + timedelta(hours=11, minutes=30)
+        )
+
+    def timetables(self):
+        return [(group.id, group.timetable_version) for group in Group.objects.filter(created_by=self.user).order_by("name")]
+
+    def pairs(self, clashes):
+        return sorted((clash.occurrence.event_id, clash.other.event_id) for clash in clashes)
+
+    def test_user_clashes_are_reported_once_per_pair(self):
+        index = ClashIndex()
+        start, end = index.window()
+
+        clashes = async_to_sync(index.user_clashes)(self.timetables(), start, end)
+
+        self.assertEqual(
+            self.pairs(clashes),
+            sorted([(self.lecture.id, self.seminar.id), (self.lecture.id, self.lab.id), (self.seminar.id, self.lab.id)])
+        )
+
+    def test_edits_update_the_group_index_in_place(self):
+        index = ClashIndex()
+        start, end = index.window()
+        async_to_sync(index.user_clashes)(self.timetables(), start, end)
+        lab_index = index.indexes[self.other_group.id]
+
+        self.lab.starts_at += timedelta(hours=3)
+        self.lab.ends_at += timedelta(hours=3)
+        self.lab.save()
+        clashes = async_to_sync(index.user_clashes)(self.timetables(), start, end)
+
+        self.assertEqual(self.pairs(clashes), [(self.lecture.id, self.seminar.id)])
+        self.assertIs(index.indexes[self.other_group.id], lab_index)
+        self.assertEqual(len(lab_index.tree), 1)
+
+    def test_clashes_endpoint(self):
+        response = self.client.get(
+            reverse("user-clashes"), headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 3)
+
+    def test_joining_a_group_returns_its_clashes_with_the_user_s_groups(self):
+        student = User.objects.create(email="grace@example.com", first_name="Grace", last_name="Hopper")
+        GroupMembership.objects.create(user=student, group=self.other_group)
+
+        response = self.client.post(
+            reverse("join-group", kwargs={"group_slug": self.group.slug}),
+            headers={"Authorization": f"Bearer {AccessToken.for_user(student)}"}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        clashes = response.json()["data"]
+        self.assertEqual(
+            sorted((clash["occurrence"]["title"], clash["other"]["title"]) for clash in clashes),
+            [("Lecture", "Lab"), ("Seminar", "Lab")]
+        )
+
+
+class EventRevisionTests(ScheduleTestCase):
+
+    def test_saves_bump_the_revision_in_the_database(self):
+        event = self.add_event(utc(2026, 10, 12, 8))
+        stale = Event.objects.get(pk=event.pk)
+
+        event.title = "Seminar"
+        event.save()
+        stale.location = "Room 1"
+        stale.save(update_fields=["location"])
+
+        self.assertEqual((event.revision, stale.revision), (2, 3))
+        self.assertEqual(Event.objects.get(pk=event.pk).revision, 3)
+
+    def test_overrides_bump_the_revision(self):
+        event = self.add_event(utc(2026, 10, 12, 8), rrule="FREQ=WEEKLY;COUNT=4")
+
+        EventOverride.objects.create(event=event, original_start=utc(2026, 10, 19, 8), cancelled=True)
+
+        event.refresh_from_db()
+        self.assertEqual(event.revision, 2)
+
+    def test_edits_keep_an_occurrence_moved_past_the_series_end(self):
+        event = self.add_event(utc(2026, 10, 12, 8), rrule="FREQ=WEEKLY;COUNT=2")
+        EventOverride.objects.create(
+            event=event, original_start=utc(2026, 10, 19, 8), starts_at=utc(2026, 11, 9, 8), ends_at=utc(2026, 11, 9, 9)
+        )
+        event.refresh_from_db()
+
+        event.title = "Seminar"
+        event.save()
+
+        start, end = utc(2026, 11, 1), utc(2026, 11, 15)
+        self.assertEqual(event.recurrence_end, utc(2026, 11, 9, 9))
+        occurrences = expand_events(Event.objects.in_window(start, end), start, end)
+        self.assertEqual([occurrence.starts_at for occurrence in occurrences], [utc(2026, 11, 9, 8)])
+
+
+class OccurrenceCacheTests(ScheduleTestCase):
+    start, end = utc(2026, 10, 1), utc(2026, 11, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.event = self.add_event(utc(2026, 10, 12, 8), rrule="FREQ=WEEKLY;COUNT=4")
+
+    def expand(self):
+        return expand_events(Event.objects.for_groups([self.group.id], self.start, self.end), self.start, self.end)
+
+    def test_cached_windows_are_read_without_queries(self):
+        first = self.expand()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.expand(), first)
+
+    def test_event_edits_invalidate_cached_occurrences(self):
+        self.expand()
+
+        self.event.title = "Seminar"
+        self.event.save()
+
+        self.assertEqual({occurrence.title for occurrence in self.expand()}, {"Seminar"})
+
+    def test_override_changes_invalidate_cached_occurrences(self):
+        self.assertEqual(len(self.expand()), 3)
+
+        override = EventOverride.objects.create(event=self.event, original_start=utc(2026, 10, 19, 8), cancelled=True)
+        self.assertEqual(len(self.expand()), 2)
+
+        override.delete()
+        self.assertEqual(len(self.expand()), 3)
+
+    def test_group_occurrences_endpoint_sees_overrides(self):
+        url = reverse("group-occurrences", kwargs={"group_slug": self.group.slug})
+        query = {"start": self.start.isoformat(), "end": self.end.isoformat()}
+        self.client.get(url, query)
+
+        EventOverride.objects.create(event=self.event, original_start=utc(2026, 10, 26, 9), title="Revision class")
+        response = self.client.get(url, query)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([occurrence["title"] for occurrence in response.json()["data"]], ["Lecture", "Lecture", "Revision class"])
+
+
+CSV = b"""title,starts_at,ends_at
+Lecture,2026-10-12T08:00:00Z,2026-10-12T09:00:00Z
+Broken,not a date,2026-10-12T09:00:00Z
+Lab,2026-10-13T08:00:00Z,2026-10-13T10:00:00Z
+"""
+
+
+class EventImportTests(ScheduleTestCase):
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_import(self, content=CSV, **fields):
+        return EventImport.objects.create(
+            schedule=self.schedule, created_by=self.user, format="csv",
+            file=ContentFile(content, name="events.csv"), **fields
+        )
+
+    def test_upload_is_queued_for_the_worker(self):
+        url = reverse("event-import-list-create", kwargs={"group_slug": self.group.slug, "schedule_id": self.schedule.id})
+        response = self.client.post(
+            url, {"file": SimpleUploadedFile("events.csv", CSV)},
+            headers={"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+        )
+
+        self.assertEqual(response.status_code, 202)
+        job = EventImport.objects.get(pk=response.json()["data"]["id"])
+        self.assertEqual(job.status, "pending")
+        self.assertFalse(Event.objects.exists())
+        self.assertTrue(SyncJob.objects.filter(kind="import", target_id=job.id, status="pending").exists())
+
+    def test_worker_imports_valid_rows_and_reports_the_others(self):
+        job = self.make_import()
+
+        run_import(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.processed_rows, job.imported_rows, job.failed_rows), ("completed", 3, 2, 1))
+        self.assertEqual(job.errors[0]["line"], 3)
+        self.assertEqual(set(Event.objects.values_list("title", flat=True)), {"Lecture", "Lab"})
+        self.assertFalse(job.file)
+        self.assertTrue(SyncJob.objects.filter(kind="group", target_id=self.group.id).exists())
+
+    def test_unexpected_errors_fail_the_import(self):
+        job = self.make_import()
+
+        with mock.patch("apps.schedules.imports.build_event", side_effect=RuntimeError("boom")), \
+                self.assertLogs("apps.schedules.imports", "ERROR"):
+            run_import(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error, "The import failed unexpectedly.")
+        self.assertIsNotNone(job.finished_at)
+
+    def test_interrupted_imports_are_not_run_again(self):
+        job = self.make_import(status="running")
+        EventImport.objects.filter(pk=job.pk).update(updated_at=django_timezone.now() - timedelta(hours=1))
+
+        self.assertIsNone(run_import(job.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+        self.assertFalse(Event.objects.exists())
+
+    @override_settings(IMPORT_CHUNK_SIZE=1)
+    def test_imports_reclaimed_while_running(self):
+        job = self.make_import()
+        statuses = []
+        original = save_chunk
+
+        def reclaiming_save_chunk(*args):
+            original(*args)
+            if not statuses:
+                # The job's lease ran out: reclaimed with a fresh heartbeat, then with a stale one
+                run_import(job.id)
+                statuses.append(EventImport.objects.get(pk=job.pk).status)
+                EventImport.objects.filter(pk=job.pk).update(updated_at=django_timezone.now() - timedelta(hours=1))
+                run_import(job.id)
+
+        with mock.patch("apps.schedules.imports.save_chunk", reclaiming_save_chunk):
+            finished = run_import(job.id)
+
+        self.assertEqual(statuses, ["running"])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("failed", "The import was interrupted."))
+        self.assertEqual(finished.status, "failed")
+        # Nothing was inserted after the job was failed
+        self.assertEqual((job.processed_rows, Event.objects.count()), (1, 1))
@@ -0,0 +1,24 @@
+from django.urls import path
+from .views import (
+    ScheduleListCreateAPIView,
+    EventListCreateAPIView,
+    EventDetailAPIView,
+    EventOverrideAPIView,
+    GroupOccurrencesAPIView,
+    UserClashesAPIView,
+    EventClashesAPIView,
+    EventImportListCreateAPIView,
+    EventImportDetailAPIView
+)
+
+urlpatterns = [
+    path("groups/<str:group_slug>/schedules/", ScheduleListCreateAPIView.as_view(), name="schedule-list-create"),
+    path("groups/<str:group_slug>/schedules/<uuid:schedule_id>/events/", EventListCreateAPIView.as_view(), name="event-list-create"),
+    path("groups/<str:group_slug>/schedules/<uuid:schedule_id>/imports/", EventImportListCreateAPIView.as_view(), name="event-import-list-create"),
+    path("groups/<str:group_slug>/imports/<uuid:import_id>/", EventImportDetailAPIView.as_view(), name="event-import-detail"),
+    path("groups/<str:group_slug>/events/<uuid:event_id>/", EventDetailAPIView.as_view(), name="event-detail"),
+    path("groups/<str:group_slug>/events/<uuid:event_id>/overrides/", EventOverrideAPIView.as_view(), name="event-overrides"),
+    path("groups/<str:group_slug>/events/<uuid:event_id>/clashes/", EventClashesAPIView.as_view(), name="event-clashes"),
+    path("groups/<str:group_slug>/occurrences/", GroupOccurrencesAPIView.as_view(), name="group-occurrences"),
+    path("clashes/", UserClashesAPIView.as_view(), name="user-clashes"),
+]
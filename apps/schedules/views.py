@@ -0,0 +1,375 @@
+from adrf.views import APIView
+from apps.common.response import CustomResponse
+from apps.common.serializers import ProjectionSerializer
+from apps.groups.mixins import GroupMixin
+from apps.groups.permissions import IsGroupAdmin
+from apps.calendars.models import SyncJob
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated, AllowAny
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from .serializers import (
+    CreateScheduleSerializer,
+    ScheduleSerializer,
+    CreateEventSerializer,
+    EventSerializer,
+    EventOverrideSerializer,
+    OccurrenceSerializer,
+    ClashSerializer,
+    CreateEventImportSerializer,
+    EventImportSerializer
+)
+from .models import Schedule, Event, EventOverride, EventImport
+from .mixins import ScheduleMixin, ClashMixin
+from .occurrences import aexpand_events
+from .clashes import clash_index
+
+tags = ["Schedule"]
+
+EVENTS_PAGE_SIZE = 50
+
+
+class AdminWriteMixin:
+    """Anyone can read, only group admins can write."""
+
+    def get_permissions(self):
+        if self.request.method == "GET":
+            return [AllowAny()]
+        return [IsAuthenticated(), IsGroupAdmin()]
+
+
+class ScheduleListCreateAPIView(AdminWriteMixin, APIView, GroupMixin):
+    serializer_class = ScheduleSerializer
+    post_serializer = CreateScheduleSerializer
+
+    @extend_schema(
+        tags=tags,
+        summary="List group schedules",
+        description="This endpoint lists the schedules of a group",
+        responses=ScheduleSerializer(many=True)
+    )
+    async def get(self, request, group_slug):
+        group = await self.get_group(group_slug)
+        if not group:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        schedules = [schedule async for schedule in Schedule.objects.filter(group=group).order_by("created_at", "id")]
+        serializer = self.serializer_class(schedules, many=True)
+        return CustomResponse.success(message="Schedules retreived successfully", data=serializer.data)
+
+    @extend_schema(
+        tags=tags,
+        summary="Create a schedule",
+        description="This endpoint allows a group admin to create a schedule",
+        request=CreateScheduleSerializer,
+        responses=ScheduleSerializer
+    )
+    async def post(self, request, group_slug):
+        serializer = self.post_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        group = await self.get_group(group_slug)
+        if not group:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        schedule = await Schedule.objects.acreate(group=group, created_by=request.user, **serializer.validated_data)
+        serializer = self.serializer_class(schedule)
+        return CustomResponse.success(message="Schedule created successfully", data=serializer.data, status_code=201)
+
+
+class EventListCreateAPIView(AdminWriteMixin, APIView, GroupMixin, ScheduleMixin):
+    serializer_class = EventSerializer
+    post_serializer = CreateEventSerializer
+
+    @extend_schema(
+        tags=tags,
+        summary="List schedule events",
+        description="This endpoint pages through the events of a schedule in start order",
+        parameters=[
+            OpenApiParameter(
+                name="cursor",
+                description="The `next` cursor returned by the previous page",
+                type=str,
+                required=False
+            )
+        ]
+    )
+    async def get(self, request, group_slug, schedule_id):
+        group = await self.get_group(group_slug)
+        schedule = group and await self.get_schedule(group, schedule_id)
+        if not schedule:
+            return CustomResponse.error(message="Schedule not found", status_code=404)
+
+        return await CustomResponse.asuccess(
+            message="Events retreived successfully",
+            data=Event.objects.filter(schedule=schedule).order_by("starts_at", "id"),
+            paginate="cursor",
+            request=request,
+            view=self,
+            page_size=EVENTS_PAGE_SIZE,
+            serializer_class=self.serializer_class
+        )
+
+    @extend_schema(
+        tags=tags,
+        summary="Create an event",
+        description="""
+        This endpoint allows a group admin to add a one-off or recurring event to a schedule.
+        Recurrence is given as an RRULE, e.g. `FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20261218T000000Z`.
+        """,
+        request=CreateEventSerializer,
+        responses=EventSerializer
+    )
+    async def post(self, request, group_slug, schedule_id):
+        serializer = self.post_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        group = await self.get_group(group_slug)
+        schedule = group and await self.get_schedule(group, schedule_id)
+        if not schedule:
+            return CustomResponse.error(message="Schedule not found", status_code=404)
+
+        event = await Event.objects.acreate(schedule=schedule, **serializer.validated_data)
+        await SyncJob.objects.aenqueue_group(group.id)
+        serializer = self.serializer_class(event)
+        return CustomResponse.success(message="Event created successfully", data=serializer.data, status_code=201)
+
+
+class EventDetailAPIView(AdminWriteMixin, APIView, GroupMixin, ScheduleMixin):
+    serializer_class = EventSerializer
+    patch_serializer = CreateEventSerializer
+
+    @extend_schema(tags=tags, summary="Get an event", responses=EventSerializer)
+    async def get(self, request, group_slug, event_id):
+        group = await self.get_group(group_slug)
+        event = group and await self.get_event(group, event_id)
+        if not event:
+            return CustomResponse.error(message="Event not found", status_code=404)
+
+        serializer = self.serializer_class(event)
+        return CustomResponse.success(message="Event retreived successfully", data=serializer.data)
+
+    @extend_schema(
+        tags=tags,
+        summary="Update an event",
+        description="This endpoint allows a group admin to update an event, its cached occurrences are invalidated",
+        request=CreateEventSerializer,
+        responses=EventSerializer
+    )
+    async def patch(self, request, group_slug, event_id):
+        group = await self.get_group(group_slug)
+        event = group and await self.get_event(group, event_id)
+        if not event:
+            return CustomResponse.error(message="Event not found", status_code=404)
+
+        serializer = self.patch_serializer(event, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        await serializer.asave()
+        await SyncJob.objects.aenqueue_group(group.id)
+
+        serializer = self.serializer_class(event)
+        return CustomResponse.success(message="Event updated successfully", data=serializer.data)
+
+    @extend_schema(tags=tags, summary="Delete an event")
+    async def delete(self, request, group_slug, event_id):
+        group = await self.get_group(group_slug)
+        event = group and await self.get_event(group, event_id)
+        if not event:
+            return CustomResponse.error(message="Event not found", status_code=404)
+
+        await event.adelete()
+        await SyncJob.objects.aenqueue_group(group.id)
+        return CustomResponse.success(message="Event deleted successfully")
+
+
+class EventOverrideAPIView(APIView, GroupMixin, ScheduleMixin):
+    serializer_class = EventOverrideSerializer
+    permission_classes = [IsAuthenticated, IsGroupAdmin]
+
+    @extend_schema(
+        tags=tags,
+        summary="Change one occurrence",
+        description="""
+        This endpoint allows a group admin to cancel, move or rename a single occurrence of an event,
+        identified by the start its recurrence rule gives it. Posting again for the same occurrence replaces the change.
+        """,
+        request=EventOverrideSerializer,
+        responses=EventOverrideSerializer
+    )
+    async def post(self, request, group_slug, event_id):
+        group = await self.get_group(group_slug)
+        event = group and await self.get_event(group, event_id)
+        if not event:
+            return CustomResponse.error(message="Event not found", status_code=404)
+
+        serializer = self.serializer_class(data=request.data, context={"event": event})
+        serializer.is_valid(raise_exception=True)
+
+        data = dict(serializer.validated_data)
+        original_start = data.pop("original_start")
+        defaults = {field: data.get(field) for field in ("cancelled", "starts_at", "ends_at", "title", "location")}
+        await EventOverride.objects.aupdate_or_create(event=event, original_start=original_start, defaults=defaults)
+        await SyncJob.objects.aenqueue_group(group.id)
+
+        return CustomResponse.success(message="Occurrence updated successfully", data=serializer.data)
+
+
+class GroupOccurrencesAPIView(APIView, GroupMixin, ScheduleMixin):
+    projection = ProjectionSerializer(OccurrenceSerializer)
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        tags=tags,
+        summary="List group occurrences",
+        description="""
+        This endpoint expands the recurring and one-off events of all the group's active schedules
+        into the occurrences overlapping [start, end), in start order
+        """,
+        parameters=[
+            OpenApiParameter(name="start", description="Window start, ISO 8601", type=str, required=True),
+            OpenApiParameter(name="end", description="Window end, ISO 8601", type=str, required=True),
+        ],
+        responses=OccurrenceSerializer(many=True)
+    )
+    async def get(self, request, group_slug):
+        group = await self.get_group(group_slug)
+        if not group:
+            return CustomResponse.error(message="Group not found", status_code=404)
+
+        start, end, error = self.get_window(request)
+        if error:
+            return CustomResponse.error(message=error)
+
+        occurrences = await aexpand_events(Event.objects.for_groups([group.id], start, end), start, end)
+        data = self.projection.encode(occurrence._asdict() for occurrence in occurrences)
+        return CustomResponse.success(message="Occurrences retreived successfully", data=data)
+
+
+class UserClashesAPIView(APIView, ScheduleMixin, ClashMixin):
+    serializer_class = ClashSerializer
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=tags,
+        summary="List my timetable clashes",
+        description="""
+        This endpoint lists the overlapping occurrences across all the groups the user is an active member of,
+        each pair once, in start order. The window defaults to, and is limited to, the clash horizon
+        starting today (UTC)
+        """,
+        parameters=[
+            OpenApiParameter(name="start", description="Window start, ISO 8601", type=str),
+            OpenApiParameter(name="end", description="Window end, ISO 8601", type=str),
+        ],
+        responses=ClashSerializer(many=True)
+    )
+    async def get(self, request):
+        start, end = clash_index.window()
+        if "start" in request.query_params or "end" in request.query_params:
+            window_start, window_end, error = self.get_window(request)
+            if error:
+                return CustomResponse.error(message=error)
+            start, end = max(start, window_start), min(end, window_end)
+
+        timetables = await self.get_user_timetables(request.user)
+        clashes = await clash_index.user_clashes(timetables, start, end) if start < end else []
+        serializer = self.serializer_class(clashes, many=True)
+        return CustomResponse.success(message="Clashes retreived successfully", data=serializer.data)
+
+
+class EventClashesAPIView(APIView, GroupMixin, ScheduleMixin, ClashMixin):
+    serializer_class = ClashSerializer
+    permission_classes = [IsAuthenticated, IsGroupAdmin]
+
+    @extend_schema(
+        tags=tags,
+        summary="List the clashes of an event",
+        description="""
+        This endpoint allows a group admin to see which occurrences, of this group or of any other group
+        one of its members belongs to, overlap the occurrences of an event within the clash horizon
+        """,
+        responses=ClashSerializer(many=True)
+    )
+    async def get(self, request, group_slug, event_id):
+        group = await self.get_group(group_slug)
+        event = group and await self.get_event(group, event_id)
+        if not event:
+            return CustomResponse.error(message="Event not found", status_code=404)
+
+        timetables = await self.get_related_timetables(group)
+        clashes = await clash_index.event_clashes(event, timetables)
+        serializer = self.serializer_class(clashes, many=True)
+        return CustomResponse.success(message="Clashes retreived successfully", data=serializer.data)
+
+
+class EventImportListCreateAPIView(APIView, GroupMixin, ScheduleMixin):
+    serializer_class = EventImportSerializer
+    post_serializer = CreateEventImportSerializer
+    permission_classes = [IsAuthenticated, IsGroupAdmin]
+    parser_classes = [MultiPartParser]
+
+    @extend_schema(tags=tags, summary="List schedule imports", responses=EventImportSerializer(many=True))
+    async def get(self, request, group_slug, schedule_id):
+        group = await self.get_group(group_slug)
+        schedule = group and await self.get_schedule(group, schedule_id)
+        if not schedule:
+            return CustomResponse.error(message="Schedule not found", status_code=404)
+
+        return await CustomResponse.asuccess(
+            message="Imports retreived successfully",
+            data=EventImport.objects.filter(schedule=schedule).order_by("-created_at", "-id"),
+            paginate="cursor",
+            request=request,
+            view=self,
+            serializer_class=self.serializer_class
+        )
+
+    @extend_schema(
+        tags=tags,
+        summary="Import events",
+        description="""
+        This endpoint allows a group admin to upload many events at once, as a CSV file with a header row
+        or as JSON lines, with the fields of the create event endpoint. Rows are validated and inserted in chunks:
+        invalid rows are reported on the import with their line number and the others are still imported.
+        The file is imported in the background: the response is a 202 with the pending import,
+        poll the import detail endpoint until it is completed or failed.
+        """,
+        request={"multipart/form-data": CreateEventImportSerializer},
+        responses=EventImportSerializer
+    )
+    async def post(self, request, group_slug, schedule_id):
+        serializer = self.post_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        group = await self.get_group(group_slug)
+        schedule = group and await self.get_schedule(group, schedule_id)
+        if not schedule:
+            return CustomResponse.error(message="Schedule not found", status_code=404)
+
+        upload = serializer.validated_data["file"]
+        # The file is kept on the job for the sync worker, which imports it
+        job = await EventImport.objects.acreate(
+            schedule=schedule,
+            created_by=request.user,
+            file_name=upload.name[:255],
+            format=serializer.validated_data["format"],
+            file=upload
+        )
+        await SyncJob.objects.aenqueue_import(job.id)
+
+        serializer = self.serializer_class(job)
+        return CustomResponse.success(message="Import queued", data=serializer.data, status_code=202)
+
+
+class EventImportDetailAPIView(APIView, GroupMixin, ScheduleMixin):
+    serializer_class = EventImportSerializer
+    permission_classes = [IsAuthenticated, IsGroupAdmin]
+
+    @extend_schema(tags=tags, summary="Get an import", responses=EventImportSerializer)
+    async def get(self, request, group_slug, import_id):
+        group = await self.get_group(group_slug)
+        job = group and await self.get_import(group, import_id)
+        if not job:
+            return CustomResponse.error(message="Import not found", status_code=404)
+
+        serializer = self.serializer_class(job)
+        return CustomResponse.success(message="Import retreived successfully", data=serializer.data)
@@ -1,4 +1,5 @@
 from decouple import config
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,12 +35,16 @@ THIRD_PARTY_APPS = [
 LOCAL_APPS = [
     "apps.accounts",
     "apps.common",
-    "apps.groups"
+    "apps.groups",
+    "apps.schedules",
+    "apps.calendars",
+    "apps.reminders",
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    'apps.common.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -84,11 +89,24 @@ DATABASES = {
         'HOST': config('POSTGRES_HOST'),
         'PORT':config('POSTGRES_PORT'),
         'OPTIONS': {
-            'sslmode':'require'
+            'sslmode': config('POSTGRES_SSLMODE', default='require'),
         }
     }
 }
 
+# Connections (and their TLS handshakes) are reused through a psycopg pool.
+# Each request's thread borrows a connection and returns it when the request finishes.
+if config('POSTGRES_POOL', default=True, cast=bool):
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('POSTGRES_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('POSTGRES_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('POSTGRES_POOL_TIMEOUT', default=10, cast=float),
+        'max_idle': config('POSTGRES_POOL_MAX_IDLE', default=300, cast=float),
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = config('POSTGRES_CONN_MAX_AGE', default=60, cast=int)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,15 +149,40 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Shared cache. Defaults to per-process memory, deployments with several processes
+# point it at a shared backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
 
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
 
+# Authenticated users are cached per process; deactivating a user takes up to
+# JWT_USER_CACHE_TTL seconds to lock out their access tokens
+JWT_USER_CACHE_SIZE = config("JWT_USER_CACHE_SIZE", default=10000, cast=int)
+JWT_USER_CACHE_TTL = config("JWT_USER_CACHE_TTL", default=30, cast=int)
+# Outstanding refresh tokens are recorded in batches off the login path
+TOKEN_WRITER_BATCH_SIZE = config("TOKEN_WRITER_BATCH_SIZE", default=500, cast=int)
+TOKEN_WRITER_FLUSH_INTERVAL = config("TOKEN_WRITER_FLUSH_INTERVAL", default=0.2, cast=float)
+TOKEN_WRITER_MAX_PENDING = config("TOKEN_WRITER_MAX_PENDING", default=10000, cast=int)
+# Expired tokens are deleted this many per statement by prune_tokens
+TOKEN_PRUNE_CHUNK_SIZE = config("TOKEN_PRUNE_CHUNK_SIZE", default=5000, cast=int)
+
+# Request metrics are served at /metrics to scrapers holding METRICS_TOKEN, the endpoint is off without one
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+# Requests sending an X-Server-Timing header get a Server-Timing breakdown back
+SERVER_TIMING_ENABLED = config("SERVER_TIMING_ENABLED", default=True, cast=bool)
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "ScheduleSync API",
     "DESCRIPTION": "ScheduleSync API documentation",
@@ -155,6 +198,94 @@ SPECTACULAR_SETTINGS = {
 }
 
 
+# Per-group load shedding of joins, per process
+GROUP_JOIN_MAX_CONCURRENCY = config("GROUP_JOIN_MAX_CONCURRENCY", default=4, cast=int)
+GROUP_JOIN_MAX_WAITING = config("GROUP_JOIN_MAX_WAITING", default=64, cast=int)
+
+# Group detail payloads are cached in the shared cache and, for a few seconds, in each process
+GROUP_DETAIL_CACHE_ALIAS = config("GROUP_DETAIL_CACHE_ALIAS", default="default")
+GROUP_DETAIL_CACHE_TIMEOUT = config("GROUP_DETAIL_CACHE_TIMEOUT", default=300, cast=int)
+GROUP_DETAIL_LOCAL_CACHE_SIZE = config("GROUP_DETAIL_LOCAL_CACHE_SIZE", default=1024, cast=int)
+GROUP_DETAIL_LOCAL_CACHE_TTL = config("GROUP_DETAIL_LOCAL_CACHE_TTL", default=2, cast=float)
+
+
+# Google sign-in
+GOOGLE_OAUTH_CLIENT_ID = config("GOOGLE_OAUTH_CLIENT_ID", default=None)
+GOOGLE_OAUTH_CERTS_URL = config("GOOGLE_OAUTH_CERTS_URL", default="https://www.googleapis.com/oauth2/v1/certs")
+
+
+# Google Calendar sync, the URLs can point at `manage.py fake_google_calendar` locally
+GOOGLE_OAUTH_CLIENT_SECRET = config("GOOGLE_OAUTH_CLIENT_SECRET", default=None)
+GOOGLE_OAUTH_TOKEN_URL = config("GOOGLE_OAUTH_TOKEN_URL", default="https://oauth2.googleapis.com/token")
+GOOGLE_CALENDAR_API_URL = config("GOOGLE_CALENDAR_API_URL", default="https://www.googleapis.com/calendar/v3")
+GOOGLE_CALENDAR_BATCH_URL = config("GOOGLE_CALENDAR_BATCH_URL", default="https://www.googleapis.com/batch/calendar/v3")
+# Google accepts at most 1000 requests per batch but recommends 50
+GOOGLE_CALENDAR_BATCH_SIZE = config("GOOGLE_CALENDAR_BATCH_SIZE", default=50, cast=int)
+GOOGLE_CALENDAR_NAME = config("GOOGLE_CALENDAR_NAME", default="ScheduleSync")
+# Access tokens this close to expiry are refreshed before a sync
+GOOGLE_CALENDAR_TOKEN_LEEWAY = timedelta(seconds=config("GOOGLE_CALENDAR_TOKEN_LEEWAY", default=60, cast=int))
+
+# Calendar sync queue, run by `manage.py run_sync_worker`
+SYNC_WORKER_CONCURRENCY = config("SYNC_WORKER_CONCURRENCY", default=16, cast=int)
+SYNC_WORKER_PROVIDER_CONCURRENCY = config("SYNC_WORKER_PROVIDER_CONCURRENCY", default=8, cast=int)
+SYNC_WORKER_POLL_INTERVAL = config("SYNC_WORKER_POLL_INTERVAL", default=1.0, cast=float)
+# Edits within this delay of each other coalesce into one sync
+SYNC_JOB_DEBOUNCE = timedelta(seconds=config("SYNC_JOB_DEBOUNCE", default=5, cast=int))
+# A running job not finished within its lease is claimed again (its worker is presumed dead)
+SYNC_JOB_LEASE = timedelta(seconds=config("SYNC_JOB_LEASE", default=600, cast=int))
+SYNC_JOB_MAX_ATTEMPTS = config("SYNC_JOB_MAX_ATTEMPTS", default=8, cast=int)
+SYNC_JOB_BACKOFF_BASE = config("SYNC_JOB_BACKOFF_BASE", default=10, cast=int)
+SYNC_JOB_BACKOFF_MAX = config("SYNC_JOB_BACKOFF_MAX", default=3600, cast=int)
+
+
+# iCalendar subscription feeds
+# Events whose last occurrence ended longer ago than this are left out of feeds
+ICS_FEED_HISTORY_DAYS = config("ICS_FEED_HISTORY_DAYS", default=90, cast=int)
+# Rendered feeds up to this size are cached per group (or user) timetable version
+ICS_FEED_CACHE_MAX_BYTES = config("ICS_FEED_CACHE_MAX_BYTES", default=1024 * 1024, cast=int)
+ICS_FEED_CACHE_TIMEOUT = config("ICS_FEED_CACHE_TIMEOUT", default=3600, cast=int)
+ICS_FEED_MAX_AGE = config("ICS_FEED_MAX_AGE", default=300, cast=int)
+
+
+# Expanded occurrences are cached per (event revision, window)
+OCCURRENCE_CACHE_TIMEOUT = config("OCCURRENCE_CACHE_TIMEOUT", default=3600, cast=int)
+# Longest window a single occurrences request may expand
+OCCURRENCE_MAX_WINDOW_DAYS = config("OCCURRENCE_MAX_WINDOW_DAYS", default=366, cast=int)
+
+# Clash detection keeps an interval index of each group's timetable over this many days
+CLASH_HORIZON_DAYS = config("CLASH_HORIZON_DAYS", default=56, cast=int)
+# Number of group indexes kept per process
+CLASH_INDEX_CACHE_SIZE = config("CLASH_INDEX_CACHE_SIZE", default=512, cast=int)
+# Most clashes returned when joining a group
+CLASH_JOIN_LIMIT = config("CLASH_JOIN_LIMIT", default=20, cast=int)
+
+# Bulk event imports are inserted this many rows per transaction
+IMPORT_CHUNK_SIZE = config("IMPORT_CHUNK_SIZE", default=500, cast=int)
+IMPORT_MAX_FILE_SIZE = config("IMPORT_MAX_FILE_SIZE", default=20 * 1024 * 1024, cast=int)
+# Rejected rows kept on an import beyond this are only counted
+IMPORT_MAX_ERRORS = config("IMPORT_MAX_ERRORS", default=1000, cast=int)
+# Uploaded import files wait here for the sync worker, which has to see the same storage
+MEDIA_ROOT = config("MEDIA_ROOT", default=str(BASE_DIR / "media"))
+
+
+# Email. Locally digests are written to EMAIL_FILE_PATH, production sets
+# EMAIL_BACKEND=apps.reminders.backends.SendGridBackend
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="django.core.mail.backends.filebased.EmailBackend")
+EMAIL_FILE_PATH = config("EMAIL_FILE_PATH", default=str(BASE_DIR / "outbox"))
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="ScheduleSync <reminders@schedulesync.com>")
+SENDGRID_API_KEY = config("SENDGRID_API_KEY", default=None)
+SENDGRID_API_URL = config("SENDGRID_API_URL", default="https://api.sendgrid.com/v3/mail/send")
+# Mail Send requests in flight at once per batch
+SENDGRID_CONCURRENCY = config("SENDGRID_CONCURRENCY", default=8, cast=int)
+
+
+# Nightly reminder digests, sent by `manage.py send_reminders`
+# Days start and end in this timezone; each event is shown in its schedule's timezone
+REMINDER_TIMEZONE = config("REMINDER_TIMEZONE", default=TIME_ZONE)
+# Digests claimed, rendered and handed to the mail backend at a time
+REMINDER_CHUNK_SIZE = config("REMINDER_CHUNK_SIZE", default=500, cast=int)
+
+
 # CORS_ALLOWED_ORIGINS = [
 #     "http://localhost:3000",
 #     "https://schedulesync.com",
@@ -171,6 +302,7 @@ CORS_ALLOW_HEADERS = [
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "x-server-timing",
 ]
 
 CORS_ALLOW_METHODS = [
@@ -3,6 +3,7 @@ from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from django.conf.urls.static import static
 from django.conf import settings
+from apps.common.metrics import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -11,6 +12,11 @@ urlpatterns = [
     path("api/", SpectacularSwaggerView.as_view(url_name="api_schema")),
     path("api/",include("apps.accounts.urls")),
     path("api/", include("apps.groups.urls")),
+    path("api/", include("apps.schedules.urls")),
+    path("api/", include("apps.calendars.urls")),
+    path("api/", include("apps.common.urls")),
+
+    path("metrics", MetricsView.as_view(), name="metrics"),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)